@@ -1,16 +1,26 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox, simpledialog
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
 import sounddevice as sd
-import librosa
 import threading
 import time
+import startup
 from audio_processor import AudioProcessor
+from ring_buffer import DSPWorker, RingBuffer
+from resampler import QUALITY_PRESETS, ResamplingChain
+from spectrum_analyzer import SpectrumAnalyzer
+from audio_io import AudioReader, downmix_matrix
+from decode_cache import DecodeCache
+from presets import Preset, PresetBank, default_bank_path
 
 class AudioEqualizerGUI:
+    # Plot updates are coalesced to at most one per display frame
+    PLOT_FRAME_MS = 16
+    # The EQ always runs at this rate; files and devices are resampled to and from it
+    ENGINE_RATE = 48000
+    # Preset switches fade between the old and new EQ over this long
+    PRESET_CROSSFADE_MS = 50
+    
     def __init__(self, root):
         self.root = root
         self.root.title("Python Digital Audio Equalizer")
@@ -18,19 +28,31 @@ class AudioEqualizerGUI:
         self.root.configure(bg='#2b2b2b')
         
         # Audio processing components
-        self.processor = AudioProcessor()
+        self.processor = AudioProcessor(sample_rate=self.ENGINE_RATE)
+        self.resample_quality = 'balanced'
+        self.processor.set_smoothing(20)  # Ramp slider changes to avoid zipper noise
+        self.processor.enable_instrumentation()
+        # Compile the fused kernel (if numba is installed) without blocking startup
+        threading.Thread(target=self.processor.set_compiled_kernel, args=(True,), daemon=True).start()
         self.audio_data = None
         self.sample_rate = 44100
         self.is_playing = False
         self.is_recording = False
         self.playback_thread = None
+        self.playback_position = 0
+        self._playback_chain = None  # (rates, ResamplingChain) kept across a pause
         self.record_thread = None
         self.current_stream = None
+        self.monitor_latency_ms = 25.0  # Extra buffering between the callback and the DSP thread
+        self.analyzer = None  # Live spectrum analyzer while a stream is running
+        self.decode_cache = DecodeCache()
+        self.preset_bank = self._load_preset_bank()
+        self._spectrum_frame = 0
+        self.canvas = None
         
         # GUI components
         self.setup_styles()
         self.create_widgets()
-        self.update_frequency_plot()
         
     def setup_styles(self):
         """Configure ttk styles for dark theme"""
@@ -41,6 +63,7 @@ class AudioEqualizerGUI:
         style.configure('Dark.TFrame', background='#2b2b2b')
         style.configure('Dark.TLabel', background='#2b2b2b', foreground='white')
         style.configure('Dark.TButton', background='#404040', foreground='white')
+        style.configure('Dark.TCheckbutton', background='#2b2b2b', foreground='white')
         style.map('Dark.TButton', background=[('active', '#505050')])
         
     def create_widgets(self):
@@ -107,6 +130,17 @@ class AudioEqualizerGUI:
         self.gain_label = ttk.Label(gain_frame, text="100%", style='Dark.TLabel')
         self.gain_label.pack(side=tk.LEFT, padx=(5, 0))
         
+        # DSP load meter
+        meter_frame = ttk.Frame(control_frame, style='Dark.TFrame')
+        meter_frame.pack(side=tk.RIGHT, padx=(0, 20))
+        
+        self.dsp_load_label = ttk.Label(meter_frame, text="DSP load: --", style='Dark.TLabel')
+        self.dsp_load_label.pack(side=tk.LEFT, padx=(0, 5))
+        
+        ttk.Button(meter_frame, text="Export Stats", command=self.export_dsp_stats,
+                  style='Dark.TButton').pack(side=tk.LEFT)
+        self.root.after(250, self.update_dsp_meter)
+        
     def create_eq_controls(self, parent):
         """Create equalizer band controls"""
         eq_frame = ttk.LabelFrame(parent, text="Equalizer Bands", style='Dark.TFrame')
@@ -150,9 +184,44 @@ class AudioEqualizerGUI:
                       command=lambda idx=i: self.reset_band(idx),
                       style='Dark.TButton').pack(pady=(5, 0))
         
-        # Reset all button
-        ttk.Button(eq_frame, text="Reset All Bands", command=self.reset_all_bands,
-                  style='Dark.TButton').pack(pady=10)
+        # Reset all button and phase mode
+        mode_frame = ttk.Frame(eq_frame, style='Dark.TFrame')
+        mode_frame.pack(pady=10)
+        
+        ttk.Button(mode_frame, text="Reset All Bands", command=self.reset_all_bands,
+                  style='Dark.TButton').pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.linear_phase_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(mode_frame, text="Linear Phase", variable=self.linear_phase_var,
+                       command=self.toggle_linear_phase, style='Dark.TCheckbutton').pack(side=tk.LEFT)
+        
+        ttk.Label(mode_frame, text="Oversampling:", style='Dark.TLabel').pack(side=tk.LEFT, padx=(10, 5))
+        self.oversampling_var = tk.StringVar(value="1x")
+        ttk.Combobox(mode_frame, textvariable=self.oversampling_var, values=["1x", "2x", "4x"],
+                     width=4, state='readonly').pack(side=tk.LEFT)
+        self.oversampling_var.trace_add('write', lambda *args: self.update_oversampling())
+        
+        ttk.Label(mode_frame, text="Resampling:", style='Dark.TLabel').pack(side=tk.LEFT, padx=(10, 5))
+        self.resample_quality_var = tk.StringVar(value=self.resample_quality)
+        ttk.Combobox(mode_frame, textvariable=self.resample_quality_var, values=list(QUALITY_PRESETS),
+                     width=9, state='readonly').pack(side=tk.LEFT)
+        self.resample_quality_var.trace_add('write', lambda *args: self.update_resample_quality())
+        
+        # Preset bank
+        preset_frame = ttk.Frame(eq_frame, style='Dark.TFrame')
+        preset_frame.pack(pady=(0, 10))
+        
+        ttk.Label(preset_frame, text="Preset:", style='Dark.TLabel').pack(side=tk.LEFT, padx=(0, 5))
+        self.preset_var = tk.StringVar()
+        self.preset_combo = ttk.Combobox(preset_frame, textvariable=self.preset_var, width=20, state='readonly',
+                                         values=self.preset_bank.names())
+        self.preset_combo.pack(side=tk.LEFT, padx=(0, 5))
+        self.preset_combo.bind('<<ComboboxSelected>>', lambda event: self.select_preset())
+        
+        ttk.Button(preset_frame, text="Save Preset", command=self.save_preset,
+                  style='Dark.TButton').pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(preset_frame, text="Delete Preset", command=self.delete_preset,
+                  style='Dark.TButton').pack(side=tk.LEFT)
         
         # Test tone generator
         test_frame = ttk.Frame(eq_frame, style='Dark.TFrame')
@@ -178,46 +247,171 @@ class AudioEqualizerGUI:
         test_freq_scale.config(command=update_test_freq_label)
         
     def create_frequency_plot(self, parent):
-        """Create frequency response plot"""
-        plot_frame = ttk.LabelFrame(parent, text="Frequency Response", style='Dark.TFrame')
-        plot_frame.pack(fill=tk.BOTH, expand=True)
+        """Create frequency response plot.
+        
+        matplotlib is imported on a background thread so the window can paint
+        first; the figure is built on the Tk thread once the import finishes.
+        """
+        self.plot_frame = ttk.LabelFrame(parent, text="Frequency Response", style='Dark.TFrame')
+        self.plot_frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.canvas = None
+        self.plot_loading_label = ttk.Label(self.plot_frame, text="Loading plot...", style='Dark.TLabel')
+        self.plot_loading_label.pack(expand=True)
+        
+        self._plot_modules = None
+        threading.Thread(target=self._load_plot_modules, daemon=True).start()
+        self.root.after(50, self._finish_frequency_plot)
+        
+    def _load_plot_modules(self):
+        """Import matplotlib in the background"""
+        try:
+            figure = startup.timed_import('matplotlib.figure')
+            backend = startup.timed_import('matplotlib.backends.backend_tkagg')
+            self._plot_modules = (figure.Figure, backend.FigureCanvasTkAgg)
+        except Exception as e:
+            print(f"Failed to load matplotlib: {e}")
+            self._plot_modules = False
+        
+    def _finish_frequency_plot(self):
+        """Build the matplotlib figure once its modules are loaded"""
+        if self._plot_modules is None:
+            self.root.after(50, self._finish_frequency_plot)
+            return
+        
+        if not self._plot_modules:
+            self.plot_loading_label.config(text="Frequency plot unavailable (matplotlib failed to load)")
+            return
+        
+        Figure, FigureCanvasTkAgg = self._plot_modules
+        self.plot_loading_label.destroy()
         
         # Create matplotlib figure
         self.fig = Figure(figsize=(12, 4), dpi=100, facecolor='#2b2b2b')
         self.ax = self.fig.add_subplot(111, facecolor='#1e1e1e')
         
-        # Configure plot appearance
+        # Create canvas
+        self.canvas = FigureCanvasTkAgg(self.fig, self.plot_frame)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        self.redraw_label = ttk.Label(self.plot_frame, text="", style='Dark.TLabel')
+        self.redraw_label.pack(anchor=tk.E, padx=10)
+        
+        self._build_plot_artists()
+        self.canvas.mpl_connect('draw_event', self._on_plot_draw)
+        self.canvas.draw()
+        startup.log("frequency plot ready")
+        
+    def _build_plot_artists(self):
+        """Create the static plot once, plus the animated artists that blitting updates"""
+        frequencies, magnitude = self.processor.get_frequency_response()
+        
+        # Static artists: rendered into the cached background
+        self.ax.axhline(y=0, color='white', linestyle='-', alpha=0.3)
         self.ax.set_xlabel('Frequency (Hz)', color='white')
         self.ax.set_ylabel('Magnitude (dB)', color='white')
+        self.ax.set_title('Frequency Response', color='white')
         self.ax.set_xscale('log')
         self.ax.grid(True, alpha=0.3, color='white')
         self.ax.tick_params(colors='white')
+        self.ax.set_xlim(20, 20000)
+        self.ax.set_ylim(-25, 25)
         
-        # Create canvas
-        self.canvas = FigureCanvasTkAgg(self.fig, plot_frame)
-        self.canvas.draw()
-        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        # Animated artists: redrawn on top of the background on every update
+        self.response_line, = self.ax.semilogx(frequencies, magnitude, 'cyan', linewidth=2,
+                                               label='EQ Response', animated=True)
+        self.gain_texts = []
+        
+        # Add band frequency markers
+        band_info = self.processor.get_band_info()
+        colors = ['red', 'orange', 'yellow', 'green', 'blue', 'purple']
+        for i, (name, freq, gain) in enumerate(band_info):
+            color = colors[i % len(colors)]
+            self.ax.axvline(x=freq, color=color, alpha=0.7, linestyle='--', linewidth=1)
+            self.ax.text(freq, 22, name, rotation=90, ha='center', va='bottom', 
+                        color=color, fontsize=8, weight='bold')
+            
+            # Gain value, shown only when the band is boosted or cut
+            self.gain_texts.append(self.ax.text(freq, gain + 2, "", ha='center', va='bottom',
+                                                color=color, fontsize=7, weight='bold',
+                                                animated=True, visible=False))
+        
+        # Live pre/post-EQ spectrum on a second y axis in dBFS, hidden until a stream runs
+        self.spectrum_ax = self.ax.twinx()
+        self.spectrum_ax.set_ylim(-100, 0)
+        self.spectrum_ax.set_ylabel('Level (dBFS)', color='white')
+        self.spectrum_ax.tick_params(colors='white')
+        self.pre_spectrum_line, = self.spectrum_ax.plot([], [], color='gray', linewidth=1, alpha=0.6,
+                                                        label='Input', animated=True, visible=False)
+        self.post_spectrum_line, = self.spectrum_ax.plot([], [], color='lime', linewidth=1, alpha=0.8,
+                                                         label='Output', animated=True, visible=False)
+        
+        self.animated_artists = [self.pre_spectrum_line, self.post_spectrum_line,
+                                 self.response_line] + self.gain_texts
+        self._plot_background = None
+        self._plot_redraw_pending = False
+        self.redraw_count = 0
+        self.redraw_time_total = 0.0
+        self._update_plot_artists()
+        self.root.after(self.PLOT_FRAME_MS, self._poll_spectrum)
+        
+    def _poll_spectrum(self):
+        """Pick up the analyzer's latest frame on the Tk thread at the display rate"""
+        analyzer = self.analyzer
+        latest = analyzer.latest if analyzer is not None else None
+        
+        if latest is not None and latest[0] != self._spectrum_frame:
+            self._spectrum_frame, pre_db, post_db = latest
+            self.pre_spectrum_line.set_data(analyzer.frequencies, pre_db)
+            self.post_spectrum_line.set_data(analyzer.frequencies, post_db)
+            self.pre_spectrum_line.set_visible(True)
+            self.post_spectrum_line.set_visible(True)
+            self.update_frequency_plot()
+        elif analyzer is None and self.post_spectrum_line.get_visible():
+            self.pre_spectrum_line.set_visible(False)
+            self.post_spectrum_line.set_visible(False)
+            self.update_frequency_plot()
+        
+        self.root.after(self.PLOT_FRAME_MS, self._poll_spectrum)
+        
+    def _on_plot_draw(self, event):
+        """After a full draw (first show, resize), cache the background and overlay the animated artists"""
+        self._plot_background = self.canvas.copy_from_bbox(self.ax.bbox)
+        for artist in self.animated_artists:
+            self.ax.draw_artist(artist)
         
     def load_audio_file(self):
         """Load audio file"""
         file_path = filedialog.askopenfilename(
             title="Select Audio File",
-            filetypes=[("Audio Files", "*.wav *.mp3 *.flac *.m4a"), ("All Files", "*.*")]
+            filetypes=[("Audio Files", "*.wav *.mp3 *.flac *.m4a *.ogg *.aiff"), ("All Files", "*.*")]
         )
         
         if file_path:
             try:
-                self.audio_data, self.sample_rate = librosa.load(file_path, sr=None)
-                # Update processor sample rate
-                self.processor.sample_rate = self.sample_rate
-                messagebox.showinfo("Success", f"Loaded: {file_path.split('/')[-1]}\nSample Rate: {self.sample_rate} Hz")
+                self.stop_playback()
+                # Decoded PCM is cached on disk and memory-mapped; a hit skips decoding entirely
+                self.audio_data, self.sample_rate = self.decode_cache.load(file_path, self._decode_audio_file)
+                print(f"Decode cache: {self.decode_cache.stats()}")
+                # The file keeps its native rate and channels; playback resamples it to the engine rate on the fly
+                messagebox.showinfo("Success", f"Loaded: {file_path.split('/')[-1]}\nSample Rate: {self.sample_rate} Hz"
+                                               f"\nChannels: {self.audio_data.shape[1]}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to load audio file: {str(e)}")
     
+    def _decode_audio_file(self, file_path):
+        """Open an audio file for decoding (used on decode cache misses).
+        
+        The reader keeps every channel and is streamed into the cache block by
+        block; formats soundfile can't read are decoded with librosa.
+        """
+        return AudioReader(file_path)
+    
     def generate_test_tone(self):
         """Generate a test tone for EQ testing"""
         duration = 5.0  # 5 seconds
         frequency = self.test_freq_var.get()
+        self.stop_playback()
         
         t = np.linspace(0, duration, int(self.sample_rate * duration))
         # Generate a sine wave with some harmonics for more interesting EQ testing
@@ -234,52 +428,163 @@ class AudioEqualizerGUI:
             return
             
         if self.is_playing:
-            self.stop_playback()
+            self.pause_playback()
         else:
             self.start_playback()
     
     def start_playback(self):
-        """Start audio playback"""
-        if self.audio_data is None:
+        """Start audio playback (stops live monitoring: both share the processor's stream state)"""
+        if self.audio_data is None or self.is_playing:
             return
-            
+        
+        if self.is_recording:
+            self.stop_recording()
+            self._join_worker(self.record_thread)
+        
         self.is_playing = True
         self.playback_thread = threading.Thread(target=self._playback_worker)
         self.playback_thread.daemon = True
         self.playback_thread.start()
     
+    def pause_playback(self):
+        """Pause audio playback, keeping the current position and filter state"""
+        self.is_playing = False
+    
     def stop_playback(self):
-        """Stop audio playback"""
+        """Stop audio playback and rewind to the start"""
         self.is_playing = False
-        sd.stop()
-        if self.current_stream:
-            self.current_stream.close()
-            self.current_stream = None
+        self._join_worker(self.playback_thread)
+        self.playback_position = 0
+        self._playback_chain = None
     
-    def _playback_worker(self):
-        """Audio playback worker thread"""
+    def _join_worker(self, thread):
+        """Wait for a stream thread to close its stream (so a late callback can't touch shared state)"""
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout=1.0)
+    
+    def _device_rate(self, kind):
+        """Default sample rate of the input or output device (the engine rate if unknown)"""
         try:
-            # Process audio through equalizer
-            print("Processing audio through EQ...")
-            processed_audio = self.processor.process_audio(self.audio_data)
-            
-            print(f"Original audio range: {self.audio_data.min():.3f} to {self.audio_data.max():.3f}")
-            print(f"Processed audio range: {processed_audio.min():.3f} to {processed_audio.max():.3f}")
+            return int(sd.query_devices(kind=kind)['default_samplerate'])
+        except Exception:
+            return self.ENGINE_RATE
+    
+    def _device_channels(self):
+        """Most channels the default output device takes (stereo if unknown)"""
+        try:
+            return max(1, int(sd.query_devices(kind='output')['max_output_channels']))
+        except Exception:
+            return 2
+    
+    def _playback_worker(self):
+        """Audio playback worker thread.
+        
+        This thread reads fixed-size chunks from the loaded audio, resamples them
+        from the file rate to the engine rate and on to the device rate, runs the
+        EQ and queues the result in a ring buffer a few chunks deep; the stream
+        callback only copies from that ring, like the monitoring DSPWorker. So
+        playback starts immediately, memory stays constant, slider changes are
+        heard mid-playback and decoding or GC pauses can't stall the callback.
+        The EQ runs on every channel of the file; a file with more channels than
+        the device (a 5.1 master on a stereo device, say) is folded down after it.
+        
+        Resuming after a pause keeps the filter and resampler state, so playback
+        continues without the transient of a cascade starting from rest.
+        """
+        # View the audio as (frames, channels); works for in-memory and memory-mapped arrays
+        audio = self.audio_data.reshape(len(self.audio_data), -1)
+        channels = audio.shape[1]
+        device_rate = self._device_rate('output')
+        out_channels = min(channels, self._device_channels())
+        downmix = downmix_matrix(channels, out_channels) if out_channels < channels else None
+        chunk_size = 1024
+        max_chunk_out = int(np.ceil(chunk_size * device_rate / self.sample_rate)) + 64  # Resampler rounding
+        finished = threading.Event()
+        done_feeding = threading.Event()
+        reached_end = threading.Event()  # finished is also set when a pause closes the stream
+        
+        def playback_callback(outdata, frames, time, status):
+            if status:
+                print(f"Playback callback status: {status}")
+                if self.processor.stats is not None:
+                    self.processor.stats.record_xrun()
             
-            # Play processed audio
-            sd.play(processed_audio, self.sample_rate)
-            sd.wait()
+            n = pending.read(outdata)
+            if n < frames:
+                outdata[n:].fill(0)
+                if done_feeding.is_set():
+                    reached_end.set()
+                    raise sd.CallbackStop
+                if self.processor.stats is not None:
+                    self.processor.stats.record_xrun()  # The feeder fell behind
+        
+        def feed():
+            """Process chunks into the ring while it has room for a whole one"""
+            while pending.space() >= max_chunk_out and self.playback_position < len(audio):
+                start = self.playback_position
+                chunk = audio[start:start + chunk_size]
+                try:
+                    processed = chain.process(chunk)
+                    if downmix is not None:
+                        processed = np.matmul(processed, downmix, out=folded[:len(processed)])
+                    pending.write(processed)
+                except Exception as e:
+                    print(f"Audio processing error: {e}")
+                    pending.write(silence[:len(chunk)])  # Output silence on error
+                self.playback_position = start + len(chunk)
+            if self.playback_position >= len(audio):
+                done_feeding.set()
+        
+        analyzer = SpectrumAnalyzer(self.processor.sample_rate, channels)
+        chain_key = (self.sample_rate, device_rate, channels, self.resample_quality)
+        resume = self._playback_chain
+        if resume is not None and resume[0] == chain_key and self.playback_position > 0:
+            chain = resume[1]
+            chain.analyzer = analyzer
+        else:
+            # Start the filter cascade from rest; state then carries across chunks
+            self.processor.reset_state()
+            chain = ResamplingChain(self.processor, self.sample_rate, device_rate, channels,
+                                    self.resample_quality, analyzer)
+        self._playback_chain = None
+        
+        # Work buffers for the feeder, allocated once per stream
+        pending = RingBuffer(4 * max_chunk_out, out_channels)
+        folded = np.empty((max_chunk_out, out_channels))
+        silence = np.zeros((chunk_size, out_channels))
+        feed()  # Prime the ring before the stream asks for audio
+        analyzer.start()
+        self.analyzer = analyzer
+        
+        try:
+            with sd.OutputStream(callback=playback_callback, channels=out_channels,
+                                 samplerate=device_rate, blocksize=1024,
+                                 dtype=np.float32, finished_callback=finished.set):
+                print("Streaming playback started...")
+                while self.is_playing and not finished.wait(0.005):
+                    feed()
         except Exception as e:
             print(f"Playback error: {e}")
             messagebox.showerror("Playback Error", f"Error during playback: {str(e)}")
         finally:
+            self.analyzer = None
+            analyzer.stop()
+            if reached_end.is_set():
+                self.playback_position = 0  # Played to the end: the next start begins again
+            else:
+                self._playback_chain = (chain_key, chain)  # Paused: resume from here
             self.is_playing = False
     
     def start_recording(self):
-        """Start real-time audio recording and processing"""
+        """Start real-time audio recording and processing (stops file playback first)"""
         if self.is_recording:
             return
-            
+        
+        if self.is_playing:
+            self.pause_playback()
+            self._join_worker(self.playback_thread)
+        self._playback_chain = None  # Monitoring takes over the filter state
+        
         self.is_recording = True
         self.record_thread = threading.Thread(target=self._recording_worker)
         self.record_thread.daemon = True
@@ -293,41 +598,49 @@ class AudioEqualizerGUI:
             self.current_stream = None
     
     def _recording_worker(self):
-        """Real-time audio processing worker"""
+        """Real-time audio processing worker.
+        
+        The stream callback only moves samples through ring buffers; the EQ runs
+        on the DSP worker thread, so plot redraws can't make the output miss its
+        deadline.
+        """
+        device_rate = self._device_rate('input')
+        analyzer = SpectrumAnalyzer(self.processor.sample_rate, 2)
+        dsp_worker = DSPWorker(self.processor, channels=2, block_size=512,
+                               latency_ms=self.monitor_latency_ms, analyzer=analyzer,
+                               device_rate=device_rate, quality=self.resample_quality)
+        
         def audio_callback(indata, outdata, frames, time, status):
             if status:
                 print(f"Audio callback status: {status}")
+                if self.processor.stats is not None:
+                    self.processor.stats.record_xrun()
             
-            try:
-                # Process input audio through equalizer
-                input_audio = indata[:, 0] if indata.shape[1] > 0 else indata.flatten()
-                processed = self.processor.process_audio(input_audio)
-                
-                # Output processed audio to both channels
-                if outdata.shape[1] == 2:
-                    outdata[:, 0] = processed
-                    outdata[:, 1] = processed
-                else:
-                    outdata[:, 0] = processed
-            except Exception as e:
-                print(f"Audio processing error: {e}")
-                outdata.fill(0)  # Output silence on error
+            dsp_worker.transfer(indata, outdata)
+        
+        dsp_worker.start()
+        analyzer.start()
+        self.analyzer = analyzer
         
         try:
             with sd.Stream(callback=audio_callback, channels=2, 
-                          samplerate=self.sample_rate, blocksize=512,
+                          samplerate=device_rate, blocksize=512,
                           dtype=np.float32) as stream:
                 self.current_stream = stream
-                print("Real-time processing started...")
+                print(f"Real-time processing started (+{dsp_worker.latency_ms:.1f} ms buffering)...")
                 while self.is_recording:
                     time.sleep(0.1)
         except Exception as e:
             print(f"Recording error: {e}")
             messagebox.showerror("Recording Error", f"Error during recording: {str(e)}")
         finally:
+            self.analyzer = None
+            analyzer.stop()
+            dsp_worker.stop()
             self.is_recording = False
             self.current_stream = None
-            print("Real-time processing stopped.")
+            print(f"Real-time processing stopped. Underruns: {dsp_worker.underruns}, "
+                  f"overruns: {dsp_worker.overruns}")
     
     def update_band_gain(self, band_index, value):
         """Update EQ band gain"""
@@ -340,6 +653,34 @@ class AudioEqualizerGUI:
         band_info = self.processor.get_band_info()
         print(f"Band {band_index} ({band_info[band_index][0]}): {gain_db:.1f} dB")
     
+    def update_dsp_meter(self):
+        """Refresh the DSP load meter from the processor's instrumentation"""
+        stats = self.processor.stats
+        if stats is not None:
+            latency_ms = self.processor.get_latency() / self.processor.sample_rate * 1000
+            self.dsp_load_label.config(text=f"DSP load: {stats.dsp_load_percent():.1f}%  "
+                                            f"xruns: {stats.xruns}  clipped: {stats.clipped_samples}  "
+                                            f"EQ latency: {latency_ms:.1f} ms")
+        self.root.after(250, self.update_dsp_meter)
+    
+    def export_dsp_stats(self):
+        """Save a snapshot of the DSP statistics as JSON"""
+        if self.processor.stats is None:
+            messagebox.showwarning("Warning", "DSP instrumentation is disabled")
+            return
+        
+        file_path = filedialog.asksaveasfilename(
+            title="Export DSP Statistics", defaultextension=".json",
+            filetypes=[("JSON Files", "*.json"), ("All Files", "*.*")]
+        )
+        
+        if file_path:
+            try:
+                with open(file_path, 'w') as f:
+                    f.write(self.processor.stats.to_json(indent=2))
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to export statistics: {str(e)}")
+    
     def update_master_gain(self, value):
         """Update master gain"""
         gain = float(value)
@@ -358,36 +699,123 @@ class AudioEqualizerGUI:
         for i in range(len(self.band_vars)):
             self.reset_band(i)
     
-    def update_frequency_plot(self):
-        """Update frequency response plot"""
-        frequencies, magnitude = self.processor.get_frequency_response()
+    def toggle_linear_phase(self):
+        """Switch between the minimum-phase IIR cascade and the linear-phase FIR"""
+        mode = 'linear' if self.linear_phase_var.get() else 'minimum'
+        self.processor.set_phase_mode(mode)
+        self.processor.request_reset()
+    
+    def _load_preset_bank(self):
+        """Load the user's preset bank and precompile it for the engine rate"""
+        path = default_bank_path()
+        try:
+            bank = PresetBank.load(path)
+        except FileNotFoundError:
+            return PresetBank(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not load presets from {path}: {e}")
+            return PresetBank(path)
+        bank.compile_all(self.processor.sample_rate)
+        return bank
+    
+    def select_preset(self):
+        """Switch to the selected preset with a short crossfade"""
+        name = self.preset_var.get()
+        if name not in self.preset_bank.presets:
+            return
         
-        self.ax.clear()
-        self.ax.semilogx(frequencies, magnitude, 'cyan', linewidth=2, label='EQ Response')
-        self.ax.axhline(y=0, color='white', linestyle='-', alpha=0.3)
-        self.ax.set_xlabel('Frequency (Hz)', color='white')
-        self.ax.set_ylabel('Magnitude (dB)', color='white')
-        self.ax.set_title('Frequency Response', color='white')
-        self.ax.grid(True, alpha=0.3, color='white')
-        self.ax.tick_params(colors='white')
-        self.ax.set_xlim(20, 20000)
-        self.ax.set_ylim(-25, 25)
+        compiled = self.preset_bank.compiled(name, self.processor.sample_rate)
+        if len(compiled.bands) != len(self.band_vars):
+            messagebox.showerror("Error", f"Preset '{name}' has {len(compiled.bands)} bands, "
+                                          f"the equalizer has {len(self.band_vars)}")
+            return
+        self.processor.apply_preset(compiled, crossfade_ms=self.PRESET_CROSSFADE_MS)
+        
+        # Setting the variables moves the sliders without re-running their callbacks
+        for i, band in enumerate(compiled.bands):
+            self.band_vars[i].set(band['gain_db'])
+            self.band_labels[i].config(text=f"{band['gain_db']:.1f} dB")
+        self.master_gain_var.set(compiled.master_gain)
+        self.gain_label.config(text=f"{int(compiled.master_gain * 100)}%")
+        self.update_frequency_plot()
+    
+    def save_preset(self):
+        """Store the current bands and master gain as a named preset"""
+        name = simpledialog.askstring("Save Preset", "Preset name:", parent=self.root)
+        if not name:
+            return
         
-        # Add band frequency markers
-        band_info = self.processor.get_band_info()
-        colors = ['red', 'orange', 'yellow', 'green', 'blue', 'purple']
-        for i, (name, freq, gain) in enumerate(band_info):
-            color = colors[i % len(colors)]
-            self.ax.axvline(x=freq, color=color, alpha=0.7, linestyle='--', linewidth=1)
-            self.ax.text(freq, 22, name, rotation=90, ha='center', va='bottom', 
-                        color=color, fontsize=8, weight='bold')
-            
-            # Show gain value
-            if abs(gain) > 0.1:
-                self.ax.text(freq, gain + 2, f"{gain:+.1f}dB", ha='center', va='bottom',
-                           color=color, fontsize=7, weight='bold')
+        self.preset_bank.add(Preset.from_processor(name, self.processor))
+        try:
+            self.preset_bank.save()
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save presets: {str(e)}")
+        self.preset_bank.compiled(name, self.processor.sample_rate)
+        self.preset_combo.config(values=self.preset_bank.names())
+        self.preset_var.set(name)
+    
+    def delete_preset(self):
+        """Remove the selected preset from the bank"""
+        name = self.preset_var.get()
+        if name not in self.preset_bank.presets:
+            return
         
-        self.canvas.draw()
+        self.preset_bank.remove(name)
+        try:
+            self.preset_bank.save()
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save presets: {str(e)}")
+        self.preset_combo.config(values=self.preset_bank.names())
+        self.preset_var.set("")
+    
+    def update_resample_quality(self):
+        """Choose the resampler quality preset (applies from the next stream start)"""
+        self.resample_quality = self.resample_quality_var.get()
+    
+    def update_oversampling(self):
+        """Apply the selected oversampling factor to the EQ and clipper"""
+        self.processor.set_oversampling(int(self.oversampling_var.get()[0]))
+        self.processor.request_reset()
+    
+    def update_frequency_plot(self):
+        """Schedule a frequency response redraw on the next display frame"""
+        if self.canvas is None:
+            return  # Plot is still loading; it draws the current curve when ready
+        
+        if not self._plot_redraw_pending:
+            self._plot_redraw_pending = True
+            self.root.after(self.PLOT_FRAME_MS, self._redraw_frequency_plot)
+    
+    def _update_plot_artists(self):
+        """Refresh the response curve data and the gain annotations"""
+        frequencies, magnitude = self.processor.get_frequency_response()
+        self.response_line.set_data(frequencies, magnitude)
+        
+        for text, (name, freq, gain) in zip(self.gain_texts, self.processor.get_band_info()):
+            text.set_visible(abs(gain) > 0.1)
+            text.set_position((freq, gain + 2))
+            text.set_text(f"{gain:+.1f}dB")
+    
+    def _redraw_frequency_plot(self):
+        """Blit the animated artists over the cached background"""
+        self._plot_redraw_pending = False
+        start = time.perf_counter()
+        
+        self._update_plot_artists()
+        if self._plot_background is None:
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self._plot_background)
+            for artist in self.animated_artists:
+                self.ax.draw_artist(artist)
+            self.canvas.blit(self.ax.bbox)
+        
+        elapsed = time.perf_counter() - start
+        self.redraw_count += 1
+        self.redraw_time_total += elapsed
+        self.redraw_label.config(text=f"Redraws: {self.redraw_count}  "
+                                      f"last {elapsed * 1000:.1f} ms  "
+                                      f"avg {self.redraw_time_total / self.redraw_count * 1000:.1f} ms")
 
 def main():
     root = tk.Tk()
@@ -0,0 +1,135 @@
+"""
+Multichannel audio file reading and writing.
+
+Files keep their channel layout: readers always hand out (frames, channels)
+arrays, mono included, so stereo and surround masters reach the EQ without a
+downmix. Formats libsndfile understands (WAV, FLAC, OGG, AIFF, and MP3 with
+libsndfile 1.1+) are read block by block through soundfile, so memory is
+bounded by the block size. Anything else (M4A, ...) falls back to decoding
+the whole file with librosa.
+"""
+
+import numpy as np
+import soundfile as sf
+import startup
+
+# Sample formats files can be written in: name -> soundfile subtype
+SAMPLE_FORMATS = {'float32': 'FLOAT', 'int16': 'PCM_16', 'int24': 'PCM_24'}
+
+# Stereo fold-down of the WAV/FLAC surround layouts (FL FR FC LFE BL BR [SL SR]): centre and
+# surrounds at -3 dB into both sides, LFE dropped, as in ITU-R BS.775
+_STEREO_DOWNMIX = {
+    6: [[1, 0], [0, 1], [0.7071, 0.7071], [0, 0], [0.7071, 0], [0, 0.7071]],
+    8: [[1, 0], [0, 1], [0.7071, 0.7071], [0, 0], [0.7071, 0], [0, 0.7071], [0.7071, 0], [0, 0.7071]],
+}
+
+
+class AudioReader:
+    """Block-wise reader for one audio file; use as a context manager"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._samples = None
+        try:
+            self._file = sf.SoundFile(path)
+        except sf.SoundFileRuntimeError:
+            # librosa (and numba behind it) is slow to import, so load it on first use
+            librosa = startup.timed_import('librosa')
+            samples, self.samplerate = librosa.load(path, sr=None, mono=False)
+            # librosa returns (channels, frames), or (frames,) for mono
+            self._samples = np.ascontiguousarray(np.atleast_2d(samples).T, dtype=np.float32)
+
+        if self._file is not None:
+            self.samplerate = self._file.samplerate
+            self.channels = self._file.channels
+            self.frames = self._file.frames
+            self.subtype = self._file.subtype  # Source sample format, e.g. 'PCM_24'
+        else:
+            self.frames, self.channels = self._samples.shape
+            self.subtype = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        self._samples = None
+
+    def blocks(self, block_size=65536, dtype='float32'):
+        """Yield the file from the start as (frames, channels) blocks of at most block_size frames"""
+        if self._file is not None:
+            self._file.seek(0)
+            yield from self._file.blocks(blocksize=block_size, dtype=dtype, always_2d=True)
+            return
+        for start in range(0, self.frames, block_size):
+            yield self._samples[start:start + block_size].astype(dtype, copy=False)
+
+    def read_into(self, out, block_size=65536):
+        """Read the whole file into a preallocated (frames, channels) array, block by block"""
+        position = 0
+        for block in self.blocks(block_size, out.dtype.name):
+            out[position:position + len(block)] = block
+            position += len(block)
+        return out
+
+    def read(self, dtype='float32'):
+        """The whole file as one (frames, channels) array"""
+        return self.read_into(np.empty((self.frames, self.channels), dtype=dtype))
+
+
+class AudioWriter:
+    """Block-wise writer; subtype is a SAMPLE_FORMATS name or any soundfile subtype"""
+
+    def __init__(self, path, samplerate, channels, subtype=None):
+        self.path = path
+        self.subtype = SAMPLE_FORMATS.get(subtype, subtype)
+        self._file = sf.SoundFile(path, 'w', samplerate=samplerate, channels=channels, subtype=self.subtype)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def write(self, block):
+        """Append a (frames, channels) block; float input is converted to the file's format"""
+        self._file.write(block)
+
+
+def downmix_matrix(channels, out_channels):
+    """(channels, out_channels) matrix mapping a file's channels onto fewer device channels.
+
+    5.1 and 7.1 fold down to stereo with the usual coefficients, anything to
+    mono is averaged, and other layouts wrap round the outputs (channel i goes
+    to output i % out_channels). Each output is scaled so its coefficients sum
+    to at most 1, so the fold-down can't clip.
+    """
+    if channels <= out_channels:
+        return np.eye(channels, out_channels)
+    if out_channels == 2 and channels in _STEREO_DOWNMIX:
+        matrix = np.array(_STEREO_DOWNMIX[channels], dtype=np.float64)
+    else:
+        matrix = np.zeros((channels, out_channels))
+        matrix[np.arange(channels), np.arange(channels) % out_channels] = 1.0
+    return matrix / np.maximum(matrix.sum(axis=0), 1.0)
+
+
+def read_audio(path, dtype='float32'):
+    """(samples, sample_rate) with samples shaped (frames, channels)"""
+    with AudioReader(path) as reader:
+        return reader.read(dtype), reader.samplerate
+
+
+def write_audio(path, samples, samplerate, subtype=None):
+    """Write (frames, channels) or mono (frames,) samples in one go"""
+    samples = np.asarray(samples)
+    with AudioWriter(path, samplerate, samples.reshape(len(samples), -1).shape[1], subtype) as writer:
+        writer.write(samples)
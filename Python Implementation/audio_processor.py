@@ -1,17 +1,91 @@
 import numpy as np
 from scipy import signal
-from scipy.signal import butter, sosfilt, sosfiltfilt
+from scipy.signal import sosfilt
+try:
+    from scipy.signal._sosfilt import _sosfilt  # In-place core of sosfilt, for the zero-allocation path
+except ImportError:
+    _sosfilt = None  # Private SciPy API; without it realtime mode falls back to the normal scipy path
+import gc
 import threading
 import time
+from instrumentation import DSPStats
+import fast_kernels
+from linear_phase import LinearPhaseEQ
+from oversampling import Oversampler
+from zero_phase import ZeroPhaseFilter
+from dynamic_eq import DYNAMIC_DEFAULTS, DynamicBands
+from filter_design import (DYNAMIC, FILTER_TYPES, CoefficientCache, band_active, band_magnitude_db, design_sos,
+                           rest_gains, sos_response, type_codes)
 
 class AudioProcessor:
+    # Full frequency-response recompute after this many incremental updates, so rounding can't drift
+    RESPONSE_REFRESH_INTERVAL = 256
+    
     def __init__(self, sample_rate=44100, buffer_size=1024):
-        self.sample_rate = sample_rate
+        self._sample_rate = sample_rate
+        self._coeff_cache = CoefficientCache()
         self.buffer_size = buffer_size
         self.bands = []
         self.master_gain = 1.0
         self.is_processing = False
         
+        # Compiled cascade (sos, active mask, active sos) and streaming filter state
+        self._cascade = (np.zeros((0, 6)), np.zeros(0, dtype=bool), np.zeros((0, 6)))
+        self._band_params = (np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int64))
+        self._zi = None
+        
+        # Parameter smoothing (disabled at 0); ramp state is only touched by the audio thread
+        self.smoothing_time = 0.0
+        self.smoothing_sub_block = 64
+        self._ramp_target = None
+        self._ramp_from = None
+        self._ramp_gains = None
+        self._ramp_pos = 0
+        self._master_target = None
+        self._master_from = 1.0
+        self._master_current = 1.0
+        self._master_pos = 0
+        
+        # Cached frequency response: per-band complex curves, their product and the
+        # (freq, gain, q, sample_rate) each curve was computed for
+        self._response_freqs = None
+        self._band_responses = None
+        self._band_response_keys = []
+        self._total_response = None
+        self._incremental_updates = 0
+        
+        # Hot-path instrumentation; None means disabled
+        self.stats = None
+        
+        # Linear-phase FIR engine; None means the minimum-phase IIR cascade is used
+        self.linear_phase = None
+        
+        # Fused numba kernel for the streaming path (see set_compiled_kernel)
+        self.use_compiled_kernel = False
+        
+        # Streaming oversampling of the EQ and clipper (factor 1 disables, see set_oversampling)
+        self.oversampling = 1
+        self.oversampling_taps = 32
+        self._oversampler = None
+        self._os_cascade = None
+        self._os_zi = None
+        
+        # Preset switch: requested by apply_preset, then run by the audio thread
+        self._crossfade_request = None
+        self._crossfade = None
+        
+        # (cascade, envelope detectors) for 'dynamic' bands, None when there are none, and
+        # how many frames the detectors may run before their coefficients are updated
+        self._dynamics = None
+        self.dynamic_block_size = 256
+        
+        # Zero-allocation realtime mode: preallocated buffers (see prepare_realtime) and the GC policy applied
+        self._realtime = None
+        self._gc_mode = None
+        
+        # Set by request_reset from any thread; the audio thread clears its state at the next block
+        self._reset_requested = False
+        
         # Initialize default EQ bands
         self.init_default_bands()
         
@@ -29,71 +103,692 @@ class AudioProcessor:
         for band in default_bands:
             self.add_band(band['name'], band['freq'], band['gain'], band['q'])
     
-    def add_band(self, name, frequency, gain_db, q_factor):
-        """Add a new frequency band"""
+    def add_band(self, name, frequency, gain_db, q_factor, filter_type='peaking', **dynamics):
+        """Add a new frequency band.
+        
+        filter_type is one of filter_design.FILTER_TYPES. 'dynamic' bands also
+        take threshold_db, ratio, attack_ms and release_ms (see dynamic_eq);
+        gain_db is then the depth the band moves to when driven. Dynamic bands
+        follow their detectors in the minimum-phase streaming path; oversampling,
+        linear and zero phase, process_audio and the response plot keep them at
+        rest, and gain smoothing is not applied while any are present.
+        """
         band = {
             'name': name,
             'frequency': frequency,
             'gain_db': gain_db,
             'q_factor': q_factor,
-            'filter_coeffs': self._design_peaking_filter(frequency, gain_db, q_factor)
+            'type': filter_type,
+            'filter_coeffs': self._design_filter(frequency, gain_db, q_factor, filter_type)
         }
+        if filter_type == 'dynamic':
+            band.update(DYNAMIC_DEFAULTS, **dynamics)
         self.bands.append(band)
+        self._build_cascade()
+    
+    @property
+    def sample_rate(self):
+        return self._sample_rate
+    
+    @sample_rate.setter
+    def sample_rate(self, sample_rate):
+        """Changing the sample rate invalidates cached coefficients and retunes every band"""
+        if sample_rate == self._sample_rate:
+            return
+        self._sample_rate = sample_rate
+        self._coeff_cache.clear()
+        self._redesign_bands()
+    
+    def _design_filter(self, freq, gain_db, q, filter_type='peaking'):
+        """Design one band's biquad coefficients (cached); dynamic bands at rest"""
+        code = FILTER_TYPES.index(filter_type)
+        sos = self._coeff_cache.get(freq, 0.0 if code == DYNAMIC else gain_db, q, self.sample_rate, code)
+        return sos[:3], sos[3:]
     
-    def _design_peaking_filter(self, freq, gain_db, q):
-        """Design a peaking EQ filter using biquad coefficients"""
-        # Convert gain from dB to linear
-        A = 10**(gain_db / 40)
-        omega = 2 * np.pi * freq / self.sample_rate
-        sin_omega = np.sin(omega)
-        cos_omega = np.cos(omega)
-        alpha = sin_omega / (2 * q)
-        
-        # Peaking EQ coefficients
-        b0 = 1 + alpha * A
-        b1 = -2 * cos_omega
-        b2 = 1 - alpha * A
-        a0 = 1 + alpha / A
-        a1 = -2 * cos_omega
-        a2 = 1 - alpha / A
-        
-        # Normalize coefficients
-        b = np.array([b0, b1, b2]) / a0
-        a = np.array([a0, a1, a2]) / a0
-        
-        return b, a
+    def _redesign_bands(self):
+        """Redesign all bands in one vectorized call and rebuild the cascade"""
+        if not self.bands:
+            return
+        codes = type_codes([band.get('type', 'peaking') for band in self.bands])
+        sos = self._coeff_cache.get_many([band['frequency'] for band in self.bands],
+                                         rest_gains([band['gain_db'] for band in self.bands], codes),
+                                         [band['q_factor'] for band in self.bands],
+                                         self.sample_rate, codes)
+        for band, row in zip(self.bands, sos):
+            band['filter_coeffs'] = (row[:3], row[3:])
+        self._build_cascade()
     
     def update_band_gain(self, band_index, gain_db):
         """Update gain for a specific band"""
         if 0 <= band_index < len(self.bands):
+            start = time.perf_counter()
             self.bands[band_index]['gain_db'] = gain_db
             freq = self.bands[band_index]['frequency']
             q = self.bands[band_index]['q_factor']
-            self.bands[band_index]['filter_coeffs'] = self._design_peaking_filter(freq, gain_db, q)
+            filter_type = self.bands[band_index].get('type', 'peaking')
+            self.bands[band_index]['filter_coeffs'] = self._design_filter(freq, gain_db, q, filter_type)
+            self._build_cascade()
+            if self.stats is not None:
+                self.stats.record_coeff_update(time.perf_counter() - start)
+    
+    def set_band_gains(self, gains_db):
+        """Update the gain of every band at once (one design call, one cascade swap)"""
+        start = time.perf_counter()
+        for band, gain_db in zip(self.bands, gains_db):
+            band['gain_db'] = gain_db
+        self._redesign_bands()
+        if self.stats is not None:
+            self.stats.record_coeff_update(time.perf_counter() - start)
+    
+    def apply_preset(self, compiled, crossfade_ms=0.0):
+        """Switch to a precompiled preset (see presets.CompiledPreset).
+        
+        Nothing is designed here: the preset's cascade is published by reference
+        and its response curve seeds the frequency-response cache. With
+        crossfade_ms the audio thread fades from the old cascade to the new one
+        instead of switching at the next block.
+        """
+        if compiled.sample_rate != self.sample_rate:
+            raise ValueError(f"Preset compiled for {compiled.sample_rate} Hz, processor runs at {self.sample_rate} Hz")
+        
+        # The whole switch in one assignment: the audio thread runs on the request's cascade
+        # and gain until the ones published below have caught up, so no block pairs the
+        # preset's gain with the old filters or the other way round
+        length = max(1, int(crossfade_ms / 1000.0 * self.sample_rate)) if crossfade_ms > 0 else 0
+        self._crossfade_request = (self._cascade, self.master_gain, self._band_params,
+                                   compiled.cascade, compiled.master_gain, compiled.band_params, length)
+        
+        self.bands = [dict(band) for band in compiled.bands]
+        self.master_gain = compiled.master_gain
+        self._publish_cascade(compiled.cascade, compiled.band_params)
+        
+        # The cache is updated in place later, so it gets copies of the compiled curves
+        self._response_freqs = compiled.frequencies
+        self._band_responses = compiled.band_responses.copy()
+        self._total_response = compiled.total_response.copy()
+        self._band_response_keys = [(band['frequency'], band['gain_db'], band['q_factor'], band.get('type', 'peaking'),
+                                     self.sample_rate) for band in self.bands]
+        self._incremental_updates = 0
+    
+    def get_cache_stats(self):
+        """Coefficient cache hit/miss statistics"""
+        return self._coeff_cache.stats()
+    
+    def _build_cascade(self):
+        """Compile all bands into one (n_bands, 6) second-order-section matrix"""
+        sos = np.zeros((len(self.bands), 6))
+        for i, band in enumerate(self.bands):
+            b, a = band['filter_coeffs']
+            sos[i, :3] = b
+            sos[i, 3:] = a
+        
+        gains = np.array([band['gain_db'] for band in self.bands], dtype=np.float64)
+        codes = type_codes([band.get('type', 'peaking') for band in self.bands])
+        active = band_active(gains, codes)
+        self._publish_cascade((sos, active, sos[active]),
+                              (np.array([band['frequency'] for band in self.bands], dtype=np.float64),
+                               gains,
+                               np.array([band['q_factor'] for band in self.bands], dtype=np.float64),
+                               codes))
+    
+    def _publish_cascade(self, cascade, band_params):
+        """Hand a new cascade to the audio thread and the engines derived from it"""
+        previous = self._dynamics[1] if self._dynamics is not None else None
+        dynamics = DynamicBands.from_bands(self.bands, band_params[3], self.sample_rate, previous)
+        
+        # A single assignment, so the audio thread never sees a half-built cascade
+        self._cascade = cascade
+        self._band_params = band_params
+        # Paired with its cascade: the audio thread skips detectors that don't match it yet
+        self._dynamics = (cascade, dynamics) if dynamics is not None else None
+        sos = cascade[0]
+        
+        if self.linear_phase is not None:
+            self.linear_phase.request_rebuild(sos, self.sample_rate)
+        
+        if self.oversampling > 1:
+            self._os_cascade = self._build_oversampled_cascade(self.oversampling)
+        
+        # A different band count needs new realtime buffers; allocate them here, not on the audio thread
+        realtime = self._realtime
+        if realtime is not None and len(realtime[2]) != len(sos):
+            self._realtime = self._allocate_realtime(realtime[0], realtime[1], len(sos))
+    
+    def _build_oversampled_cascade(self, factor):
+        """The same bands designed for the high rate, where they are no longer cramped near Nyquist"""
+        freqs, gains, qs, codes = self._band_params
+        sos = design_sos(freqs, rest_gains(gains, codes), qs, self.sample_rate * factor, codes)
+        active = band_active(gains, codes)
+        return (sos, active, sos[active])
     
     def set_master_gain(self, gain_linear):
         """Set master gain (0.0 to 2.0)"""
-        self.master_gain = max(0.0, min(2.0, gain_linear))
+        self.master_gain = max(0.0, min(2.0, float(gain_linear)))  # A float: the compiled kernel is only warmed up for float gains
+    
+    def enable_instrumentation(self):
+        """Start collecting per-block timing, clipping and coefficient-update statistics"""
+        if self.stats is None:
+            self.stats = DSPStats()
+        return self.stats
     
-    def process_audio(self, audio_data):
-        """Process audio through all EQ bands"""
-        if len(audio_data.shape) == 1:
-            # Mono audio
-            processed = self._process_mono(audio_data)
+    def disable_instrumentation(self):
+        """Stop collecting statistics (the hot path then skips all accounting)"""
+        self.stats = None
+    
+    def set_compiled_kernel(self, enabled):
+        """Use the fused compiled cascade in process_block when numba is available.
+        
+        The first call compiles the kernel (or loads it from numba's cache), so
+        call it off the audio thread. Returns whether the kernel is now in use.
+        """
+        # warm_up imports numba and compiles before the audio thread can reach the kernel
+        enabled = bool(enabled) and fast_kernels.warm_up()
+        self.use_compiled_kernel = enabled
+        return enabled
+    
+    def set_phase_mode(self, mode, n_taps=4095, partition_size=512):
+        """Select 'minimum' phase (IIR biquad cascade) or 'linear' phase.
+        
+        Linear phase applies an FIR built from the combined magnitude response of
+        all bands with partitioned FFT convolution; it adds get_latency() samples
+        of delay in the streaming path and ignores gain smoothing.
+        """
+        if mode == 'linear':
+            if self.linear_phase is not None:
+                self.linear_phase.stop()
+            linear_phase = LinearPhaseEQ(n_taps, partition_size)
+            linear_phase.rebuild_now(self._cascade[0], self.sample_rate)
+            self.linear_phase = linear_phase
+        elif mode == 'minimum':
+            if self.linear_phase is not None:
+                self.linear_phase.stop()
+                self.linear_phase = None
         else:
-            # Stereo audio
-            processed = np.zeros_like(audio_data)
-            for channel in range(audio_data.shape[1]):
-                processed[:, channel] = self._process_mono(audio_data[:, channel])
+            raise ValueError(f"Unknown phase mode: {mode}")
+    
+    def set_oversampling(self, factor, taps_per_phase=32):
+        """Run the streaming EQ, master gain and clipper at 1x, 2x or 4x the sample rate.
+        
+        Oversampling keeps clipper harmonics from aliasing and uncramps bands near
+        Nyquist, at the cost of taps_per_phase - 1 samples of latency (see
+        get_latency). Gain smoothing is not applied while oversampling, and output
+        can overshoot full scale slightly where the clipper was hit.
+        """
+        if factor not in (1, 2, 4):
+            raise ValueError(f"Oversampling factor must be 1, 2 or 4, got {factor}")
+        self.oversampling_taps = taps_per_phase
+        if factor > 1:
+            self._os_cascade = self._build_oversampled_cascade(factor)
+        # Publish the factor last: the audio thread rebuilds its oversampler when it changes
+        self.oversampling = factor
+    
+    def prepare_realtime(self, max_block_size, channels, gc_mode='freeze'):
+        """Preallocate everything process_block needs for blocks of up to max_block_size frames.
+        
+        While prepared, (frames, channels) blocks processed into an out buffer of
+        the same shape and dtype allocate nothing: the settled cascade runs in the
+        compiled kernel when it is enabled, otherwise in scipy's in-place sosfilt
+        core on preallocated planar buffers. Parameter ramps, preset crossfades,
+        oversampling and linear phase keep their normal, allocating paths.
         
-        # Apply master gain
-        processed *= self.master_gain
+        gc_mode 'freeze' collects once and moves every existing object out of the
+        cyclic collector's reach, so collections triggered by other threads stay
+        short; 'disable' turns the collector off; None leaves it alone. Either is
+        undone by release_realtime().
+        """
+        if gc_mode not in ('freeze', 'disable', None):
+            raise ValueError(f"Unknown GC mode: {gc_mode}")
+        self._release_gc()
+        self._realtime = self._allocate_realtime(max_block_size, channels, len(self._cascade[0]))
+        
+        if gc_mode == 'freeze':
+            gc.collect()
+            gc.freeze()
+        elif gc_mode == 'disable':
+            gc_mode = 'disable' if gc.isenabled() else None  # Only re-enable what was enabled
+            gc.disable()
+        self._gc_mode = gc_mode
+    
+    def release_realtime(self):
+        """Leave realtime mode and restore the garbage collector"""
+        self._realtime = None
+        self._release_gc()
+    
+    def _release_gc(self):
+        """Undo the GC policy applied by prepare_realtime"""
+        if self._gc_mode == 'freeze':
+            gc.unfreeze()
+        elif self._gc_mode == 'disable':
+            gc.enable()
+        self._gc_mode = None
+    
+    def _allocate_realtime(self, max_block_size, channels, n_sections):
+        """(max frames, channels, state, planar audio, planar state, clip mask, all-sections mask)"""
+        return (max_block_size, channels,
+                np.zeros((n_sections, 2, channels)),        # Shared with the other paths as self._zi
+                np.zeros(max_block_size * channels),         # Sliced and reshaped to (channels, frames)
+                np.zeros((channels, n_sections, 2)),         # sosfilt state layout
+                np.zeros(max_block_size * channels, dtype=bool),
+                np.ones(n_sections, dtype=bool))
+    
+    def get_latency(self):
+        """Streaming latency in samples added by the current processing mode"""
+        if self.linear_phase is not None:
+            return self.linear_phase.latency_samples
+        if self.oversampling > 1:
+            return self.oversampling_taps - 1
+        return 0
+    
+    def set_smoothing(self, time_ms):
+        """Ramp band and master gain changes over time_ms in the streaming path (0 disables).
+        
+        New settings are handed to the audio thread by reference assignment only,
+        so process_block never waits on the GUI thread.
+        """
+        self.smoothing_time = max(0.0, time_ms / 1000.0)
+    
+    def process_audio(self, audio_data, out=None):
+        """Process audio through all EQ bands.
         
-        # Prevent clipping
-        processed = np.clip(processed, -1.0, 1.0)
+        All channels of a (frames, channels) array are filtered in one call along
+        the time axis. If out is given, the result is written into it in place.
+        """
+        sos, active, active_sos = self._cascade
         
+        if self.linear_phase is not None:
+            return self._apply_master(self.linear_phase.process_offline(audio_data), out, True)
+        
+        if len(active_sos):
+            return self._apply_master(sosfilt(active_sos, audio_data, axis=0), out, True)
+        
+        return self._apply_master(audio_data, out, False)
+    
+    def zero_phase_filter(self, channels, chunk_size=65536, workers=None):
+        """Offline zero-phase version of the current EQ (see zero_phase.ZeroPhaseFilter).
+        
+        Filtering forward and backward squares the magnitude response, so the
+        cascade is designed with half of every band's gain in dB: each band keeps
+        its gain at the centre frequency and nothing is phase shifted. High/low-pass
+        and notch bands are applied twice (a Butterworth pass band edge ends up at
+        -6 dB), and dynamic bands stay at rest. Master gain and the clipper are
+        applied as usual. Offline only: the output lags the input by up to a chunk
+        plus the filter's decay margin.
+        """
+        freqs, gains, qs, codes = self._band_params
+        active = band_active(gains, codes) & (codes != DYNAMIC)
+        sos = design_sos(freqs[active], gains[active] / 2, qs[active], self.sample_rate, codes[active])
+        return ZeroPhaseFilter(sos, channels, chunk_size, workers=workers, gain=self.master_gain)
+    
+    def reset_state(self):
+        """Clear the streaming filter state (call before starting a new stream)"""
+        self._zi = None
+        self._os_zi = None
+        if self._dynamics is not None:
+            self._dynamics[1].reset()
+        if self.linear_phase is not None:
+            self.linear_phase.reset()
+        if self._oversampler is not None:
+            self._oversampler.reset()
+    
+    def request_reset(self):
+        """Have the audio thread clear the streaming state before its next block.
+        
+        Use this instead of reset_state while a stream may be running: the reset
+        then happens on the thread that owns the state, between two blocks.
+        """
+        self._reset_requested = True
+    
+    def process_block(self, block, out=None):
+        """Process one block of a continuous stream, carrying filter state between calls.
+        
+        Feeding a signal through in consecutive blocks gives the same output as
+        processing it in one go. Blocks are (frames,) or (frames, channels); if
+        out is given (e.g. the sounddevice outdata buffer) it is written in place.
+        """
+        stats = self.stats
+        if stats is None:
+            return self._process_block(block, out)
+        
+        start = time.perf_counter()
+        processed = self._process_block(block, out)
+        stats.record_block(time.perf_counter() - start, block.shape[0], self.sample_rate)
         return processed
     
+    def _process_block(self, block, out):
+        """Streaming cascade with carried state (see process_block)"""
+        if self._reset_requested:
+            self._reset_requested = False
+            self.reset_state()
+        
+        linear_phase = self.linear_phase
+        if linear_phase is not None:
+            return self._apply_master(linear_phase.process(block), out, True)
+        
+        if self.oversampling > 1:
+            return self._process_oversampled(block, out)
+        
+        if self._crossfade_request is not None or self._crossfade is not None:
+            return self._process_crossfade(block, out)
+        
+        dynamics = self._dynamics
+        if dynamics is not None and dynamics[0] is self._cascade:
+            return self._process_dynamic(block, dynamics[0], dynamics[1], out)
+        
+        if self._realtime is not None and out is not None:
+            processed = self._process_realtime(block, out)
+            if processed is not None:
+                return processed
+        
+        return self._process_cascade(block, out)
+    
+    def _process_cascade(self, block, out, cascade=None, gain=None):
+        """The biquad cascade with carried state, optionally smoothed.
+        
+        cascade and gain default to the published ones; the preset switch passes
+        its own, and those blocks are never smoothed.
+        """
+        pinned = cascade is not None
+        sos, active, active_sos = cascade if pinned else self._cascade
+        gain = self.master_gain if gain is None else gain
+        
+        # One pair of state values per section, per channel
+        zi_shape = (len(sos), 2) + block.shape[1:]
+        if self._zi is None or self._zi.shape != zi_shape:
+            self._zi = np.zeros(zi_shape)
+        zi = self._zi
+        
+        if self.smoothing_time > 0 and not pinned:
+            return self._process_smoothed(block, zi, out)
+        
+        if self.use_compiled_kernel:
+            return self._process_compiled(block, sos, active, zi, out, gain)
+        
+        if len(active_sos):
+            processed, zf = sosfilt(active_sos, block, axis=0, zi=zi[active])
+            zi[active] = zf
+            zi[~active] = 0.0
+            return self._apply_master(processed, out, True, gain)
+        
+        zi.fill(0.0)
+        return self._apply_master(block, out, False, gain)
+    
+    def _process_dynamic(self, block, cascade, dynamics, out):
+        """The cascade with dynamic bands retuned every dynamic_block_size frames.
+        
+        Each segment advances all envelope detectors at once, designs every
+        dynamic band's biquad in one call and substitutes those rows into a copy
+        of the cascade, which then runs like the plain path. Gain smoothing of
+        the static bands is not applied here.
+        """
+        sos, active, active_sos = cascade
+        zi_shape = (len(sos), 2) + block.shape[1:]
+        if self._zi is None or self._zi.shape != zi_shape:
+            self._zi = np.zeros(zi_shape)
+        zi = self._zi
+        
+        if not len(active_sos):
+            zi.fill(0.0)
+            return self._apply_master(block, out, False)
+        
+        if out is None:
+            out = np.empty(block.shape, dtype=np.float64)
+        segment_sos = sos.copy()
+        step = self.dynamic_block_size
+        for start in range(0, block.shape[0], step):
+            segment = block[start:start + step]
+            dynamics.update(segment)
+            segment_sos[dynamics.indices] = dynamics.sections()
+            if self.use_compiled_kernel:
+                self._process_compiled(segment, segment_sos, active, zi, out[start:start + step], self.master_gain)
+                continue
+            processed, zf = sosfilt(segment_sos[active], segment, axis=0, zi=zi[active])
+            zi[active] = zf
+            zi[~active] = 0.0
+            self._apply_master(processed, out[start:start + step], True)
+        return out
+    
+    def _process_realtime(self, block, out):
+        """The settled cascade into out using only the buffers of prepare_realtime.
+        
+        Returns None, without touching any state, when the block needs one of
+        the allocating paths instead.
+        """
+        max_frames, channels, zi, planar, planar_zi, mask, all_active = self._realtime
+        sos, active, active_sos = self._cascade
+        n_frames = block.shape[0]
+        if (block.ndim != 2 or block.shape[1] != channels or n_frames > max_frames or out.shape != block.shape
+                or out.dtype != block.dtype or len(sos) != len(zi)):
+            return None
+        if not self.use_compiled_kernel and _sosfilt is None:
+            return None
+        
+        gain = self.master_gain
+        if self.smoothing_time > 0:
+            # Only once the ramps have settled; like the smoothed path, keep every section running
+            ramp_samples = max(1, int(self.smoothing_time * self.sample_rate))
+            if (self._band_params[1] is not self._ramp_target or self._ramp_pos < ramp_samples
+                    or gain != self._master_target or self._master_pos < ramp_samples):
+                return None
+            active = all_active
+        
+        if self._zi is not zi:
+            # Adopt the state the allocating paths left behind (or start from rest after reset_state)
+            if self._zi is not None and self._zi.shape == zi.shape:
+                np.copyto(zi, self._zi)
+            else:
+                zi.fill(0.0)
+            self._zi = zi
+        
+        if self.use_compiled_kernel:
+            clipped = fast_kernels.biquad_cascade(sos, active, zi, block, out, gain)
+        else:
+            # The in-place core wants C-contiguous (channels, frames) audio and (channels, sections, 2)
+            # state. It runs every section; inactive ones are 0 dB, so with cleared state they pass audio through.
+            x = planar[:channels * n_frames].reshape(channels, n_frames)
+            np.copyto(x, block.T)
+            np.multiply(zi, active[:, None, None], out=zi)
+            np.copyto(planar_zi, zi.transpose(2, 0, 1))
+            _sosfilt(sos, x, planar_zi)
+            np.copyto(zi, planar_zi.transpose(1, 2, 0))
+            
+            np.copyto(out, x.T)
+            np.multiply(out, gain, out=out)
+            clipped = 0
+            if self.stats is not None:
+                over = mask[:out.size].reshape(out.shape)
+                clipped = np.count_nonzero(np.greater(out, 1.0, out=over))
+                clipped += np.count_nonzero(np.less(out, -1.0, out=over))
+            np.minimum(out, 1.0, out=out)
+            np.maximum(out, -1.0, out=out)
+        
+        if self.stats is not None:
+            self.stats.record_clipping(clipped)
+        return out
+    
+    def _process_crossfade(self, block, out):
+        """Switch to a preset, fading linearly from the previous cascade if asked (see apply_preset).
+        
+        Runs on the cascades and gains carried by the request, and keeps doing so
+        after the fade until apply_preset has published the preset's band
+        parameters, the last thing it writes.
+        """
+        request, self._crossfade_request = self._crossfade_request, None
+        if request is not None:
+            old_cascade, _, _, _, new_master, new_params, length = request
+            old_zi = None
+            if length:
+                zi_shape = (len(old_cascade[0]), 2) + block.shape[1:]
+                old_zi = self._zi.copy() if self._zi is not None and self._zi.shape == zi_shape else np.zeros(zi_shape)
+            self._crossfade = (request, old_zi, 0)
+            
+            # The switch replaces the parameter ramp, so settle smoothing on the new settings
+            self._ramp_target = self._ramp_gains = new_params[1]
+            self._ramp_pos = np.inf
+            self._master_target = self._master_current = new_master
+            self._master_pos = np.inf
+        
+        request, old_zi, position = self._crossfade
+        (old_sos, old_active, old_active_sos), old_master, old_params, new_cascade, new_master, new_params, length = request
+        n_frames = block.shape[0]
+        
+        new = self._process_cascade(block, None, new_cascade, new_master)
+        if position < length:
+            if len(old_active_sos):
+                old, zf = sosfilt(old_active_sos, block, axis=0, zi=old_zi[old_active])
+                old_zi[old_active] = zf
+            else:
+                old = np.array(block, dtype=np.float64)
+            old *= old_master
+            np.clip(old, -1.0, 1.0, out=old)
+            
+            fade = np.minimum((position + np.arange(1, n_frames + 1)) / length, 1.0)
+            new -= old
+            new *= fade.reshape((n_frames,) + (1,) * (block.ndim - 1))
+            new += old
+            position += n_frames
+        
+        # Published once the band parameters have moved on from the ones the switch started from
+        published = self._band_params is new_params or self._band_params is not old_params
+        self._crossfade = (request, old_zi, position) if position < length or not published else None
+        
+        if out is None:
+            return new
+        out[...] = new
+        return out
+    
+    def _process_smoothed(self, block, zi, out):
+        """Streaming path with gain changes ramped per sub-block.
+        
+        Band gains move linearly (in dB) towards the latest published settings;
+        coefficients for every sub-block of the ramp are designed in one
+        vectorized call and the cascade runs sub-block by sub-block with carried
+        state. Master gain is ramped per sample. Once the ramp completes, the
+        whole block goes through one sosfilt call again.
+        """
+        sos, active, active_sos = self._cascade
+        freqs, target_gains, qs, codes = self._band_params
+        ramp_samples = max(1, int(self.smoothing_time * self.sample_rate))
+        n_frames = block.shape[0]
+        
+        if target_gains is not self._ramp_target:
+            # New settings from the GUI thread: ramp from wherever the audio currently is
+            if self._ramp_gains is None or self._ramp_gains.shape != target_gains.shape:
+                self._ramp_gains = target_gains
+            self._ramp_from = self._ramp_gains
+            self._ramp_target = target_gains
+            self._ramp_pos = 0 if np.any(self._ramp_from != target_gains) else ramp_samples
+        
+        if self._ramp_pos >= ramp_samples:
+            # Settled: every section stays in the cascade so no state is dropped
+            gain = self._smoothed_master_gain(n_frames, ramp_samples, block.ndim)
+            if self.use_compiled_kernel and np.ndim(gain) == 0:
+                return self._process_compiled(block, sos, np.ones(len(sos), dtype=bool), zi, out, gain)
+            processed, zf = sosfilt(sos, block, axis=0, zi=zi)
+            zi[...] = zf
+            return self._apply_master(processed, out, True, gain)
+        
+        sub = self.smoothing_sub_block
+        starts = np.arange(0, n_frames, sub)
+        positions = np.minimum(self._ramp_pos + np.minimum(starts + sub, n_frames), ramp_samples)
+        fractions = (positions / ramp_samples)[:, None]
+        gains = self._ramp_from + (target_gains - self._ramp_from) * fractions
+        sub_sos = design_sos(freqs, rest_gains(gains, codes), qs, self.sample_rate, codes)
+        
+        processed = np.empty(block.shape)
+        for i, start in enumerate(starts):
+            processed[start:start + sub], zf = sosfilt(sub_sos[i], block[start:start + sub], axis=0, zi=zi)
+            zi[...] = zf
+        
+        self._ramp_pos = positions[-1]
+        self._ramp_gains = gains[-1]
+        
+        return self._apply_master(processed, out, True, self._smoothed_master_gain(n_frames, ramp_samples, block.ndim))
+    
+    def _process_oversampled(self, block, out):
+        """Cascade, master gain and clipper at the oversampled rate, with carried state"""
+        n_frames = block.shape[0]
+        frames = block.reshape(n_frames, -1)
+        channels = frames.shape[1]
+        
+        oversampler = self._oversampler
+        if (oversampler is None or oversampler.channels != channels or oversampler.factor != self.oversampling
+                or oversampler.taps_per_phase != self.oversampling_taps):
+            oversampler = self._oversampler = Oversampler(self.oversampling, channels, self.oversampling_taps)
+        
+        sos, active, active_sos = self._os_cascade
+        if self._os_zi is None or self._os_zi.shape != (len(sos), 2, channels):
+            self._os_zi = np.zeros((len(sos), 2, channels))
+        zi = self._os_zi
+        
+        upsampled = oversampler.upsample(frames)
+        if self.use_compiled_kernel:
+            clipped = fast_kernels.biquad_cascade(sos, active, zi, upsampled, upsampled, self.master_gain)
+        else:
+            if len(active_sos):
+                upsampled, zf = sosfilt(active_sos, upsampled, axis=0, zi=zi[active])
+                zi[active] = zf
+            zi[~active] = 0.0
+            upsampled *= self.master_gain
+            clipped = np.count_nonzero((upsampled > 1.0) | (upsampled < -1.0)) if self.stats is not None else 0
+            np.clip(upsampled, -1.0, 1.0, out=upsampled)
+        if self.stats is not None:
+            self.stats.record_clipping(clipped)
+        
+        # No second clip at the base rate: it would bring the aliasing back. The decimation
+        # filter may ring a few percent past full scale around clipped peaks.
+        if out is None:
+            out = np.empty(block.shape, dtype=np.float64)
+        out[...] = oversampler.downsample(upsampled).reshape(block.shape)
+        return out
+    
+    def _process_compiled(self, block, sos, active, zi, out, gain):
+        """Cascade, master gain and clipper in one pass of the compiled kernel"""
+        n_frames = block.shape[0]
+        if out is None:
+            out = np.empty(block.shape, dtype=np.float64)
+        
+        clipped = fast_kernels.biquad_cascade(sos, active, zi.reshape(len(sos), 2, -1),
+                                              block.reshape(n_frames, -1), out.reshape(n_frames, -1), gain)
+        if self.stats is not None:
+            self.stats.record_clipping(clipped)
+        return out
+    
+    def _smoothed_master_gain(self, n_frames, ramp_samples, ndim):
+        """Master gain for this block: a scalar once settled, otherwise a per-sample ramp"""
+        target = self.master_gain
+        if target != self._master_target:
+            self._master_from = self._master_current if self._master_target is not None else target
+            self._master_target = target
+            self._master_pos = 0 if self._master_from != target else ramp_samples
+        
+        if self._master_pos >= ramp_samples:
+            self._master_current = target
+            return target
+        
+        positions = np.minimum(self._master_pos + np.arange(1, n_frames + 1), ramp_samples)
+        gain = self._master_from + (target - self._master_from) * (positions / ramp_samples)
+        self._master_pos = positions[-1]
+        self._master_current = gain[-1]
+        
+        return gain.reshape((n_frames,) + (1,) * (ndim - 1))
+    
+    def _apply_master(self, processed, out, owned, gain=None):
+        """Apply master gain and clipping into out, without temporary arrays.
+        
+        owned says whether processed is a fresh filter output that may be reused
+        as the result buffer; bypassed input is never modified in place. gain
+        defaults to the master gain and may also be a per-sample ramp.
+        """
+        if out is None:
+            out = processed if owned else np.empty(processed.shape, dtype=np.float64)
+        
+        np.multiply(processed, self.master_gain if gain is None else gain, out=out)
+        if self.stats is not None:
+            self.stats.record_clipping(np.count_nonzero((out > 1.0) | (out < -1.0)))
+        np.clip(out, -1.0, 1.0, out=out)
+        
+        return out
+    
     def _process_mono(self, mono_audio):
         """Process mono audio through EQ bands"""
         processed = mono_audio.copy()
@@ -110,28 +805,74 @@ class AudioProcessor:
         return processed
     
     def get_frequency_response(self, frequencies=None):
-        """Calculate frequency response of the current EQ settings"""
+        """Calculate frequency response of the current EQ settings.
+        
+        The digital response of each band is cached; when only some bands have
+        changed, just those curves are recomputed and the total is updated by
+        dividing out the old curve and multiplying in the new one.
+        """
         if frequencies is None:
             frequencies = np.logspace(1, 4.3, 1000)  # 10Hz to 20kHz
         
-        # Initialize with flat response
-        total_response = np.ones(len(frequencies), dtype=complex)
+        keys = [(band['frequency'], band['gain_db'], band['q_factor'], band.get('type', 'peaking'), self.sample_rate)
+                for band in self.bands]
         
-        for band in self.bands:
-            if band['gain_db'] != 0:
-                b, a = band['filter_coeffs']
-                w, h = signal.freqs(b, a, worN=frequencies * 2 * np.pi / self.sample_rate)
-                total_response *= h
+        if (self._response_freqs is None or len(keys) != len(self._band_response_keys)
+                or not np.array_equal(frequencies, self._response_freqs)
+                or self._incremental_updates >= self.RESPONSE_REFRESH_INTERVAL):
+            self._recompute_response(frequencies, keys)
+        else:
+            changed = [i for i, key in enumerate(keys) if key != self._band_response_keys[i]]
+            if changed:
+                sos = np.array([np.concatenate(self.bands[i]['filter_coeffs']) for i in changed])
+                new_responses = sos_response(sos, frequencies, self.sample_rate)
+                self._total_response *= np.prod(new_responses / self._band_responses[changed], axis=0)
+                self._band_responses[changed] = new_responses
+                for i in changed:
+                    self._band_response_keys[i] = keys[i]
+                self._incremental_updates += 1
         
         # Convert to magnitude in dB
-        magnitude_db = 20 * np.log10(np.abs(total_response))
+        magnitude_db = 20 * np.log10(np.abs(self._total_response))
+        
+        return frequencies, magnitude_db
+    
+    def _recompute_response(self, frequencies, keys):
+        """Compute every band's response from scratch"""
+        self._response_freqs = np.array(frequencies, dtype=np.float64)
+        sos, active, active_sos = self._cascade
+        self._band_responses = sos_response(sos, self._response_freqs, self.sample_rate)
+        self._total_response = np.prod(self._band_responses, axis=0)
+        self._band_response_keys = list(keys)
+        self._incremental_updates = 0
+    
+    def get_frequency_responses(self, gain_sets, frequencies=None, band_freqs=None, qs=None, types=None):
+        """Magnitude responses in dB for many band parameter sets at once.
+        
+        gain_sets is (n_sets, n_bands). band_freqs, qs and types default to the
+        current bands' values; pass any of them as (n_bands,) or (n_sets, n_bands)
+        to vary it too. Dynamic bands are shown at rest. Returns (frequencies,
+        magnitude_db of shape (n_sets, n_points)).
+        """
+        if frequencies is None:
+            frequencies = np.logspace(1, 4.3, 1000)  # 10Hz to 20kHz
+        if band_freqs is None:
+            band_freqs = [band['frequency'] for band in self.bands]
+        if qs is None:
+            qs = [band['q_factor'] for band in self.bands]
+        if types is None:
+            types = [band.get('type', 'peaking') for band in self.bands]
+        
+        codes = type_codes(np.ravel(types)).reshape(np.shape(types))
+        magnitude_db = band_magnitude_db(frequencies, band_freqs,
+                                         rest_gains(np.asarray(gain_sets, dtype=np.float64), codes),
+                                         qs, self.sample_rate, codes)
         
         return frequencies, magnitude_db
     
     def reset_all_bands(self):
         """Reset all bands to 0 dB gain"""
-        for i in range(len(self.bands)):
-            self.update_band_gain(i, 0.0)
+        self.set_band_gains([0.0] * len(self.bands))
     
     def get_band_info(self):
         """Get information about all bands"""
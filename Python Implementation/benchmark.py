@@ -0,0 +1,818 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the AudioProcessor hot paths.
+
+Runs headless on synthetic signals, no audio device is needed.
+
+Usage:
+    python benchmark.py [--block-size 512] [--blocks 2000] [--sample-rate 44100]
+        Feature comparisons (streaming engine, multichannel, smoothing, ...)
+    python benchmark.py sweep [--quick] [--json results.json]
+        Sweep block sizes, channel counts, active bands and sample rates
+    python benchmark.py compare baseline.json results.json [--threshold 10]
+        Report configurations whose p50 latency regressed
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import scipy
+from scipy import signal
+import fast_kernels
+from audio_processor import AudioProcessor
+from filter_design import FILTER_TYPES, design_sos
+from eq_server import BatchEngine, EQClient, EQServer, Session
+from presets import Preset, PresetBank
+from linear_phase import PartitionedConvolver, design_linear_phase_fir
+from resampler import QUALITY_PRESETS, StreamingResampler
+
+# Gains applied to the default bands so every section in the cascade is active
+BENCH_GAINS = [6.0, -3.0, 4.0, -6.0, 3.0, 2.0]
+
+
+def make_processor(sample_rate=44100, active_bands=None):
+    """Create a processor with the first active_bands default bands active (all by default)"""
+    processor = AudioProcessor(sample_rate=sample_rate)
+    if active_bands is None:
+        active_bands = len(processor.bands)
+    for i, gain in enumerate(BENCH_GAINS[:min(active_bands, len(processor.bands))]):
+        processor.update_band_gain(i, gain)
+    return processor
+
+
+def make_signal(n_samples, sample_rate=44100, seed=0):
+    """Low-level noise plus a sine, kept well below clipping"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples) / sample_rate
+    return 0.1 * np.sin(2 * np.pi * 440 * t) + 0.05 * rng.standard_normal(n_samples)
+
+
+def legacy_process(processor, audio_data):
+    """The original per-channel, per-band lfilter path, kept as a baseline"""
+    if audio_data.ndim == 1:
+        processed = processor._process_mono(audio_data)
+    else:
+        processed = np.zeros_like(audio_data)
+        for channel in range(audio_data.shape[1]):
+            processed[:, channel] = processor._process_mono(audio_data[:, channel])
+    processed *= processor.master_gain
+    return np.clip(processed, -1.0, 1.0)
+
+
+def _time_blocks(process, blocks):
+    """Time each call of process(block) and return per-block latencies in seconds"""
+    timings = np.empty(len(blocks))
+    for i, block in enumerate(blocks):
+        start = time.perf_counter()
+        process(block)
+        timings[i] = time.perf_counter() - start
+    return timings
+
+
+def _summarize(name, timings, block_size, sample_rate):
+    """Print latency percentiles for one path"""
+    budget = block_size / sample_rate
+    p50, p99 = np.percentile(timings, [50, 99]) * 1e6
+    print(f"  {name:<28} mean {timings.mean() * 1e6:8.1f} us   p50 {p50:8.1f} us   "
+          f"p99 {p99:8.1f} us   load {timings.mean() / budget * 100:5.2f}%")
+
+
+def bench_block_latency(block_size=512, n_blocks=2000, sample_rate=44100):
+    """Compare per-block latency of the legacy lfilter path and the streaming SOS engine"""
+    signal_data = make_signal(block_size * n_blocks, sample_rate)
+    blocks = signal_data.reshape(n_blocks, block_size)
+
+    print(f"Per-block latency: {block_size} samples @ {sample_rate} Hz, {n_blocks} blocks "
+          f"(budget {block_size / sample_rate * 1e6:.0f} us)")
+
+    legacy = make_processor(sample_rate)
+    _summarize("legacy (lfilter per band)", _time_blocks(lambda block: legacy_process(legacy, block), blocks),
+               block_size, sample_rate)
+
+    streaming = make_processor(sample_rate)
+    streaming.reset_state()
+    _summarize("process_block (sosfilt)", _time_blocks(streaming.process_block, blocks),
+               block_size, sample_rate)
+
+    # The streamed result must match processing the whole signal in one call
+    reference = make_processor(sample_rate)
+    reference.reset_state()
+    whole = reference.process_block(signal_data)
+    streaming.reset_state()
+    streamed = np.concatenate([streaming.process_block(block) for block in blocks])
+    print(f"  max |streamed - whole|       {np.max(np.abs(streamed - whole)):.3e}")
+
+
+def bench_multichannel(channels=(2, 8, 16), block_size=512, n_blocks=500, sample_rate=44100):
+    """Compare the per-channel Python loop with the vectorized in-place multichannel path"""
+    print(f"Multichannel: {block_size} samples @ {sample_rate} Hz, {n_blocks} blocks")
+
+    for n_channels in channels:
+        mono = make_signal(block_size * n_blocks, sample_rate)
+        blocks = np.repeat(mono[:, None], n_channels, axis=1).reshape(n_blocks, block_size, n_channels)
+        processor = make_processor(sample_rate)
+
+        _summarize(f"{n_channels:>2} ch per-channel loop",
+                   _time_blocks(lambda block: legacy_process(processor, block), blocks),
+                   block_size, sample_rate)
+
+        out = np.empty((block_size, n_channels), dtype=np.float32)
+        processor.reset_state()
+        _summarize(f"{n_channels:>2} ch process_block(out=)",
+                   _time_blocks(lambda block: processor.process_block(block, out=out), blocks),
+                   block_size, sample_rate)
+
+
+def bench_coefficient_design(n_updates=2000, sample_rate=44100):
+    """Time gain updates: per-band design, all-band vectorized design, and cached replays"""
+    print(f"Coefficient design: {n_updates} updates @ {sample_rate} Hz")
+    processor = make_processor(sample_rate)
+    n_bands = len(processor.bands)
+    rng = np.random.default_rng(0)
+    gains = np.round(rng.uniform(-12, 12, size=(n_updates, n_bands)), 1)
+
+    start = time.perf_counter()
+    for row in gains:
+        for i, gain_db in enumerate(row):
+            processor.update_band_gain(i, gain_db)
+    per_band = time.perf_counter() - start
+
+    processor = make_processor(sample_rate)
+    start = time.perf_counter()
+    for row in gains:
+        processor.set_band_gains(row)
+    vectorized = time.perf_counter() - start
+
+    # Replaying the same automation hits the cache
+    start = time.perf_counter()
+    for row in gains:
+        processor.set_band_gains(row)
+    cached = time.perf_counter() - start
+
+    print(f"  update_band_gain x{n_bands}          {per_band / n_updates * 1e6:8.1f} us per preset")
+    print(f"  set_band_gains (cold cache)    {vectorized / n_updates * 1e6:8.1f} us per preset")
+    print(f"  set_band_gains (warm cache)    {cached / n_updates * 1e6:8.1f} us per preset")
+    print(f"  cache: {processor.get_cache_stats()}")
+
+
+def bench_smoothing(block_size=512, n_blocks=1000, sample_rate=44100, smoothing_ms=20):
+    """Per-block cost of parameter smoothing: off, settled, and ramping on every block"""
+    print(f"Parameter smoothing ({smoothing_ms} ms ramps): {block_size} samples @ {sample_rate} Hz")
+    blocks = make_signal(block_size * n_blocks, sample_rate).reshape(n_blocks, block_size)
+
+    processor = make_processor(sample_rate)
+    processor.reset_state()
+    _summarize("smoothing off", _time_blocks(processor.process_block, blocks), block_size, sample_rate)
+
+    processor.set_smoothing(smoothing_ms)
+    processor.reset_state()
+    _summarize("smoothing on, settled", _time_blocks(processor.process_block, blocks), block_size, sample_rate)
+
+    # Automation: a new gain arrives before every block, so the cascade is always ramping
+    gains = iter(np.tile([6.0, -6.0], n_blocks))
+
+    def automated(block):
+        processor.update_band_gain(0, next(gains))
+        processor.set_master_gain(0.5 + 0.5 * (processor.master_gain < 0.75))
+        processor.process_block(block)
+
+    _summarize("smoothing on, ramping", _time_blocks(automated, blocks), block_size, sample_rate)
+
+
+def bench_frequency_response(n_updates=500, n_sets=1000, sample_rate=44100):
+    """Time response updates after a single band change, and batch evaluation of many gain sets"""
+    print(f"Frequency response: 1000-point log grid @ {sample_rate} Hz")
+    processor = make_processor(sample_rate)
+    processor.get_frequency_response()
+
+    start = time.perf_counter()
+    for i in range(n_updates):
+        processor.update_band_gain(i % len(processor.bands), (i % 25) - 12.0)
+        processor.get_frequency_response()
+    incremental = (time.perf_counter() - start) / n_updates
+
+    start = time.perf_counter()
+    for i in range(n_updates):
+        processor.update_band_gain(i % len(processor.bands), (i % 25) - 12.0)
+        processor._response_freqs = None  # Force a full recompute
+        processor.get_frequency_response()
+    full = (time.perf_counter() - start) / n_updates
+
+    gain_sets = np.random.default_rng(0).uniform(-12, 12, size=(n_sets, len(processor.bands)))
+    start = time.perf_counter()
+    processor.get_frequency_responses(gain_sets)
+    batch = time.perf_counter() - start
+
+    print(f"  one band changed (incremental) {incremental * 1e6:8.1f} us per update")
+    print(f"  full recompute                 {full * 1e6:8.1f} us per update")
+    print(f"  {n_sets} gain sets batched       {batch * 1e6 / n_sets:8.1f} us per set")
+
+
+def bench_spectrum_analyzer(seconds=3.0, sample_rate=48000, channels=2, block_size=512):
+    """CPU load of the spectrum analyzer thread on a live-rate stereo stream"""
+    from spectrum_analyzer import SpectrumAnalyzer
+
+    print(f"Spectrum analyzer: {sample_rate} Hz, {channels} ch, {seconds:.0f} s at real-time rate")
+    analyzer = SpectrumAnalyzer(sample_rate, channels)
+    block = np.repeat(make_signal(block_size, sample_rate)[:, None], channels, axis=1).astype(np.float32)
+
+    analyzer.start()
+    block_time = block_size / sample_rate
+    start = time.perf_counter()
+    pushed = 0
+    while time.perf_counter() - start < seconds:
+        analyzer.push(block, block)
+        pushed += 1
+        time.sleep(max(0.0, start + pushed * block_time - time.perf_counter()))
+    analyzer.stop()
+
+    print(f"  frames {analyzer.frame_count}  cpu load {analyzer.cpu_load() * 100:.2f}% of one core "
+          f"({analyzer.cpu_time / max(analyzer.frame_count, 1) * 1e3:.2f} ms per frame)")
+
+
+def bench_instrumentation(block_size=512, n_blocks=2000, sample_rate=44100):
+    """Per-block cost of the hot-path instrumentation, disabled vs enabled"""
+    print(f"Instrumentation: {block_size} samples @ {sample_rate} Hz")
+    blocks = make_signal(block_size * n_blocks, sample_rate).reshape(n_blocks, block_size)
+    processor = make_processor(sample_rate)
+
+    processor.reset_state()
+    _summarize("instrumentation disabled", _time_blocks(processor.process_block, blocks), block_size, sample_rate)
+
+    stats = processor.enable_instrumentation()
+    processor.reset_state()
+    _summarize("instrumentation enabled", _time_blocks(processor.process_block, blocks), block_size, sample_rate)
+    print(f"  reported dsp load {stats.dsp_load_percent():.2f}%, p99 {stats.snapshot()['block_time_p99_us']:.0f} us")
+
+
+def bench_linear_phase(block_size=512, n_blocks=500, sample_rate=44100, fir_lengths=(1023, 4095, 16383)):
+    """Linear-phase FIR per block: partitioned overlap-save vs direct-form lfilter"""
+    print(f"Linear phase: {block_size} samples @ {sample_rate} Hz")
+    blocks = make_signal(block_size * n_blocks, sample_rate).reshape(n_blocks, block_size, 1)
+    sos = make_processor(sample_rate)._cascade[0]
+
+    for n_taps in fir_lengths:
+        fir = design_linear_phase_fir(sos, sample_rate, n_taps)
+        latency_ms = (block_size + (len(fir) - 1) // 2) / sample_rate * 1000
+
+        convolver = PartitionedConvolver(fir, 1, block_size)
+        out = np.empty((block_size, 1))
+        _summarize(f"partitioned OLS {len(fir)} taps", _time_blocks(lambda b: convolver.process(b, out), blocks),
+                   block_size, sample_rate)
+
+        state = {'zi': np.zeros(len(fir) - 1)}
+        def direct(block):
+            y, state['zi'] = signal.lfilter(fir, 1.0, block[:, 0], zi=state['zi'])
+            return y
+        # Direct form is O(taps) per sample; a fraction of the blocks is enough
+        _summarize(f"lfilter {len(fir)} taps", _time_blocks(direct, blocks[:max(n_blocks // 10, 10)]),
+                   block_size, sample_rate)
+        print(f"  latency {latency_ms:.1f} ms ({block_size} partition + {(len(fir) - 1) // 2} group delay)")
+
+
+def bench_compiled_kernel(block_sizes=(64, 128, 512), seconds=5.0, sample_rate=44100, channels=2):
+    """Fused numba cascade vs the scipy streaming path, with accuracy against scipy"""
+    print(f"Compiled kernel: {channels} channels @ {sample_rate} Hz")
+    if not fast_kernels.NUMBA_AVAILABLE:
+        print("  numba is not installed; process_block uses the scipy path")
+        return
+
+    start = time.perf_counter()
+    fast_kernels.warm_up()
+    print(f"  numba import + compile / cache load {(time.perf_counter() - start) * 1e3:.0f} ms")
+
+    for block_size in block_sizes:
+        n_blocks = int(seconds * sample_rate) // block_size
+        mono = make_signal(block_size * n_blocks, sample_rate).reshape(n_blocks, block_size)
+        blocks = np.stack([mono, -0.5 * mono], axis=2)[..., :channels]
+        outputs = {}
+
+        for name, compiled in (("scipy", False), ("compiled", True)):
+            processor = make_processor(sample_rate)
+            processor.set_compiled_kernel(compiled)
+            processor.reset_state()
+            out = np.empty((n_blocks, block_size, channels))
+            timings = np.empty(n_blocks)
+            for i, block in enumerate(blocks):
+                t = time.perf_counter()
+                processor.process_block(block, out=out[i])
+                timings[i] = time.perf_counter() - t
+            _summarize(f"{name} block {block_size}", timings, block_size, sample_rate)
+            outputs[name] = (out, timings)
+
+        error = np.abs(outputs["compiled"][0] - outputs["scipy"][0]).max()
+        speedup = np.median(outputs["scipy"][1]) / np.median(outputs["compiled"][1])
+        print(f"  speedup {speedup:.1f}x (p50), max abs error vs scipy {error:.2e}")
+
+
+def _aliasing_db(output, frequency, sample_rate):
+    """Power outside the harmonics of frequency relative to the total, in dB"""
+    window = signal.windows.blackmanharris(len(output))
+    power = np.abs(np.fft.rfft(output * window)) ** 2
+    bins = np.fft.rfftfreq(len(output), 1.0 / sample_rate)
+    harmonic = np.zeros(len(power), dtype=bool)
+    for k in range(1, int(sample_rate / 2 / frequency) + 1):
+        harmonic |= np.abs(bins - k * frequency) <= 4 * sample_rate / len(output)
+    return 10 * np.log10(power[~harmonic].sum() / power.sum())
+
+
+def bench_oversampling(block_size=512, sample_rate=44100, seconds=2.0, tone=4567.0):
+    """CPU vs aliasing of the oversampled EQ and clipper, driving a tone 6 dB into the clipper"""
+    print(f"Oversampling: {block_size} samples @ {sample_rate} Hz, {tone:.0f} Hz tone clipped by 6 dB")
+    n_blocks = int(seconds * sample_rate) // block_size
+    t = np.arange(n_blocks * block_size) / sample_rate
+    blocks = np.sin(2 * np.pi * tone * t).reshape(n_blocks, block_size)
+    budget = block_size / sample_rate
+
+    print(f"  {'factor':>6} {'taps/phase':>10} {'latency':>9} {'p50 us':>8} {'load':>7} {'aliasing':>9}")
+    for factor, taps_per_phase in ((1, 0), (2, 16), (2, 32), (2, 64), (4, 16), (4, 32), (4, 64)):
+        processor = AudioProcessor(sample_rate=sample_rate)
+        processor.set_master_gain(2.0)
+        if factor > 1:
+            processor.set_oversampling(factor, taps_per_phase)
+        processor.reset_state()
+
+        out = np.empty(blocks.shape)
+        timings = np.empty(n_blocks)
+        for i, block in enumerate(blocks):
+            start = time.perf_counter()
+            processor.process_block(block, out=out[i])
+            timings[i] = time.perf_counter() - start
+
+        aliasing = _aliasing_db(out.ravel()[len(t) // 4:], tone, sample_rate)
+        latency_ms = processor.get_latency() / sample_rate * 1000
+        print(f"  {factor:>5}x {taps_per_phase or '-':>10} {latency_ms:>6.2f} ms {np.median(timings) * 1e6:>8.1f} "
+              f"{timings.mean() / budget * 100:>6.2f}% {aliasing:>6.1f} dB")
+
+
+def bench_resampler(block_size=1024, seconds=5.0, conversions=((44100, 48000), (48000, 44100), (96000, 48000))):
+    """Streaming resampler per quality preset: per-block cost, latency and error on a 1 kHz + 10 kHz mix"""
+    print(f"Resampler: {block_size}-frame stereo blocks")
+    for from_rate, to_rate in conversions:
+        n_blocks = int(seconds * from_rate) // block_size
+        t = np.arange(n_blocks * block_size) / from_rate
+        mix = 0.5 * np.sin(2 * np.pi * 1000 * t) + 0.25 * np.sin(2 * np.pi * 10000 * t)
+        blocks = np.stack([mix, mix], axis=1).reshape(n_blocks, block_size, 2)
+
+        for quality in QUALITY_PRESETS:
+            resampler = StreamingResampler(from_rate, to_rate, 2, quality)
+            outputs = []
+            timings = _time_blocks(lambda block: outputs.append(resampler.process(block)), blocks)
+            output = np.concatenate(outputs)[:, 0]
+
+            # Compare against the ideal signal at the output rate, delayed by the filter
+            t_out = np.arange(len(output)) / to_rate - resampler.latency_seconds
+            ideal = 0.5 * np.sin(2 * np.pi * 1000 * t_out) + 0.25 * np.sin(2 * np.pi * 10000 * t_out)
+            settled = slice(to_rate // 10, -to_rate // 10)
+            error_db = 20 * np.log10(np.abs(output - ideal)[settled].max())
+
+            _summarize(f"{from_rate}->{to_rate} {quality}", timings, block_size, from_rate)
+            print(f"    latency {resampler.latency_seconds * 1e3:.2f} ms, max error {error_db:.1f} dBFS")
+
+
+def _server_sessions(n_sessions, sample_rate, channels, distinct=True, seed=0):
+    """Sessions with random band gains (or all the same) for the server benchmarks"""
+    rng = np.random.default_rng(seed)
+    shared = rng.uniform(-12, 12, len(BENCH_GAINS))
+    sessions = []
+    for i in range(n_sessions):
+        session = Session(i, sample_rate, channels)
+        session.configure(rng.uniform(-12, 12, len(BENCH_GAINS)) if distinct else shared)
+        sessions.append(session)
+    return sessions
+
+
+async def _load_generator(n_clients, seconds, block_size, sample_rate, channels):
+    """Closed-loop TCP clients against an in-process server; returns (blocks, wall s, cpu s)"""
+    server = EQServer()
+    listener = await server.start('127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    clients = [await EQClient.connect(port=port, sample_rate=sample_rate, channels=channels)
+               for _ in range(n_clients)]
+    for i, client in enumerate(clients):
+        await client.set_bands([float(gain * (i % 3 - 1)) for gain in BENCH_GAINS])
+    block = make_signal(block_size * channels, sample_rate).reshape(block_size, channels)
+    deadline = time.perf_counter() + seconds
+
+    async def run(client):
+        count = 0
+        while time.perf_counter() < deadline:
+            await client.process(block)
+            count += 1
+        return count
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    blocks = sum(await asyncio.gather(*[run(client) for client in clients]))
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    for client in clients:
+        await client.close()
+    while server.sessions:
+        await asyncio.sleep(0.01)  # Let the handlers see the close requests
+    listener.close()
+    await listener.wait_closed()
+    await server.stop()
+    return blocks, wall, cpu
+
+
+def bench_server(session_counts=(1, 16, 64, 256), block_size=512, sample_rate=48000, channels=2,
+                 n_ticks=100, load_seconds=3.0):
+    """Batched multi-session processing and a TCP load generator: concurrent streams per core"""
+    print(f"EQ server: {channels}-channel sessions, {block_size} frames @ {sample_rate} Hz")
+    period = block_size / sample_rate
+    engines = [("numpy, same settings", False, False), ("numpy, distinct", False, True)]
+    if fast_kernels.NUMBA_AVAILABLE:
+        engines.append(("compiled, distinct", True, True))
+
+    for name, compiled, distinct in engines:
+        engine = BatchEngine(compiled)
+        for n_sessions in session_counts:
+            sessions = _server_sessions(n_sessions, sample_rate, channels, distinct)
+            block = make_signal(block_size * channels, sample_rate).reshape(block_size, channels)
+            jobs = [(session, block) for session in sessions]
+            engine.process(jobs)  # Warm up
+            timings = _time_blocks(lambda _: engine.process(jobs), range(n_ticks))
+            tick = np.median(timings)
+            print(f"  {name:<22} {n_sessions:>4} sessions  tick p50 {tick * 1e6:9.1f} us  "
+                  f"load {tick / period * 100:6.1f}%  ~{n_sessions * period / tick:7.0f} streams/core")
+
+    # End to end over TCP; clients share the process, so this is a lower bound
+    n_clients = session_counts[-1]
+    blocks, wall, cpu = asyncio.run(_load_generator(n_clients, load_seconds, block_size, sample_rate, channels))
+    streams = blocks * period / wall
+    print(f"  TCP load generator: {n_clients} clients, {blocks / wall:.0f} blocks/s "
+          f"= {streams:.0f} realtime streams at {cpu / wall * 100:.0f}% CPU "
+          f"(~{streams / max(cpu / wall, 1e-9):.0f} streams/core incl. client overhead)")
+
+
+def bench_presets(n_switches=500, block_size=512, n_blocks=1000, sample_rate=48000, crossfade_ms=50):
+    """A/B preset switching: precompiled swap vs moving every slider, and crossfade block cost"""
+    print(f"Presets: A/B switching @ {sample_rate} Hz")
+    processor = make_processor(sample_rate)
+    bank = PresetBank()
+    bank.add(Preset.from_processor('A', processor))
+    processor.set_band_gains([-gain for gain in BENCH_GAINS])
+    bank.add(Preset.from_processor('B', processor))
+
+    start = time.perf_counter()
+    bank.compile_all(sample_rate)
+    print(f"  compile 2 presets            {(time.perf_counter() - start) * 1e3:8.2f} ms (once, at load)")
+
+    presets = [bank.get('A'), bank.get('B')]
+    def move_sliders(i):
+        preset = presets[i % 2]
+        for band_index, band in enumerate(preset.bands):
+            processor.update_band_gain(band_index, band['gain_db'])
+        processor.set_master_gain(preset.master_gain)
+        processor.get_frequency_response()
+    timings = _time_blocks(move_sliders, range(n_switches))
+    print(f"  per-slider updates + response p50 {np.median(timings) * 1e6:8.1f} us")
+
+    compiled = [bank.compiled('A', sample_rate), bank.compiled('B', sample_rate)]
+    def swap(i):
+        processor.apply_preset(compiled[i % 2])
+        processor.get_frequency_response()
+    timings = _time_blocks(swap, range(n_switches))
+    print(f"  precompiled apply_preset     p50 {np.median(timings) * 1e6:8.1f} us")
+
+    # Audio-thread cost: blocks during a crossfade run both cascades
+    blocks = make_signal(block_size * n_blocks, sample_rate).reshape(n_blocks, block_size)
+    processor.reset_state()
+    _summarize("steady state", _time_blocks(processor.process_block, blocks), block_size, sample_rate)
+    fade_blocks = max(1, int(crossfade_ms / 1000 * sample_rate / block_size))
+    def crossfading(i_block):
+        if i_block[0] % fade_blocks == 0:
+            processor.apply_preset(compiled[i_block[0] // fade_blocks % 2], crossfade_ms=crossfade_ms)
+        processor.process_block(i_block[1])
+    _summarize(f"during {crossfade_ms} ms crossfade", _time_blocks(crossfading, list(enumerate(blocks))),
+               block_size, sample_rate)
+
+
+def bench_zero_phase(seconds=60.0, sample_rate=48000, channel_counts=(2, 8), chunk_size=65536):
+    """Offline throughput of the chunked zero-phase mode vs the causal path, and seam error"""
+    print(f"Zero-phase render: {seconds:.0f} s @ {sample_rate} Hz, {chunk_size}-frame chunks")
+    mono = make_signal(int(seconds * sample_rate), sample_rate)
+    for channels in channel_counts:
+        audio = np.stack([mono * (1 - 0.1 * c) for c in range(channels)], axis=1)
+        processor = make_processor(sample_rate)
+        audio_seconds = len(audio) / sample_rate
+
+        start = time.perf_counter()
+        for block_start in range(0, len(audio), chunk_size):
+            processor.process_audio(audio[block_start:block_start + chunk_size])
+        causal = time.perf_counter() - start
+        print(f"  {channels} ch {'causal':<22}{audio_seconds / causal:8.0f}x real time")
+
+        # Always time a multi-worker pool too; on fewer cores than workers the threads share them
+        cpus = os.cpu_count() or 1
+        parallel = max(2, min(channels, cpus))
+        if parallel > cpus:
+            print(f"    only {cpus} CPU{'s' if cpus > 1 else ''}: {parallel} threads can't run in parallel here")
+        for workers in (1, parallel):
+            zero_phase = processor.zero_phase_filter(channels, chunk_size, workers=workers)
+            start = time.perf_counter()
+            output = zero_phase.process_array(audio)
+            elapsed = time.perf_counter() - start
+            zero_phase.close()
+            label = f"{zero_phase.workers} thread{'s' if zero_phase.workers > 1 else ''}"
+            print(f"  {channels} ch zero-phase {label:<11}{audio_seconds / elapsed:8.0f}x real time")
+
+        # Reference: one sosfiltfilt over the whole file with the same edge padding
+        reference = signal.sosfiltfilt(zero_phase.sos, audio, axis=0, padlen=zero_phase.margin)
+        np.clip(reference * processor.master_gain, -1.0, 1.0, out=reference)
+        print(f"    margin {zero_phase.margin} frames, max abs error vs whole-file sosfiltfilt "
+              f"{np.abs(output - reference).max():.2e}")
+
+
+def _processor_with_bands(n_bands, filter_type, sample_rate):
+    """A processor holding n_bands log-spaced bands of one type (a -6 dB depth for dynamic ones)"""
+    processor = AudioProcessor(sample_rate=sample_rate)
+    processor.bands = []
+    for i, frequency in enumerate(np.geomspace(40, 16000, n_bands)):
+        processor.add_band(f"{filter_type} {i}", float(frequency), -6.0, 2.0, filter_type)
+    if not n_bands:
+        processor._build_cascade()
+    return processor
+
+
+def bench_dynamic_bands(block_size=512, n_blocks=500, sample_rate=48000, channels=2, band_counts=(0, 1, 4, 16, 64)):
+    """Per-block cost of dynamic bands vs the same number of static peaking bands, and mixed-type design"""
+    print(f"Dynamic bands: {block_size} x {channels} blocks @ {sample_rate} Hz "
+          f"(budget {block_size / sample_rate * 1e6:.0f} us)")
+    mono = make_signal(block_size * n_blocks, sample_rate).reshape(n_blocks, block_size)
+    blocks = np.stack([mono, 0.5 * mono], axis=2)[..., :channels]
+    for n_bands in band_counts:
+        for filter_type in ('peaking', 'dynamic'):
+            if filter_type == 'dynamic' and not n_bands:
+                continue
+            processor = _processor_with_bands(n_bands, filter_type, sample_rate)
+            processor.reset_state()
+            timings = _time_blocks(processor.process_block, blocks)
+            _summarize(f"{n_bands:2d} {filter_type} bands", timings, block_size, sample_rate)
+
+    # One vectorized design call for a band set of every type vs designing band by band
+    types = np.arange(len(FILTER_TYPES)).repeat(4)
+    rng = np.random.default_rng(0)
+    freqs = np.geomspace(30, 18000, len(types))
+    gains = rng.uniform(-12, 12, len(types))
+    qs = rng.uniform(0.5, 4, len(types))
+    n_designs = 2000
+    start = time.perf_counter()
+    for _ in range(n_designs):
+        design_sos(freqs, gains, qs, sample_rate, types)
+    vectorized = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(n_designs // 10):
+        for i in range(len(types)):
+            design_sos(freqs[i:i + 1], gains[i:i + 1], qs[i:i + 1], sample_rate, types[i:i + 1])
+    per_band = (time.perf_counter() - start) * 10
+    print(f"  design {len(types)} mixed-type bands: vectorized {vectorized / n_designs * 1e6:7.1f} us, "
+          f"band by band {per_band / n_designs * 1e6:7.1f} us")
+
+
+def _traced_bytes(process, blocks, out):
+    """Peak and net bytes tracemalloc sees allocated while processing blocks into out"""
+    for block in blocks[:10]:
+        process(block, out=out)  # Warm up: first-call caches are not per-block costs
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    for block in blocks:
+        process(block, out=out)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - base, current - base
+
+
+def bench_realtime_allocations(block_size=512, n_blocks=1000, sample_rate=48000, channels=2):
+    """Allocations per block with and without prepare_realtime, checked with tracemalloc.
+
+    The realtime path passes when the peak it traces stays below one block of
+    audio: transient Python scalars and array views are a few hundred bytes,
+    any work array at least a block.
+    """
+    print(f"Realtime allocations: {n_blocks} x {block_size} x {channels} float32 blocks @ {sample_rate} Hz")
+    mono = make_signal(block_size * n_blocks, sample_rate).reshape(n_blocks, block_size)
+    blocks = np.stack([mono, -0.5 * mono], axis=2)[..., :channels].astype(np.float32)
+    out = np.empty((block_size, channels), dtype=np.float32)
+    block_bytes = out.nbytes
+
+    kernels = [("scipy", False)] + ([("compiled", True)] if fast_kernels.NUMBA_AVAILABLE else [])
+    for (name, compiled), realtime, smoothing_ms in itertools.product(kernels, (False, True), (0, 20)):
+        processor = make_processor(sample_rate)
+        processor.set_compiled_kernel(compiled)
+        processor.set_smoothing(smoothing_ms)
+        if realtime:
+            processor.prepare_realtime(block_size, channels, gc_mode=None)
+        processor.reset_state()
+        peak, net = _traced_bytes(processor.process_block, blocks, out)
+        label = f"{name}{' realtime' if realtime else ''}{f' smoothed {smoothing_ms} ms' if smoothing_ms else ''}"
+        verdict = ("PASS" if peak < block_bytes else "FAIL") if realtime else ""
+        print(f"  {label:<32} peak {peak:9d} B  net {net:7d} B  {verdict}")
+        processor.release_realtime()
+
+
+SWEEP_BLOCK_SIZES = [64, 128, 256, 512, 1024, 2048, 4096, 8192]
+SWEEP_CHANNELS = [1, 2, 4, 8, 16]
+SWEEP_ACTIVE_BANDS = [0, 1, 3, 6]
+SWEEP_SAMPLE_RATES = [44100, 48000, 96000, 192000]
+
+QUICK_BLOCK_SIZES = [64, 512, 4096]
+QUICK_CHANNELS = [1, 2, 16]
+QUICK_ACTIVE_BANDS = [0, 6]
+QUICK_SAMPLE_RATES = [48000, 192000]
+
+
+def _block_record(target, timings, block_size, channels, active_bands, sample_rate):
+    """Throughput and latency statistics for one swept configuration"""
+    total = timings.sum()
+    audio_seconds = len(timings) * block_size / sample_rate
+    p50, p99 = np.percentile(timings, [50, 99])
+    return {
+        'target': target,
+        'block_size': block_size,
+        'channels': channels,
+        'active_bands': active_bands,
+        'sample_rate': sample_rate,
+        'blocks': len(timings),
+        'samples_per_sec': len(timings) * block_size * channels / total,
+        'realtime_factor': total / audio_seconds,
+        'p50_us': p50 * 1e6,
+        'p99_us': p99 * 1e6,
+        'max_us': timings.max() * 1e6,
+    }
+
+
+def sweep(block_sizes, channel_counts, active_band_counts, sample_rates, seconds=1.0, warmup=5):
+    """Time the block-processing paths over the full configuration grid"""
+    records = []
+    configs = list(itertools.product(sample_rates, active_band_counts, channel_counts, block_sizes))
+
+    for n, (sample_rate, active_bands, channels, block_size) in enumerate(configs, 1):
+        n_blocks = int(min(2000, max(20, seconds * sample_rate / block_size)))
+        mono = make_signal(block_size * (n_blocks + warmup), sample_rate)
+        blocks = np.repeat(mono[:, None], channels, axis=1).reshape(n_blocks + warmup, block_size, channels)
+        if channels == 1:
+            blocks = blocks[:, :, 0]
+
+        processor = make_processor(sample_rate, active_bands)
+        processor.reset_state()
+        out = np.empty(blocks.shape[1:])
+        targets = [
+            ('process_block', lambda block: processor.process_block(block, out=out)),
+            ('process_audio', processor.process_audio),
+        ]
+        if channels == 1:
+            targets.append(('_process_mono', processor._process_mono))
+
+        for target, process in targets:
+            _time_blocks(process, blocks[:warmup])
+            timings = _time_blocks(process, blocks[warmup:])
+            records.append(_block_record(target, timings, block_size, channels, active_bands, sample_rate))
+
+        print(f"\r  {n}/{len(configs)} configurations", end='', file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+
+    # Control-rate paths: coefficient updates and response evaluation per sample rate
+    for sample_rate in sample_rates:
+        processor = make_processor(sample_rate)
+        gains = np.random.default_rng(0).uniform(-12, 12, size=500)
+
+        timings = np.empty(len(gains))
+        for i, gain_db in enumerate(gains):
+            start = time.perf_counter()
+            processor.update_band_gain(i % len(processor.bands), gain_db)
+            timings[i] = time.perf_counter() - start
+        records.append(_call_record('update_band_gain', timings, sample_rate))
+
+        timings = np.empty(len(gains))
+        for i, gain_db in enumerate(gains):
+            processor.update_band_gain(i % len(processor.bands), gain_db)
+            start = time.perf_counter()
+            processor.get_frequency_response()
+            timings[i] = time.perf_counter() - start
+        records.append(_call_record('get_frequency_response', timings, sample_rate))
+
+    return records
+
+
+def _call_record(target, timings, sample_rate):
+    """Latency statistics for a control-rate call"""
+    p50, p99 = np.percentile(timings, [50, 99])
+    return {'target': target, 'sample_rate': sample_rate, 'calls': len(timings),
+            'calls_per_sec': len(timings) / timings.sum(),
+            'p50_us': p50 * 1e6, 'p99_us': p99 * 1e6, 'max_us': timings.max() * 1e6}
+
+
+def _environment():
+    """Versions and machine details stored with sweep results"""
+    return {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'python': platform.python_version(),
+            'numpy': np.__version__, 'scipy': scipy.__version__, 'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine()}
+
+
+def _record_key(record):
+    """Identity of a configuration for comparing two runs"""
+    return tuple(record.get(field) for field in ('target', 'block_size', 'channels', 'active_bands', 'sample_rate'))
+
+
+def print_sweep(records):
+    """Print the block-path results as a table"""
+    print(f"{'target':<16}{'rate':>8}{'bands':>6}{'ch':>4}{'block':>6}"
+          f"{'Msamples/s':>12}{'RTF':>9}{'p50 us':>10}{'p99 us':>10}{'max us':>10}")
+    for r in records:
+        if 'block_size' in r:
+            print(f"{r['target']:<16}{r['sample_rate']:>8}{r['active_bands']:>6}{r['channels']:>4}"
+                  f"{r['block_size']:>6}{r['samples_per_sec'] / 1e6:>12.2f}{r['realtime_factor']:>9.4f}"
+                  f"{r['p50_us']:>10.1f}{r['p99_us']:>10.1f}{r['max_us']:>10.1f}")
+        else:
+            print(f"{r['target']:<24}{r['sample_rate']:>8}   {r['calls_per_sec']:>10.0f} calls/s"
+                  f"{r['p50_us']:>10.1f}{r['p99_us']:>10.1f}{r['max_us']:>10.1f}")
+
+
+def compare(baseline_path, results_path, threshold=10.0):
+    """Print configurations whose p50 latency grew by more than threshold percent"""
+    with open(baseline_path) as f:
+        baseline = {_record_key(r): r for r in json.load(f)['results']}
+    with open(results_path) as f:
+        results = json.load(f)['results']
+
+    regressions = 0
+    for record in results:
+        old = baseline.get(_record_key(record))
+        if old is None:
+            continue
+        change = (record['p50_us'] / old['p50_us'] - 1.0) * 100.0
+        if change > threshold:
+            regressions += 1
+            label = ' '.join(f"{k}={v}" for k, v in zip(('block', 'ch', 'bands', 'rate'), _record_key(record)[1:])
+                             if v is not None)
+            print(f"  REGRESSION {record['target']} {label}: p50 {old['p50_us']:.1f} -> {record['p50_us']:.1f} us "
+                  f"(+{change:.0f}%)")
+
+    print(f"{regressions} regressions over {threshold:.0f}% in {len(results)} configurations")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark AudioProcessor hot paths")
+    parser.add_argument('--block-size', type=int, default=512)
+    parser.add_argument('--blocks', type=int, default=2000)
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    subparsers = parser.add_subparsers(dest='command')
+
+    sweep_parser = subparsers.add_parser('sweep', help="Sweep the configuration grid")
+    sweep_parser.add_argument('--quick', action='store_true', help="Use a reduced grid")
+    sweep_parser.add_argument('--seconds', type=float, default=1.0, help="Audio per configuration")
+    sweep_parser.add_argument('--json', help="Write results to this file")
+
+    compare_parser = subparsers.add_parser('compare', help="Compare two sweep result files")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('results')
+    compare_parser.add_argument('--threshold', type=float, default=10.0, help="Allowed p50 increase in percent")
+    args = parser.parse_args(argv)
+
+    if args.command == 'sweep':
+        if args.quick:
+            grid = (QUICK_BLOCK_SIZES, QUICK_CHANNELS, QUICK_ACTIVE_BANDS, QUICK_SAMPLE_RATES)
+        else:
+            grid = (SWEEP_BLOCK_SIZES, SWEEP_CHANNELS, SWEEP_ACTIVE_BANDS, SWEEP_SAMPLE_RATES)
+        records = sweep(*grid, seconds=args.seconds)
+        print_sweep(records)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump({'environment': _environment(), 'results': records}, f, indent=2)
+            print(f"Wrote {len(records)} results to {args.json}")
+        return 0
+
+    if args.command == 'compare':
+        return 1 if compare(args.baseline, args.results, args.threshold) else 0
+
+    bench_block_latency(args.block_size, args.blocks, args.sample_rate)
+    bench_multichannel(block_size=args.block_size, sample_rate=args.sample_rate)
+    bench_coefficient_design(sample_rate=args.sample_rate)
+    bench_smoothing(args.block_size, sample_rate=args.sample_rate)
+    bench_frequency_response(sample_rate=args.sample_rate)
+    bench_spectrum_analyzer()
+    bench_instrumentation(args.block_size, sample_rate=args.sample_rate)
+    bench_linear_phase(args.block_size, sample_rate=args.sample_rate)
+    bench_compiled_kernel(sample_rate=args.sample_rate)
+    bench_oversampling(args.block_size, sample_rate=args.sample_rate)
+    bench_resampler()
+    bench_server()
+    bench_presets()
+    bench_realtime_allocations()
+    bench_zero_phase()
+    bench_dynamic_bands()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+On-disk cache of decoded audio.
+
+Decoding MP3/FLAC/M4A to float32 is slow and holds the whole track in RAM.
+DecodeCache stores decoded (frames, channels) PCM as raw .npy files keyed by the source path,
+modification time and size, and opens cached entries memory-mapped, so
+playback and rendering page samples in on demand. The cache is bounded in
+bytes and evicts least recently used entries.
+"""
+
+import glob
+import hashlib
+import os
+import numpy as np
+from audio_io import AudioReader
+
+# Bumped when the layout of cached samples changes (2: (frames, channels) instead of a mono downmix)
+CACHE_FORMAT = 2
+
+
+def default_cache_dir():
+    """Per-user cache directory (honours XDG_CACHE_HOME)"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'dsp-audio-equalizer', 'decoded')
+
+
+class DecodeCache:
+    def __init__(self, cache_dir=None, max_bytes=4 * 1024 ** 3):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _key(self, path):
+        """Cache key for the current version of a source file"""
+        st = os.stat(path)
+        identity = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{CACHE_FORMAT}"
+        return hashlib.sha1(identity.encode('utf-8')).hexdigest()
+
+    def _entries(self):
+        """(path, size, last use) for every cached file"""
+        entries = []
+        for entry_path in glob.glob(os.path.join(self.cache_dir, '*.npy')):
+            try:
+                st = os.stat(entry_path)
+            except OSError:
+                continue  # Removed concurrently
+            entries.append((entry_path, st.st_size, st.st_mtime))
+        return entries
+
+    def load(self, path, decode):
+        """Return (samples, sample_rate) for path, decoding with decode(path) on a miss.
+
+        decode returns (samples, sample_rate) or an open audio_io.AudioReader.
+        Samples come back as a read-only memory-mapped float32 array.
+        """
+        key = self._key(path)
+        matches = glob.glob(os.path.join(self.cache_dir, key + '.*.npy'))
+
+        if matches:
+            entry_path = matches[0]
+            try:
+                os.utime(entry_path)  # Mark as recently used
+                sample_rate = int(entry_path.rsplit('.', 2)[1])
+                samples = np.load(entry_path, mmap_mode='r')
+                self.hits += 1
+                return samples, sample_rate
+            except (OSError, ValueError):
+                pass  # Damaged or vanished entry: decode again
+
+        self.misses += 1
+        # Entries are written to a temporary name and renamed, so a partial file is never picked up
+        decoded = decode(path)
+        if isinstance(decoded, AudioReader):
+            # Stream the reader's blocks straight into the entry, so memory stays bounded
+            with decoded as reader:
+                entry_path = os.path.join(self.cache_dir, f"{key}.{int(reader.samplerate)}.npy")
+                temp_path = entry_path + '.tmp'
+                entry = np.lib.format.open_memmap(temp_path, mode='w+', dtype=np.float32,
+                                                  shape=(reader.frames, reader.channels))
+                reader.read_into(entry)
+                entry.flush()
+                sample_rate = reader.samplerate
+                del entry  # Unmap before the rename
+        else:
+            samples, sample_rate = decoded
+            entry_path = os.path.join(self.cache_dir, f"{key}.{int(sample_rate)}.npy")
+            temp_path = entry_path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                np.save(f, np.ascontiguousarray(samples, dtype=np.float32))
+        os.replace(temp_path, entry_path)
+
+        self.evict(keep=entry_path)
+        return np.load(entry_path, mmap_mode='r'), sample_rate
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+
+        for entry_path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if entry_path == keep:
+                continue
+            try:
+                os.remove(entry_path)
+            except OSError:
+                continue  # Still mapped by someone (e.g. on Windows); try the next one
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Remove every cached entry"""
+        for entry_path, _, _ in self._entries():
+            try:
+                os.remove(entry_path)
+            except OSError:
+                pass
+
+    def stats(self):
+        """Hit/miss counts and current disk usage"""
+        entries = self._entries()
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(entries), 'bytes': sum(size for _, size, _ in entries),
+                'max_bytes': self.max_bytes}
@@ -0,0 +1,118 @@
+"""
+Dynamic EQ bands.
+
+A dynamic band is a peaking filter whose gain follows the level in its own
+frequency range: at rest it is flat, and as the band-passed level rises above
+threshold_db it moves towards the band's gain_db (its depth) at a rate set by
+ratio, like a compressor acting on one band (with a negative depth, a
+de-esser, say).
+
+Levels are measured for all dynamic bands together, once per update: one FFT
+of the block and one matrix product with every band's bandpass power
+response. Envelopes, gains and the bands' biquads are then updated with array
+operations, so each extra dynamic band costs a row in those arrays rather
+than its own sidechain filter pass.
+"""
+
+import numpy as np
+from filter_design import DYNAMIC, design_peaking_sos
+
+# Detector settings a dynamic band falls back on
+DYNAMIC_DEFAULTS = {'threshold_db': -30.0, 'ratio': 4.0, 'attack_ms': 5.0, 'release_ms': 100.0}
+
+# Envelope floor in dBFS (also the level of digital silence)
+FLOOR_DB = -120.0
+
+
+class DynamicBands:
+    """Envelope detectors and block-rate coefficients for the dynamic bands of a cascade.
+
+    indices are the cascade rows the bands own; sections() gives the rows to
+    substitute for the current gains.
+    """
+
+    def __init__(self, indices, freqs, depths_db, qs, thresholds_db, ratios, attack_ms, release_ms, sample_rate):
+        self.indices = np.asarray(indices, dtype=np.intp)
+        self.freqs = np.asarray(freqs, dtype=np.float64)
+        self.depths_db = np.asarray(depths_db, dtype=np.float64)
+        self.qs = np.asarray(qs, dtype=np.float64)
+        self.thresholds_db = np.asarray(thresholds_db, dtype=np.float64)
+        self.slopes = 1.0 - 1.0 / np.maximum(np.asarray(ratios, dtype=np.float64), 1.0)
+        self.attack_s = np.asarray(attack_ms, dtype=np.float64) / 1000.0
+        self.release_s = np.asarray(release_ms, dtype=np.float64) / 1000.0
+        self.sample_rate = sample_rate
+        self._tables = {}  # Block length -> (window, bandpass power weights, attack coef, release coef)
+        self.reset()
+
+    @classmethod
+    def from_bands(cls, bands, codes, sample_rate, previous=None):
+        """Detectors for the dynamic entries of a band list, or None if it has none.
+
+        Envelopes carry over from previous when the bands are the same ones, so
+        moving a slider doesn't reset the detectors.
+        """
+        dynamic_mask = np.asarray(codes) == DYNAMIC
+        if not dynamic_mask.any():
+            return None
+        indices = np.flatnonzero(dynamic_mask)
+        dynamic = [dict(DYNAMIC_DEFAULTS, **bands[i]) for i in indices]
+        column = lambda key: [band[key] for band in dynamic]
+        detectors = cls(indices, column('frequency'), column('gain_db'), column('q_factor'), column('threshold_db'),
+                        column('ratio'), column('attack_ms'), column('release_ms'), sample_rate)
+
+        if (previous is not None and np.array_equal(previous.indices, detectors.indices)
+                and np.array_equal(previous.freqs, detectors.freqs) and previous.sample_rate == sample_rate):
+            detectors.envelope_db = previous.envelope_db.copy()
+            detectors.update_gains()
+        return detectors
+
+    def reset(self):
+        """Detectors back to silence and every band flat"""
+        self.envelope_db = np.full(len(self.indices), FLOOR_DB)
+        self.gains_db = np.zeros(len(self.indices))
+
+    def _table(self, n_frames):
+        """Analysis window, weights and smoothing coefficients for one block length"""
+        table = self._tables.get(n_frames)
+        if table is None:
+            window = np.hanning(n_frames + 2)[1:-1]  # Hann without its zero end points
+            bins = np.fft.rfftfreq(n_frames, 1.0 / self.sample_rate)
+            # Analog bandpass power response at each band's centre and Q, scaled so that
+            # weights @ |rfft(x * window)|^2 is the band-passed mean square of x
+            ratio = np.maximum(bins, 1e-3)[None, :] / self.freqs[:, None]
+            weights = 1.0 / (1.0 + (self.qs[:, None] * (ratio - 1.0 / ratio)) ** 2)
+            weights *= 2.0 / (n_frames * np.sum(window ** 2))
+            duration = n_frames / self.sample_rate
+            table = (window[:, None], weights,
+                     np.exp(-duration / np.maximum(self.attack_s, 1e-6)),
+                     np.exp(-duration / np.maximum(self.release_s, 1e-6)))
+            if len(self._tables) >= 16:
+                self._tables.clear()  # Resampled streams vary the length a little; don't grow without bound
+            self._tables[n_frames] = table
+        return table
+
+    def update(self, block):
+        """Advance every detector by one (frames, channels) block; returns the new gains in dB"""
+        frames = block.reshape(len(block), -1)
+        if not len(frames):
+            return self.gains_db
+        window, weights, attack, release = self._table(len(frames))
+
+        # Channels are linked: the detectors see the mean power over channels
+        spectrum = np.fft.rfft(frames * window, axis=0)
+        power = np.mean(spectrum.real ** 2 + spectrum.imag ** 2, axis=1)
+        level_db = 10 * np.log10(np.maximum(weights @ power, 10 ** (FLOOR_DB / 10)))
+
+        coef = np.where(level_db > self.envelope_db, attack, release)
+        self.envelope_db = level_db + coef * (self.envelope_db - level_db)
+        return self.update_gains()
+
+    def update_gains(self):
+        """Gains from the current envelopes: ratio-scaled overshoot, limited to each band's depth"""
+        amount = np.maximum(self.envelope_db - self.thresholds_db, 0.0) * self.slopes
+        self.gains_db = np.sign(self.depths_db) * np.minimum(amount, np.abs(self.depths_db))
+        return self.gains_db
+
+    def sections(self, sample_rate=None):
+        """(n_dynamic, 6) biquads for the current gains, designed in one call"""
+        return design_peaking_sos(self.freqs, self.gains_db, self.qs, sample_rate or self.sample_rate)
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Multi-session EQ server.
+
+Hosts the equalizer for many concurrent streams in one process. Each client
+connection is one session with its own bands, master gain and filter state.
+Blocks pushed by all sessions are queued and processed once per tick: every
+session with the same block size goes through a single vectorized filter
+call: the compiled per-column kernel when numba is installed, otherwise one
+batched FFT convolution of every stream with its cascade's impulse response
+(see block_model).
+
+Usage:
+    python main.py serve [--host 127.0.0.1] [--port 8765] [--unix PATH] [--tick-ms 0]
+
+Protocol: every message is a 4-byte big-endian header length, a JSON header
+and, if the header has a "payload" byte count, that many bytes of
+little-endian float32 interleaved PCM.
+    {"op": "open", "sample_rate": 48000, "channels": 2}  -> {"ok": true, "session": 1}
+    {"op": "bands", "gains": [3, 0, 0, 0, -2, 0], "master_gain": 1.0}  -> {"ok": true}
+    {"op": "process", "payload": N} + PCM  -> {"ok": true, "frames": F, "payload": N} + PCM
+    {"op": "stats"}  -> {"ok": true, "stats": {...}}
+    {"op": "close"}
+Errors come back as {"ok": false, "error": "..."}.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import struct
+import sys
+import time
+import numpy as np
+from scipy import fft
+import fast_kernels
+from audio_processor import AudioProcessor
+
+HEADER = struct.Struct('!I')
+PCM_DTYPE = np.dtype('<f4')
+MAX_CHANNELS = 64
+
+
+def encode_message(header, payload=b''):
+    """Frame a JSON header and optional binary payload"""
+    if payload:
+        header = dict(header, payload=len(payload))
+    body = json.dumps(header).encode('utf-8')
+    return HEADER.pack(len(body)) + body + payload
+
+
+async def read_message(reader):
+    """Read one framed message; returns (header, payload bytes)"""
+    size, = HEADER.unpack(await reader.readexactly(HEADER.size))
+    header = json.loads(await reader.readexactly(size))
+    payload = await reader.readexactly(header['payload']) if header.get('payload') else b''
+    return header, payload
+
+
+def block_model(sos, active, n_frames):
+    """Block form of a cascade, so many streams with different cascades filter in one batch.
+
+    Over a block of n_frames, a cascade with state s (sosfilt's zi, flattened)
+    is linear in the input x and in s:
+        y = h * x + zero_input @ s,   s_next = transition @ s + input_gain @ x
+    where h is the impulse response truncated to the block, which is exact for
+    outputs inside it. Inactive sections pass the signal through and keep a
+    zero state. Returns the rfft of h padded to 2 * n_frames and, transposed
+    for states held as rows, [zero_input, transition] and input_gain.
+    """
+    # State space of the transposed direct form II cascade: state rows are
+    # [z0, z1] of each section, u is the section input as (state row, x gain)
+    n_states = 2 * len(sos)
+    A = np.zeros((n_states, n_states))
+    B = np.zeros(n_states)
+    u_state, u_input = np.zeros(n_states), 1.0
+    for s in np.flatnonzero(active):
+        b0, b1, b2, _, a1, a2 = sos[s]
+        y_state, y_input = b0 * u_state, b0 * u_input
+        y_state[2 * s] += 1.0
+        A[2 * s] = b1 * u_state - a1 * y_state
+        A[2 * s, 2 * s + 1] += 1.0
+        B[2 * s] = b1 * u_input - a1 * y_input
+        A[2 * s + 1] = b2 * u_state - a2 * y_state
+        B[2 * s + 1] = b2 * u_input - a2 * y_input
+        u_state, u_input = y_state, y_input
+
+    # Powers A^0 .. A^(n_frames - 1), doubling the run each step
+    powers = np.eye(n_states)[None]
+    while len(powers) < n_frames:
+        powers = np.concatenate([powers, powers @ (A @ powers[-1])])
+    powers = powers[:n_frames]
+
+    zero_input = u_state @ powers                       # C A^n
+    impulse = np.empty(n_frames)
+    impulse[0] = u_input                                # D
+    impulse[1:] = zero_input[:-1] @ B                   # C A^(n-1) B
+    transition = A @ powers[-1]                         # A^n_frames
+    input_gain = (powers @ B)[::-1]                     # A^(n_frames-1-k) B
+    return (fft.rfft(impulse, 2 * n_frames), np.ascontiguousarray(np.concatenate([zero_input, transition]).T),
+            input_gain)
+
+
+class Session:
+    """One client stream: its own bands and filter state, processed by the server's batches"""
+
+    def __init__(self, session_id, sample_rate, channels):
+        if not 1 <= channels <= MAX_CHANNELS:
+            raise ValueError(f"channels must be between 1 and {MAX_CHANNELS}, got {channels}")
+        if sample_rate <= 0:
+            raise ValueError(f"sample_rate must be positive, got {sample_rate}")
+        self.id = session_id
+        self.channels = channels
+        self.processor = AudioProcessor(sample_rate=sample_rate)
+        # A band at or above Nyquist designs an unstable section
+        top = max(band['frequency'] for band in self.processor.bands)
+        if top >= sample_rate / 2:
+            raise ValueError(f"sample_rate {sample_rate} is too low for the {top:g} Hz band")
+        self.zi = np.zeros((channels, len(self.processor.bands), 2))  # (column, section, state)
+        self.blocks = 0
+        self._block_model = None  # (cascade, frames, block_model(...)) for the NumPy batch path
+
+    def block_model(self, n_frames):
+        """block_model of the cascade, rebuilt when the cascade or block size changes"""
+        cascade = self.processor._cascade
+        cached = self._block_model
+        if cached is None or cached[0] is not cascade or cached[1] != n_frames:
+            cached = self._block_model = (cascade, n_frames, block_model(cascade[0], cascade[1], n_frames))
+        return cached[2]
+
+    def configure(self, gains=None, master_gain=None):
+        """Apply band gains (in band order) and/or master gain"""
+        if gains is not None:
+            if len(gains) != len(self.processor.bands):
+                raise ValueError(f"Expected {len(self.processor.bands)} band gains, got {len(gains)}")
+            self.processor.set_band_gains([float(gain) for gain in gains])
+        if master_gain is not None:
+            self.processor.set_master_gain(float(master_gain))
+
+
+class BatchEngine:
+    """Runs one block from each of many sessions through their cascades in one go"""
+
+    def __init__(self, use_compiled=None):
+        if use_compiled is None:
+            use_compiled = fast_kernels.NUMBA_AVAILABLE
+        self.use_compiled = bool(use_compiled) and fast_kernels.warm_up()
+        self._stacked = {}  # zi shape -> (models, spectra, state responses, input gains) of the last batch
+
+    def process(self, jobs):
+        """jobs is a list of (session, (frames, channels) block) with equal frames; returns the outputs"""
+        if self.use_compiled:
+            return self._process_compiled(jobs)
+        return self._process_blockwise(jobs)
+
+    def _process_compiled(self, jobs):
+        """Every session's channels become columns of one array for the per-column kernel"""
+        n_frames = len(jobs[0][1])
+        n_columns = sum(session.channels for session, _ in jobs)
+        n_sections = max(len(session.processor.bands) for session, _ in jobs)
+
+        sos = np.zeros((n_columns, n_sections, 6))
+        active = np.zeros((n_columns, n_sections), dtype=bool)
+        zi = np.zeros((n_columns, n_sections, 2))
+        gains = np.empty(n_columns)
+        # Column-major, so the kernel walks each stream's samples contiguously
+        block = np.empty((n_frames, n_columns), order='F')
+
+        column = 0
+        for session, data in jobs:
+            session_sos, session_active, _ = session.processor._cascade
+            columns = slice(column, column + session.channels)
+            sections = len(session_sos)
+            sos[columns, :sections] = session_sos
+            active[columns, :sections] = session_active
+            zi[columns, :sections] = session.zi
+            gains[columns] = session.processor.master_gain
+            block[:, columns] = data
+            column += session.channels
+
+        out = np.empty_like(block, order='F')
+        fast_kernels.biquad_cascade_columns(sos, active, zi, block, out, gains)
+
+        outputs = []
+        column = 0
+        for session, _ in jobs:
+            columns = slice(column, column + session.channels)
+            session.zi[...] = zi[columns, :session.zi.shape[1]]
+            outputs.append(out[:, columns])
+            column += session.channels
+        return outputs
+
+    def _process_blockwise(self, jobs):
+        """NumPy fallback: sessions with the same channel and band counts filter as one batch"""
+        groups = {}
+        for index, (session, _) in enumerate(jobs):
+            groups.setdefault(session.zi.shape, []).append(index)
+        outputs = [None] * len(jobs)
+        for shape, indices in groups.items():
+            for i, output in zip(indices, self._process_block_group([jobs[i] for i in indices], shape)):
+                outputs[i] = output
+        return outputs
+
+    def _process_block_group(self, jobs, shape):
+        """One batched FFT convolution and two batched matrix products for a group of sessions.
+
+        Each session's cascade is in block form (see block_model), built when
+        its bands or block size change. The stacked models are kept while the
+        same sessions keep arriving, so a steady tick only gathers blocks and
+        states.
+        """
+        n_frames = len(jobs[0][1])
+        channels = shape[0]
+        models = [session.block_model(n_frames) for session, _ in jobs]
+        stacked = self._stacked.get(shape)
+        if stacked is None or len(stacked[0]) != len(models) or any(a is not b for a, b in zip(stacked[0], models)):
+            stacked = self._stacked[shape] = (models,
+                                              np.repeat(np.stack([model[0] for model in models]), channels, axis=0),
+                                              np.stack([model[1] for model in models]),
+                                              np.stack([model[2] for model in models]))
+        _, spectra, state_response, input_gain = stacked
+
+        # (sessions, channels, frames): the FFTs run along contiguous rows
+        block = np.stack([np.asarray(data, dtype=np.float64).T for _, data in jobs])
+        out = fft.irfft(fft.rfft(block.reshape(-1, n_frames), 2 * n_frames) * spectra, 2 * n_frames,
+                        overwrite_x=True)[:, :n_frames].reshape(block.shape)
+
+        # States as (sessions, channels, states); inactive sections hold zero state, so the whole zi is used
+        state = np.stack([session.zi.reshape(channels, -1) for session, _ in jobs])
+        response = state @ state_response
+        out += response[..., :n_frames]
+        state = response[..., n_frames:] + block @ input_gain
+        gains = np.array([session.processor.master_gain for session, _ in jobs])
+        out *= gains[:, None, None]
+        np.clip(out, -1.0, 1.0, out=out)
+
+        outputs = []
+        for i, (session, _) in enumerate(jobs):
+            session.zi[...] = state[i].reshape(shape)
+            outputs.append(out[i].T)
+        return outputs
+
+
+class EQServer:
+    def __init__(self, tick_ms=0.0, use_compiled=None):
+        self.tick_interval = tick_ms / 1000.0  # Extra wait per tick to gather more sessions into a batch
+        self.engine = BatchEngine(use_compiled)
+        self.sessions = {}
+        self._ids = itertools.count(1)
+        self._pending = {}  # block size -> [(session, block, future)]
+        self._wakeup = None
+        self._batcher = None
+
+        self.ticks = 0
+        self.blocks = 0
+        self.busy_time = 0.0
+        self.started = time.time()
+
+    async def start(self, host='127.0.0.1', port=8765, unix_path=None):
+        """Start listening; returns the asyncio server"""
+        self._wakeup = asyncio.Event()
+        self._batcher = asyncio.create_task(self._run_batches())
+        if unix_path:
+            return await asyncio.start_unix_server(self._handle_client, path=unix_path)
+        return await asyncio.start_server(self._handle_client, host, port)
+
+    async def stop(self):
+        """Stop the batch loop (close the listener separately)"""
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+
+    def stats(self):
+        """Server-wide counters"""
+        return {'sessions': len(self.sessions), 'ticks': self.ticks, 'blocks': self.blocks,
+                'average_batch': self.blocks / self.ticks if self.ticks else 0.0,
+                'busy_time_s': self.busy_time, 'uptime_s': time.time() - self.started,
+                'compiled_kernel': self.engine.use_compiled}
+
+    async def _run_batches(self):
+        """Batch loop: process everything queued since the last tick, grouped by block size"""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # Yield (or wait tick_ms) so requests that are already readable join this batch
+            await asyncio.sleep(self.tick_interval)
+
+            pending, self._pending = self._pending, {}
+            start = time.perf_counter()
+            for jobs in pending.values():
+                try:
+                    outputs = self.engine.process([(session, block) for session, block, _ in jobs])
+                except Exception as e:
+                    for _, _, future in jobs:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for (session, _, future), output in zip(jobs, outputs):
+                    session.blocks += 1
+                    if not future.done():
+                        future.set_result(output)
+                self.blocks += len(jobs)
+            self.busy_time += time.perf_counter() - start
+            self.ticks += 1
+
+    async def _process(self, session, payload):
+        """Queue one block for the next batch and wait for the result"""
+        block = np.frombuffer(payload, dtype=PCM_DTYPE).reshape(-1, session.channels)
+        if not len(block):
+            return block  # Nothing to filter, and the engines assume at least one frame
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(len(block), []).append((session, block, future))
+        self._wakeup.set()
+        return await future
+
+    async def _handle_client(self, reader, writer):
+        """One connection = one session"""
+        session = None
+        try:
+            while True:
+                header, payload = await read_message(reader)
+                op = header.get('op')
+                reply_payload = b''
+                try:
+                    if op == 'open':
+                        if session is not None:
+                            raise ValueError("Session already open")
+                        session = Session(next(self._ids), int(header.get('sample_rate', 48000)),
+                                          int(header.get('channels', 1)))
+                        self.sessions[session.id] = session
+                        reply = {'ok': True, 'session': session.id}
+                    elif op == 'close':
+                        break
+                    elif op == 'stats':
+                        reply = {'ok': True, 'stats': self.stats()}
+                    elif session is None:
+                        raise ValueError("Open a session first")
+                    elif op == 'bands':
+                        session.configure(header.get('gains'), header.get('master_gain'))
+                        reply = {'ok': True}
+                    elif op == 'process':
+                        output = await self._process(session, payload)
+                        reply = {'ok': True, 'frames': len(output)}
+                        reply_payload = output.astype(PCM_DTYPE).tobytes()
+                    else:
+                        raise ValueError(f"Unknown op: {op}")
+                except Exception as e:
+                    # Bad requests and engine failures alike: report them and keep the session
+                    reply = {'ok': False, 'error': str(e) or type(e).__name__}
+                writer.write(encode_message(reply, reply_payload))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # Client went away
+        finally:
+            if session is not None:
+                self.sessions.pop(session.id, None)
+            writer.close()
+
+
+class EQClient:
+    """Minimal asyncio client for one session"""
+
+    def __init__(self, reader, writer, channels):
+        self.reader = reader
+        self.writer = writer
+        self.channels = channels
+        self.session = None
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=8765, sample_rate=48000, channels=1, unix_path=None):
+        if unix_path:
+            reader, writer = await asyncio.open_unix_connection(unix_path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        client = cls(reader, writer, channels)
+        reply, _ = await client._request({'op': 'open', 'sample_rate': sample_rate, 'channels': channels})
+        client.session = reply['session']
+        return client
+
+    async def _request(self, header, payload=b''):
+        self.writer.write(encode_message(header, payload))
+        await self.writer.drain()
+        reply, reply_payload = await read_message(self.reader)
+        if not reply.get('ok'):
+            raise RuntimeError(reply.get('error', 'request failed'))
+        return reply, reply_payload
+
+    async def set_bands(self, gains=None, master_gain=None):
+        await self._request({'op': 'bands', 'gains': gains, 'master_gain': master_gain})
+
+    async def process(self, block):
+        """Send a (frames, channels) block and return the EQ'd block as float32"""
+        _, payload = await self._request({'op': 'process'}, np.asarray(block, dtype=PCM_DTYPE).tobytes())
+        return np.frombuffer(payload, dtype=PCM_DTYPE).reshape(-1, self.channels)
+
+    async def stats(self):
+        reply, _ = await self._request({'op': 'stats'})
+        return reply['stats']
+
+    async def close(self):
+        self.writer.write(encode_message({'op': 'close'}))
+        await self.writer.drain()
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Multi-session EQ server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', default=None, metavar='PATH', help="Listen on a Unix socket instead of TCP")
+    parser.add_argument('--tick-ms', type=float, default=0.0,
+                        help="Extra wait per tick to gather more sessions into each batch")
+    parser.add_argument('--no-compiled', action='store_true', help="Use the scipy path even if numba is installed")
+    args = parser.parse_args(argv)
+
+    async def serve():
+        server = EQServer(args.tick_ms, use_compiled=False if args.no_compiled else None)
+        listener = await server.start(args.host, args.port, args.unix)
+        where = args.unix or f"{args.host}:{args.port}"
+        print(f"EQ server listening on {where} (compiled kernel: {server.engine.use_compiled})")
+        async with listener:
+            await listener.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print("\nServer stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
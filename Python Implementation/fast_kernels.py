@@ -0,0 +1,141 @@
+"""
+Optional JIT-compiled DSP kernels.
+
+At realtime block sizes (64-128 samples) the per-call overhead of sosfilt,
+the master gain multiply and the clipper dominates the arithmetic. The fused
+kernel runs every active biquad, the master gain and the clipper in a single
+loop over the samples of each channel, carrying the same transposed direct
+form II state as scipy's sosfilt, so the two paths are interchangeable block
+to block.
+
+numba is optional: when it is not installed NUMBA_AVAILABLE is False, the
+kernels are None and callers keep using scipy. numba (and llvmlite behind it)
+is slow to import, so it is only loaded by warm_up(), off the GUI thread; until
+then the kernels are None as well.
+"""
+
+import importlib.util
+import threading
+import numpy as np
+import startup
+
+NUMBA_AVAILABLE = importlib.util.find_spec('numba') is not None
+
+# Compiled by warm_up()
+biquad_cascade = None
+biquad_cascade_columns = None
+
+_compile_lock = threading.Lock()
+
+
+def _biquad_cascade(sos, active, zi, block, out, gain):
+    """Filter (frames, channels) block through the active sections of sos into out.
+
+    zi is the (n_sections, 2, channels) sosfilt state, updated in place; state of
+    inactive sections is cleared. Applies gain and clips to [-1, 1]; returns the
+    number of clipped samples.
+    """
+    n_sections = sos.shape[0]
+    n_frames, n_channels = block.shape
+    clipped = 0
+
+    for s in range(n_sections):
+        if not active[s]:
+            for c in range(n_channels):
+                zi[s, 0, c] = 0.0
+                zi[s, 1, c] = 0.0
+
+    for c in range(n_channels):
+        for n in range(n_frames):
+            x = block[n, c]
+            for s in range(n_sections):
+                if active[s]:
+                    y = sos[s, 0] * x + zi[s, 0, c]
+                    zi[s, 0, c] = sos[s, 1] * x - sos[s, 4] * y + zi[s, 1, c]
+                    zi[s, 1, c] = sos[s, 2] * x - sos[s, 5] * y
+                    x = y
+
+            x *= gain
+            if x > 1.0:
+                x = 1.0
+                clipped += 1
+            elif x < -1.0:
+                x = -1.0
+                clipped += 1
+            out[n, c] = x
+
+    return clipped
+
+
+def _biquad_cascade_columns(sos, active, zi, block, out, gains):
+    """Like _biquad_cascade, but every column has its own cascade and gain.
+
+    Used to run many independent streams in one call: sos is (columns, sections, 6),
+    active (columns, sections), zi (columns, sections, 2) and gains (columns,).
+    """
+    n_frames, n_columns = block.shape
+    n_sections = sos.shape[1]
+    clipped = 0
+
+    for c in range(n_columns):
+        for s in range(n_sections):
+            if not active[c, s]:
+                zi[c, s, 0] = 0.0
+                zi[c, s, 1] = 0.0
+
+        gain = gains[c]
+        for n in range(n_frames):
+            x = block[n, c]
+            for s in range(n_sections):
+                if active[c, s]:
+                    y = sos[c, s, 0] * x + zi[c, s, 0]
+                    zi[c, s, 0] = sos[c, s, 1] * x - sos[c, s, 4] * y + zi[c, s, 1]
+                    zi[c, s, 1] = sos[c, s, 2] * x - sos[c, s, 5] * y
+                    x = y
+
+            x *= gain
+            if x > 1.0:
+                x = 1.0
+                clipped += 1
+            elif x < -1.0:
+                x = -1.0
+                clipped += 1
+            out[n, c] = x
+
+    return clipped
+
+
+def _compile():
+    """Import numba and wrap the kernels; False if numba turns out to be unusable"""
+    global NUMBA_AVAILABLE, biquad_cascade, biquad_cascade_columns
+    with _compile_lock:
+        if biquad_cascade is None and NUMBA_AVAILABLE:
+            try:
+                njit = startup.timed_import('numba').njit
+            except ImportError:
+                NUMBA_AVAILABLE = False
+                return False
+            # cache=True keeps the compiled code on disk, so only the first run pays the JIT
+            biquad_cascade_columns = njit(cache=True, nogil=True)(_biquad_cascade_columns)
+            biquad_cascade = njit(cache=True, nogil=True)(_biquad_cascade)
+    return NUMBA_AVAILABLE
+
+
+def warm_up():
+    """Import numba and compile the kernels for the dtypes the stream uses.
+
+    Call it off the GUI and audio threads. Returns whether the kernels are available.
+    """
+    if not _compile():
+        return False
+    sos = np.zeros((1, 6))
+    sos[0, 0] = sos[0, 3] = 1.0
+    active = np.ones(1, dtype=np.bool_)
+    zi = np.zeros((1, 2, 1))
+    # (input, output) dtypes: float32 or float64 in place, and float32 blocks into the
+    # float64 output process_block allocates when it isn't given one
+    for in_dtype, out_dtype in ((np.float32, np.float32), (np.float64, np.float64), (np.float32, np.float64)):
+        biquad_cascade(sos, active, zi, np.zeros((1, 1), dtype=in_dtype), np.zeros((1, 1), dtype=out_dtype), 1.0)
+    biquad_cascade_columns(sos[None], active[None], np.zeros((1, 1, 2)), np.zeros((1, 1)), np.zeros((1, 1)),
+                           np.ones(1))
+    return True
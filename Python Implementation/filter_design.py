@@ -0,0 +1,254 @@
+"""
+Vectorized biquad design and a bounded coefficient cache.
+
+Coefficients are returned as second-order sections, one row per band:
+[b0, b1, b2, 1, a1, a2], normalized by a0 (the layout scipy's sosfilt uses).
+Every filter type is a single biquad, so a band set of mixed types still
+compiles into one (n_bands, 6) cascade.
+"""
+
+from collections import OrderedDict
+import numpy as np
+
+# Band filter types, indexed by the type codes design_sos takes. highpass/lowpass are
+# second-order Butterworth at Q = 1/sqrt(2); 'dynamic' is a peaking band whose gain
+# follows an envelope detector (see dynamic_eq) and is designed flat at rest.
+FILTER_TYPES = ('peaking', 'low_shelf', 'high_shelf', 'highpass', 'lowpass', 'notch', 'dynamic')
+PEAKING, LOW_SHELF, HIGH_SHELF, HIGHPASS, LOWPASS, NOTCH, DYNAMIC = range(len(FILTER_TYPES))
+
+# Types whose gain_db shapes the response; the others are always in the cascade
+GAIN_TYPES = (PEAKING, LOW_SHELF, HIGH_SHELF, DYNAMIC)
+
+BUTTERWORTH_Q = 1 / np.sqrt(2)
+
+
+# Code -> whether the type has a gain (a lookup table is much cheaper than np.isin per update)
+_HAS_GAIN = np.isin(np.arange(len(FILTER_TYPES)), GAIN_TYPES)
+# Code -> whether the type is Butterworth, i.e. designed at BUTTERWORTH_Q whatever the band's Q
+_BUTTERWORTH = np.isin(np.arange(len(FILTER_TYPES)), (HIGHPASS, LOWPASS))
+_CODES = {name: code for code, name in enumerate(FILTER_TYPES)}
+
+
+def type_codes(types):
+    """Type names (or codes) -> int array of codes"""
+    return np.array([_CODES[t] if isinstance(t, str) else int(t) for t in types], dtype=np.int64)
+
+
+def band_active(gains_db, codes):
+    """Bands that have to run: a gain type with non-zero gain, or any other type"""
+    return (np.asarray(gains_db) != 0) | ~_HAS_GAIN[codes]
+
+
+def rest_gains(gains_db, codes):
+    """Static design gains: dynamic bands are flat until their detector moves them"""
+    return np.where(np.asarray(codes) == DYNAMIC, 0.0, gains_db)
+
+
+def design_peaking_sos(freqs, gains_db, qs, sample_rate):
+    """Design peaking EQ biquads for many bands in one array operation.
+
+    freqs, gains_db and qs broadcast against each other; the result has shape
+    broadcast_shape + (6,).
+    """
+    freqs, gains_db, qs = np.broadcast_arrays(np.asarray(freqs, dtype=np.float64),
+                                              np.asarray(gains_db, dtype=np.float64),
+                                              np.asarray(qs, dtype=np.float64))
+
+    # RBJ cookbook peaking filter
+    A = 10 ** (gains_db / 40)
+    omega = 2 * np.pi * freqs / sample_rate
+    alpha = np.sin(omega) / (2 * qs)
+    cos_omega = np.cos(omega)
+    a0 = 1 + alpha / A
+
+    sos = np.empty(freqs.shape + (6,))
+    sos[..., 0] = (1 + alpha * A) / a0
+    sos[..., 1] = -2 * cos_omega / a0
+    sos[..., 2] = (1 - alpha * A) / a0
+    sos[..., 3] = 1.0
+    sos[..., 4] = sos[..., 1]
+    sos[..., 5] = (1 - alpha / A) / a0
+
+    return sos
+
+
+def design_sos(freqs, gains_db, qs, sample_rate, codes=None):
+    """Design biquads of any FILTER_TYPES mix in one vectorized pass per type present.
+
+    Like design_peaking_sos, all arguments broadcast against each other;
+    codes are type codes (see type_codes) and default to peaking. Gains of
+    dynamic bands are used as given (see rest_gains for the static design);
+    highpass and lowpass bands ignore their Q and are Butterworth.
+    """
+    if codes is None:
+        return design_peaking_sos(freqs, gains_db, qs, sample_rate)
+    freqs, gains_db, qs, codes = np.broadcast_arrays(np.asarray(freqs, dtype=np.float64),
+                                                     np.asarray(gains_db, dtype=np.float64),
+                                                     np.asarray(qs, dtype=np.float64),
+                                                     np.asarray(codes))
+    qs = np.where(_BUTTERWORTH[codes], BUTTERWORTH_Q, qs)
+
+    # RBJ cookbook filters share these terms
+    A = 10 ** (gains_db / 40)
+    omega = 2 * np.pi * freqs / sample_rate
+    alpha = np.sin(omega) / (2 * qs)
+    cos_omega = np.cos(omega)
+
+    coeffs = np.empty(freqs.shape + (6,))
+    for code in np.unique(codes):
+        mask = codes == code
+        coeffs[mask] = _DESIGNERS[code](A[mask], cos_omega[mask], alpha[mask])
+
+    sos = coeffs / coeffs[..., 3:4]
+    sos[..., 3] = 1.0
+    return sos
+
+
+def _peaking(A, c, alpha):
+    return np.stack([1 + alpha * A, -2 * c, 1 - alpha * A, 1 + alpha / A, -2 * c, 1 - alpha / A], axis=-1)
+
+
+def _low_shelf(A, c, alpha):
+    sq = 2 * np.sqrt(A) * alpha
+    return np.stack([A * ((A + 1) - (A - 1) * c + sq), 2 * A * ((A - 1) - (A + 1) * c),
+                     A * ((A + 1) - (A - 1) * c - sq), (A + 1) + (A - 1) * c + sq,
+                     -2 * ((A - 1) + (A + 1) * c), (A + 1) + (A - 1) * c - sq], axis=-1)
+
+
+def _high_shelf(A, c, alpha):
+    sq = 2 * np.sqrt(A) * alpha
+    return np.stack([A * ((A + 1) + (A - 1) * c + sq), -2 * A * ((A - 1) + (A + 1) * c),
+                     A * ((A + 1) + (A - 1) * c - sq), (A + 1) - (A - 1) * c + sq,
+                     2 * ((A - 1) - (A + 1) * c), (A + 1) - (A - 1) * c - sq], axis=-1)
+
+
+def _highpass(A, c, alpha):
+    return np.stack([(1 + c) / 2, -(1 + c), (1 + c) / 2, 1 + alpha, -2 * c, 1 - alpha], axis=-1)
+
+
+def _lowpass(A, c, alpha):
+    return np.stack([(1 - c) / 2, 1 - c, (1 - c) / 2, 1 + alpha, -2 * c, 1 - alpha], axis=-1)
+
+
+def _notch(A, c, alpha):
+    return np.stack([np.ones_like(c), -2 * c, np.ones_like(c), 1 + alpha, -2 * c, 1 - alpha], axis=-1)
+
+
+# Indexed by type code
+_DESIGNERS = (_peaking, _low_shelf, _high_shelf, _highpass, _lowpass, _notch, _peaking)
+
+
+def sos_response(sos, frequencies, sample_rate):
+    """Complex frequency response of biquad sections at the given frequencies (Hz).
+
+    Evaluates H(z) on the unit circle like scipy's freqz; sos has shape (..., 6)
+    and the result has shape (..., len(frequencies)).
+    """
+    sos = np.asarray(sos, dtype=np.float64)[..., None, :]
+    z1 = np.exp(-2j * np.pi * np.asarray(frequencies, dtype=np.float64) / sample_rate)
+    z2 = z1 * z1
+    numerator = sos[..., 0] + sos[..., 1] * z1 + sos[..., 2] * z2
+    denominator = sos[..., 3] + sos[..., 4] * z1 + sos[..., 5] * z2
+    return numerator / denominator
+
+
+def band_response(frequencies, band_freqs, gains_db, qs, sample_rate, codes=None):
+    """Combined response of bands of the given type codes (peaking by default) for many parameter sets at once.
+
+    gains_db may be (n_bands,) or (n_sets, n_bands); band_freqs and qs broadcast
+    against it. Returns a complex array of shape (n_sets, len(frequencies)) or
+    (len(frequencies),) for a single set.
+    """
+    sos = design_sos(band_freqs, gains_db, qs, sample_rate, codes)
+
+    # Accumulate band by band so memory stays at one (n_sets, n_points) array
+    response = sos_response(sos[..., 0, :], frequencies, sample_rate)
+    for k in range(1, sos.shape[-2]):
+        response *= sos_response(sos[..., k, :], frequencies, sample_rate)
+    return response
+
+
+def band_magnitude_db(frequencies, band_freqs, gains_db, qs, sample_rate, codes=None):
+    """Combined magnitude in dB of bands of the given type codes (peaking by default) for many parameter sets at once.
+
+    Same shapes as band_response, but uses the real-valued |H|^2 expansion
+    in cos(w) and cos(2w), which is much cheaper than complex evaluation when
+    only the magnitude is needed.
+    """
+    sos = design_sos(band_freqs, gains_db, qs, sample_rate, codes)[..., None, :]
+    w = 2 * np.pi * np.asarray(frequencies, dtype=np.float64) / sample_rate
+    cos_w, cos_2w = np.cos(w), np.cos(2 * w)
+
+    def power(c0, c1, c2):
+        return (c0 * c0 + c1 * c1 + c2 * c2) + 2 * (c0 * c1 + c1 * c2) * cos_w + 2 * c0 * c2 * cos_2w
+
+    ratio = None
+    for k in range(sos.shape[-3]):
+        band = sos[..., k, :, :]
+        band_ratio = power(band[..., 0], band[..., 1], band[..., 2]) / power(band[..., 3], band[..., 4], band[..., 5])
+        ratio = band_ratio if ratio is None else ratio * band_ratio
+
+    return 10 * np.log10(ratio)
+
+
+class CoefficientCache:
+    """LRU cache of filter sections keyed on (freq, gain, q, sample_rate, type code).
+
+    Parameters a type ignores (gain without a gain, Q of a Butterworth type)
+    are keyed at a fixed value, so they don't duplicate entries.
+    """
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, freqs, gains_db, qs, sample_rate, codes=None):
+        """Return an (n, 6) section array, designing all misses in one vectorized call"""
+        codes = [PEAKING] * len(freqs) if codes is None else codes
+        keys = [(float(f), float(g) if _HAS_GAIN[code] else 0.0, BUTTERWORTH_Q if _BUTTERWORTH[code] else float(q),
+                 float(sample_rate), int(code))
+                for f, g, q, code in zip(freqs, gains_db, qs, codes)]
+        sos = np.empty((len(keys), 6))
+
+        missing = []
+        for i, key in enumerate(keys):
+            row = self._entries.get(key)
+            if row is None:
+                missing.append(i)
+            else:
+                self._entries.move_to_end(key)
+                sos[i] = row
+
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            designed = design_sos([keys[i][0] for i in missing],
+                                  [keys[i][1] for i in missing],
+                                  [keys[i][2] for i in missing],
+                                  sample_rate,
+                                  [keys[i][4] for i in missing])
+            for i, row in zip(missing, designed):
+                sos[i] = row
+                self._entries[keys[i]] = row
+
+            # Evict least recently used entries beyond the bound
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return sos
+
+    def get(self, freq, gain_db, q, sample_rate, code=PEAKING):
+        """Return the (6,) section for a single band"""
+        return self.get_many([freq], [gain_db], [q], sample_rate, [code])[0]
+
+    def clear(self):
+        """Drop all cached coefficients"""
+        self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counts and current size"""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries),
+                'max_entries': self.max_entries}
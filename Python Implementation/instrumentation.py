@@ -0,0 +1,104 @@
+"""
+Lightweight hot-path instrumentation for the realtime DSP path.
+
+AudioProcessor only touches a DSPStats object when instrumentation is enabled
+(processor.stats is None otherwise), so the disabled path costs one attribute
+check per block.
+"""
+
+import bisect
+import json
+import threading
+import time
+import numpy as np
+
+# Fixed per-block processing-time histogram: log-spaced bin edges from 1 us to 1 s
+HISTOGRAM_EDGES_US = np.geomspace(1.0, 1e6, 121)
+# The same edges as floats: record_block bisects them without creating NumPy arrays
+_EDGES_US = HISTOGRAM_EDGES_US.tolist()
+
+
+class DSPStats:
+    def __init__(self, load_smoothing=0.9):
+        self.load_smoothing = load_smoothing  # Weight of history in the smoothed DSP load
+        self._lock = threading.Lock()  # Only taken by reset/snapshot, never per block
+        self.reset()
+
+    def reset(self):
+        """Clear all counters"""
+        with self._lock:
+            # One underflow bin below the first edge and one overflow bin above the last
+            self.histogram = np.zeros(len(HISTOGRAM_EDGES_US) + 1, dtype=np.int64)
+            self.blocks = 0
+            self.busy_time = 0.0
+            self.audio_time = 0.0
+            self.max_block_time = 0.0
+            self.load = 0.0
+            self.xruns = 0
+            self.clipped_samples = 0
+            self.coeff_updates = 0
+            self.coeff_update_time = 0.0
+            self.started = time.time()
+
+    def record_block(self, elapsed, frames, sample_rate):
+        """Account one processed block taking elapsed seconds"""
+        self.histogram[bisect.bisect_left(_EDGES_US, elapsed * 1e6)] += 1
+        self.blocks += 1
+        self.busy_time += elapsed
+        duration = frames / sample_rate
+        self.audio_time += duration
+        if elapsed > self.max_block_time:
+            self.max_block_time = elapsed
+        if duration > 0:
+            self.load = self.load * self.load_smoothing + (elapsed / duration) * (1.0 - self.load_smoothing)
+
+    def record_clipping(self, count):
+        """Count samples that hit the output clipper"""
+        self.clipped_samples += int(count)
+
+    def record_xrun(self, count=1):
+        """Count a stream underflow/overflow"""
+        self.xruns += count
+
+    def record_coeff_update(self, elapsed):
+        """Account time spent redesigning coefficients"""
+        self.coeff_updates += 1
+        self.coeff_update_time += elapsed
+
+    def dsp_load_percent(self):
+        """Smoothed processing time as a percentage of the audio block duration"""
+        return self.load * 100.0
+
+    def _percentile_us(self, histogram, fraction):
+        """Upper bin edge below which the given fraction of blocks fall"""
+        total = histogram.sum()
+        if total == 0:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(histogram), fraction * total))
+        return float(HISTOGRAM_EDGES_US[min(index, len(HISTOGRAM_EDGES_US) - 1)])
+
+    def snapshot(self):
+        """Current counters as a plain dictionary"""
+        with self._lock:
+            histogram = self.histogram.copy()
+            return {
+                'uptime_s': time.time() - self.started,
+                'blocks': self.blocks,
+                'dsp_load_percent': self.dsp_load_percent(),
+                'average_load_percent': self.busy_time / self.audio_time * 100.0 if self.audio_time else 0.0,
+                'block_time_max_us': self.max_block_time * 1e6,
+                'block_time_p50_us': self._percentile_us(histogram, 0.5),
+                'block_time_p99_us': self._percentile_us(histogram, 0.99),
+                'block_time_histogram': {
+                    'edges_us': HISTOGRAM_EDGES_US.tolist(),
+                    'counts': histogram.tolist(),
+                },
+                'xruns': self.xruns,
+                'clipped_samples': self.clipped_samples,
+                'coeff_updates': self.coeff_updates,
+                'coeff_update_time_ms': self.coeff_update_time * 1e3,
+            }
+
+    def to_json(self, **kwargs):
+        """Snapshot serialized as JSON"""
+        return json.dumps(self.snapshot(), **kwargs)
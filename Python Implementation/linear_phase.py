@@ -0,0 +1,188 @@
+"""
+Linear-phase EQ mode.
+
+The combined magnitude response of all bands is turned into a symmetric FIR
+(frequency sampling with scipy's firwin2) and applied with uniformly
+partitioned overlap-save FFT convolution. The FIR is rebuilt on a background
+thread whenever band settings change and swapped in at a partition boundary.
+
+Latency is the partition size plus the FIR's group delay, (n_taps - 1) / 2.
+"""
+
+import threading
+import numpy as np
+from scipy import signal
+from filter_design import sos_response
+
+
+def design_linear_phase_fir(sos, sample_rate, n_taps=4095):
+    """Symmetric (type I) FIR matching the magnitude response of an SOS cascade"""
+    if n_taps % 2 == 0:
+        n_taps += 1  # Odd length gives an integer group delay
+
+    n_freqs = 1 + 2 ** int(np.ceil(np.log2(n_taps)))
+    frequencies = np.linspace(0.0, sample_rate / 2, n_freqs)
+    magnitude = np.abs(np.prod(sos_response(sos, frequencies, sample_rate), axis=0)) if len(sos) else np.ones(n_freqs)
+
+    return signal.firwin2(n_taps, frequencies, magnitude, nfreqs=n_freqs, window='blackman', fs=sample_rate)
+
+
+class PartitionedConvolver:
+    """Uniformly partitioned overlap-save convolution with carried state.
+
+    Accepts blocks of any length; output is delayed by partition_size samples.
+    """
+
+    def __init__(self, fir, channels, partition_size=512):
+        self.partition_size = partition_size
+        self.channels = channels
+
+        B = partition_size
+        self._input = np.zeros((B, channels))           # Partition being filled
+        self._output = np.zeros((B, channels))          # Last convolved partition
+        self._fill = 0
+        self._window = np.zeros((2 * B, channels))      # Previous + current partition
+        self._accumulator = np.zeros((B + 1, channels), dtype=np.complex128)
+        self._index = 0
+        self.set_fir(fir)
+
+    def set_fir(self, fir):
+        """Swap in a new FIR (takes effect at the next partition boundary)"""
+        B = self.partition_size
+        n_parts = max(1, int(np.ceil(len(fir) / B)))
+        padded = np.zeros(n_parts * B)
+        padded[:len(fir)] = fir
+        spectra = np.fft.rfft(padded.reshape(n_parts, B), n=2 * B, axis=1)
+
+        # Doubled so the partitions for any delay-line position are one reversed slice (see _convolve)
+        doubled = np.concatenate([spectra, spectra])
+
+        if getattr(self, '_n_parts', None) != n_parts:
+            self._delay_line = np.zeros((n_parts, B + 1, self.channels), dtype=np.complex128)
+            self._index = 0
+            self._n_parts = n_parts
+        self._spectra = doubled
+
+    def reset(self):
+        """Clear all history"""
+        self._input.fill(0)
+        self._output.fill(0)
+        self._window.fill(0)
+        self._delay_line.fill(0)
+        self._fill = 0
+
+    def process(self, block, out):
+        """Convolve a (frames, channels) block into out"""
+        B = self.partition_size
+        n = len(block)
+        position = 0
+        while position < n:
+            take = min(B - self._fill, n - position)
+            self._input[self._fill:self._fill + take] = block[position:position + take]
+            out[position:position + take] = self._output[self._fill:self._fill + take]
+            self._fill += take
+            position += take
+            if self._fill == B:
+                self._convolve()
+                self._fill = 0
+        return out
+
+    def _convolve(self):
+        """Overlap-save step for one full partition"""
+        B = self.partition_size
+        P = self._n_parts
+        i = self._index
+
+        self._window[:B] = self._window[B:]
+        self._window[B:] = self._input
+        self._delay_line[i] = np.fft.rfft(self._window, axis=0)
+
+        # sum_p H[p] * X[i - p]: the delay line is circular, so pair it with the
+        # partition spectra in reverse order starting at the newest entry
+        spectra = self._spectra[i + P:i:-1]
+        np.einsum('pf,pfc->fc', spectra, self._delay_line, out=self._accumulator)
+        self._output[:] = np.fft.irfft(self._accumulator, n=2 * B, axis=0)[B:]
+
+        self._index = (i + 1) % P
+
+
+class LinearPhaseEQ:
+    """Linear-phase counterpart of the IIR cascade, rebuilt in the background"""
+
+    def __init__(self, n_taps=4095, partition_size=512):
+        self.n_taps = n_taps | 1
+        self.partition_size = partition_size
+        self.fir = None
+        self._convolver = None
+        self._generation = 0  # Bumped after each new FIR is published
+        self._applied = 0     # Generation the audio thread's convolver uses
+        self._request = None
+        self._wakeup = threading.Event()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="LinearPhaseEQ", daemon=True)
+        self._thread.start()
+
+    @property
+    def latency_samples(self):
+        return self.partition_size + (self.n_taps - 1) // 2
+
+    def request_rebuild(self, sos, sample_rate):
+        """Ask the background thread to redesign the FIR for new settings"""
+        self._request = (sos, sample_rate)
+        self._wakeup.set()
+
+    def rebuild_now(self, sos, sample_rate):
+        """Design the FIR synchronously (for offline use)"""
+        self.fir = design_linear_phase_fir(sos, sample_rate, self.n_taps)
+        self._generation += 1
+
+    def _run(self):
+        """Background designer: only the newest request is built"""
+        while self._running:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            request, self._request = self._request, None
+            if request is None:
+                continue
+            # Publish the FIR before the generation so the audio thread never sees a stale one
+            self.fir = design_linear_phase_fir(request[0], request[1], self.n_taps)
+            self._generation += 1
+
+    def stop(self):
+        """Stop the background designer"""
+        self._running = False
+        self._wakeup.set()
+
+    def reset(self):
+        """Clear convolution history (start of a new stream)"""
+        if self._convolver is not None:
+            self._convolver.reset()
+
+    def process(self, block):
+        """Convolve one block; returns a new (frames, ...) array delayed by latency_samples"""
+        frames = block.reshape(len(block), -1)
+        channels = frames.shape[1]
+
+        generation = self._generation
+        if self._convolver is None or self._convolver.channels != channels:
+            fir = self.fir
+            if fir is None:
+                # First block before the initial design finished: unity, delayed like the FIR
+                fir = np.zeros(self.n_taps)
+                fir[(self.n_taps - 1) // 2] = 1.0
+            self._convolver = PartitionedConvolver(fir, channels, self.partition_size)
+            self._applied = generation
+        elif generation != self._applied:
+            self._convolver.set_fir(self.fir)
+            self._applied = generation
+
+        out = np.empty(frames.shape)
+        self._convolver.process(frames, out)
+        return out.reshape(block.shape)
+
+    def process_offline(self, audio_data):
+        """Zero-latency offline convolution: output aligned with the input"""
+        delay = (self.n_taps - 1) // 2
+        frames = audio_data.reshape(len(audio_data), -1)
+        filtered = signal.oaconvolve(frames, self.fir[:, None], axes=0)
+        return filtered[delay:delay + len(frames)].reshape(audio_data.shape)
@@ -10,17 +10,19 @@ Features:
 - Frequency response visualization
 - Master gain control
 - Individual band reset and global reset
+- Headless batch rendering of whole directories (python main.py render)
 
 Author: DSP Audio Equalizer
 """
 
-import tkinter as tk
-from audio_gui import AudioEqualizerGUI
+import startup
+import argparse
+import importlib.util
 import sys
 import os
 
 def check_dependencies():
-    """Check if all required dependencies are installed"""
+    """Check if all required dependencies are installed (without importing them)"""
     required_packages = [
         'numpy', 'scipy', 'matplotlib', 'sounddevice', 'librosa'
     ]
@@ -28,9 +30,7 @@ def check_dependencies():
     missing_packages = []
     
     for package in required_packages:
-        try:
-            __import__(package)
-        except ImportError:
+        if importlib.util.find_spec(package) is None:
             missing_packages.append(package)
     
     if missing_packages:
@@ -45,6 +45,22 @@ def check_dependencies():
 
 def main():
     """Main application entry point"""
+    # Headless batch rendering: python main.py render PRESET INPUT... -o OUTPUT_DIR
+    if len(sys.argv) > 1 and sys.argv[1] == 'render':
+        from render import main as render_main
+        sys.exit(render_main(sys.argv[2:]))
+    
+    # Multi-session EQ server: python main.py serve [--port 8765]
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        from eq_server import main as serve_main
+        sys.exit(serve_main(sys.argv[2:]))
+    
+    parser = argparse.ArgumentParser(description="Digital Signal Processing Audio Equalizer")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="Print per-import and window-paint timings")
+    args = parser.parse_args()
+    startup.PROFILE = args.profile_startup
+    
     print("Digital Signal Processing Audio Equalizer")
     print("=" * 50)
     
@@ -53,9 +69,18 @@ def main():
         sys.exit(1)
     
     try:
-        # Create and run the GUI application
+        # Create and run the GUI application; matplotlib and librosa load later
+        tk = startup.timed_import('tkinter')
+        startup.timed_import('numpy')
+        startup.timed_import('scipy.signal')
+        startup.timed_import('sounddevice')
+        AudioEqualizerGUI = startup.timed_import('audio_gui').AudioEqualizerGUI
+        
         root = tk.Tk()
         app = AudioEqualizerGUI(root)
+        if startup.PROFILE:
+            root.update()
+            startup.log("window painted")
         
         print("Starting GUI application...")
         print("Features available:")
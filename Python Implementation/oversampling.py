@@ -0,0 +1,68 @@
+"""
+Polyphase oversampling for the EQ and output clipper.
+
+Hard clipping creates harmonics above Nyquist that fold back as aliasing, and
+peaking bands close to Nyquist (the 15 kHz Presence band at 44.1 kHz) are
+cramped by the bilinear transform. Running the cascade and the clipper at 2x
+or 4x the sample rate avoids both. The interpolator only computes the
+factor output phases of each input sample and the decimator only every
+factor-th output, each with carried history, so blocks of any length can be
+streamed.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import signal
+
+
+class Oversampler:
+    def __init__(self, factor, channels, taps_per_phase=32):
+        if factor not in (2, 4):
+            raise ValueError(f"Oversampling factor must be 2 or 4, got {factor}")
+        self.factor = factor
+        self.channels = channels
+        self.taps_per_phase = taps_per_phase
+
+        # One linear-phase lowpass at the base-rate Nyquist serves both directions
+        n_taps = taps_per_phase * factor
+        self.fir = signal.firwin(n_taps, 1.0 / factor, window=('kaiser', 8.0))
+
+        # Phase p of the interpolator uses taps p, p + factor, ...; reversed to pair with
+        # oldest-first history windows. The factor gain restores the level lost to zero stuffing.
+        self._phases = (self.fir * factor).reshape(taps_per_phase, factor).T[:, ::-1].copy()
+        self._reversed_fir = self.fir[::-1].copy()
+
+        self._up_history = np.zeros((taps_per_phase - 1, channels))
+        self._down_history = np.zeros((n_taps - 1, channels))
+
+    @property
+    def latency_samples(self):
+        """Delay of an upsample/downsample round trip at the base rate.
+
+        The two filters delay by n_taps - 1 high-rate samples in total;
+        decimating at the last phase of each input sample makes that a whole
+        number of base-rate samples.
+        """
+        return self.taps_per_phase - 1
+
+    def reset(self):
+        """Clear filter history (start of a new stream)"""
+        self._up_history.fill(0)
+        self._down_history.fill(0)
+
+    def upsample(self, block):
+        """(frames, channels) at the base rate -> (frames * factor, channels) at the high rate"""
+        history = np.concatenate([self._up_history, block])
+        self._up_history[:] = history[len(history) - len(self._up_history):]
+
+        windows = sliding_window_view(history, self.taps_per_phase, axis=0)  # (frames, channels, taps)
+        upsampled = np.einsum('ick,pk->ipc', windows, self._phases)
+        return upsampled.reshape(len(block) * self.factor, self.channels)
+
+    def downsample(self, block):
+        """(frames * factor, channels) at the high rate -> (frames, channels) at the base rate"""
+        history = np.concatenate([self._down_history, block])
+        self._down_history[:] = history[len(history) - len(self._down_history):]
+
+        windows = sliding_window_view(history, len(self.fir), axis=0)[self.factor - 1::self.factor]
+        return windows @ self._reversed_fir
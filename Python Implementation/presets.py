@@ -0,0 +1,162 @@
+"""
+Preset bank with precompiled filter graphs.
+
+A preset is a full band set (name, frequency, gain, Q and filter type per
+band, plus detector settings for dynamic bands) and a master gain. PresetBank stores presets as JSON or NPZ. compile()
+designs a preset's second-order sections and its frequency-response curve
+once, up front, so AudioProcessor.apply_preset only has to swap references
+and the realtime path never redesigns anything on a switch.
+"""
+
+import json
+import os
+import numpy as np
+from dynamic_eq import DYNAMIC_DEFAULTS
+from filter_design import FILTER_TYPES, band_active, design_sos, rest_gains, sos_response, type_codes
+
+# Per-band fields every preset stores
+BAND_FIELDS = ('name', 'frequency', 'gain_db', 'q_factor', 'type')
+
+# Frequency grid of the cached response curve (the one AudioProcessor.get_frequency_response uses)
+RESPONSE_FREQUENCIES = np.logspace(1, 4.3, 1000)
+
+
+def default_bank_path():
+    """Per-user preset bank location (honours XDG_CONFIG_HOME)"""
+    base = os.environ.get('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config')
+    return os.path.join(base, 'dsp-audio-equalizer', 'presets.json')
+
+
+class Preset:
+    def __init__(self, name, bands, master_gain=1.0):
+        self.name = name
+        self.bands = []
+        for band in bands:
+            band_type = band.get('type', 'peaking')
+            if band_type not in FILTER_TYPES:
+                raise ValueError(f"Unknown filter type: {band_type}")
+            entry = {'name': str(band['name']), 'frequency': float(band['frequency']),
+                     'gain_db': float(band['gain_db']), 'q_factor': float(band['q_factor']),
+                     'type': band_type}
+            if band_type == 'dynamic':
+                entry.update((key, float(band.get(key, default))) for key, default in DYNAMIC_DEFAULTS.items())
+            self.bands.append(entry)
+        self.master_gain = float(master_gain)
+
+    @classmethod
+    def from_processor(cls, name, processor):
+        """Capture a processor's current bands and master gain"""
+        return cls(name, processor.bands, processor.master_gain)
+
+    @classmethod
+    def from_dict(cls, name, data):
+        return cls(name, data['bands'], data.get('master_gain', 1.0))
+
+    def to_dict(self):
+        return {'master_gain': self.master_gain, 'bands': [dict(band) for band in self.bands]}
+
+    def compile(self, sample_rate, frequencies=RESPONSE_FREQUENCIES):
+        """Design everything the processor needs to switch to this preset"""
+        return CompiledPreset(self, sample_rate, frequencies)
+
+
+class CompiledPreset:
+    """A preset's cascade, band parameters and response curve for one sample rate"""
+
+    def __init__(self, preset, sample_rate, frequencies=RESPONSE_FREQUENCIES):
+        self.name = preset.name
+        self.sample_rate = sample_rate
+        self.master_gain = preset.master_gain
+
+        freqs = np.array([band['frequency'] for band in preset.bands], dtype=np.float64)
+        gains = np.array([band['gain_db'] for band in preset.bands], dtype=np.float64)
+        qs = np.array([band['q_factor'] for band in preset.bands], dtype=np.float64)
+        codes = type_codes([band['type'] for band in preset.bands])
+        sos = design_sos(freqs, rest_gains(gains, codes), qs, sample_rate, codes)
+        active = band_active(gains, codes)
+
+        # Same layouts AudioProcessor builds in _build_cascade
+        self.cascade = (sos, active, sos[active])
+        self.band_params = (freqs, gains, qs, codes)
+        self.bands = [dict(band, filter_coeffs=(row[:3], row[3:])) for band, row in zip(preset.bands, sos)]
+
+        self.frequencies = np.array(frequencies, dtype=np.float64)
+        self.band_responses = sos_response(sos, self.frequencies, sample_rate)
+        self.total_response = np.prod(self.band_responses, axis=0)
+
+
+class PresetBank:
+    """Named presets with compiled versions cached per sample rate"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.presets = {}
+        self._compiled = {}  # (name, sample_rate) -> CompiledPreset
+
+    def names(self):
+        return list(self.presets)
+
+    def add(self, preset):
+        """Add or replace a preset"""
+        self.presets[preset.name] = preset
+        for key in [key for key in self._compiled if key[0] == preset.name]:
+            del self._compiled[key]
+
+    def remove(self, name):
+        self.presets.pop(name, None)
+        for key in [key for key in self._compiled if key[0] == name]:
+            del self._compiled[key]
+
+    def get(self, name):
+        return self.presets[name]
+
+    def compiled(self, name, sample_rate):
+        """Compiled preset for a sample rate, designed on first use"""
+        key = (name, sample_rate)
+        if key not in self._compiled:
+            self._compiled[key] = self.presets[name].compile(sample_rate)
+        return self._compiled[key]
+
+    def compile_all(self, sample_rate):
+        """Precompile every preset (e.g. right after loading a bank)"""
+        for name in self.presets:
+            self.compiled(name, sample_rate)
+
+    def save(self, path=None):
+        """Write the bank as .npz or JSON (chosen by extension)"""
+        path = path or self.path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if path.endswith('.npz'):
+            arrays = {'names': np.array(self.names())}
+            for i, preset in enumerate(self.presets.values()):
+                arrays[f'{i}.master_gain'] = np.array(preset.master_gain)
+                for field in BAND_FIELDS:
+                    arrays[f'{i}.{field}'] = np.array([band[field] for band in preset.bands])
+                # Detector settings are stored for every band; only dynamic bands read them back
+                for field, default in DYNAMIC_DEFAULTS.items():
+                    arrays[f'{i}.{field}'] = np.array([band.get(field, default) for band in preset.bands])
+            np.savez(path, **arrays)
+        else:
+            with open(path, 'w') as f:
+                json.dump({'presets': {name: preset.to_dict() for name, preset in self.presets.items()}},
+                          f, indent=2)
+        self.path = path
+
+    @classmethod
+    def load(cls, path):
+        """Read a bank written by save()"""
+        bank = cls(path)
+        if path.endswith('.npz'):
+            with np.load(path, allow_pickle=False) as data:
+                for i, name in enumerate(data['names']):
+                    # Banks saved before filter types existed have no type column: those bands are peaking
+                    fields = tuple(field for field in BAND_FIELDS + tuple(DYNAMIC_DEFAULTS) if f'{i}.{field}' in data)
+                    columns = [data[f'{i}.{field}'].tolist() for field in fields]
+                    bands = [dict(zip(fields, values)) for values in zip(*columns)]
+                    bank.add(Preset(str(name), bands, float(data[f'{i}.master_gain'])))
+        else:
+            with open(path) as f:
+                data = json.load(f)
+            for name, preset in data['presets'].items():
+                bank.add(Preset.from_dict(name, preset))
+        return bank
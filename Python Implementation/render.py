@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Headless batch renderer for the audio equalizer.
+
+Applies a preset of band gains to every file in a directory or glob, using a
+process pool sized to the machine. Each file is streamed through the EQ in
+fixed-size blocks, so memory use does not depend on file length.
+
+Usage:
+    python main.py render PRESET INPUT [INPUT ...] -o OUTPUT_DIR [--jobs N]
+
+Preset format (JSON):
+    {"master_gain": 1.0, "bands": {"Bass": 3.0, "Treble": -2.0}}
+or a list of gains in band order:
+    {"bands": [3.0, 0.0, 0.0, 0.0, -2.0, 0.0]}
+or a full band set as saved by the preset bank:
+    {"master_gain": 1.0, "bands": [{"name": "Bass", "frequency": 100, "gain_db": 3.0, "q_factor": 1.0}, ...]}
+A preset bank (.json or .npz from the GUI) works too; pick a preset with --preset-name.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import soundfile as sf
+from audio_io import SAMPLE_FORMATS, AudioReader, AudioWriter
+from audio_processor import AudioProcessor
+from presets import Preset, PresetBank
+
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.ogg', '.aiff', '.aif', '.mp3', '.m4a')
+
+
+def load_preset(path, name=None):
+    """Load a preset from a JSON file, or one preset (the first by default) from a bank"""
+    if path.endswith('.npz'):
+        bank = PresetBank.load(path)
+    else:
+        with open(path) as f:
+            preset = json.load(f)
+        if 'presets' not in preset:
+            if 'bands' not in preset:
+                raise ValueError(f"Preset {path} has no 'bands' entry")
+            return preset
+        bank = PresetBank.load(path)
+
+    if not bank.presets:
+        raise ValueError(f"Preset bank {path} is empty")
+    name = name or bank.names()[0]
+    if name not in bank.presets:
+        raise ValueError(f"No preset named '{name}' in {path}")
+    return bank.get(name).to_dict()
+
+
+def apply_preset(processor, preset):
+    """Apply preset band gains and master gain to a processor"""
+    bands = preset['bands']
+    if isinstance(bands, list) and bands and isinstance(bands[0], dict):
+        # Full band set: compile it and switch in one go
+        processor.apply_preset(Preset.from_dict('render', preset).compile(processor.sample_rate))
+        return
+    if isinstance(bands, dict):
+        names = [name for name, _, _ in processor.get_band_info()]
+        for name, gain_db in bands.items():
+            if name not in names:
+                raise ValueError(f"Unknown band in preset: {name}")
+            processor.update_band_gain(names.index(name), float(gain_db))
+    else:
+        for i, gain_db in enumerate(bands):
+            processor.update_band_gain(i, float(gain_db))
+
+    processor.set_master_gain(float(preset.get('master_gain', 1.0)))
+
+
+def find_input_files(inputs, exclude_dir=None):
+    """Expand directories and glob patterns into a sorted list of audio files
+
+    Nothing below exclude_dir (the output directory) is picked up, so a rerun
+    doesn't render its own earlier output.
+    """
+    exclude = os.path.realpath(exclude_dir) if exclude_dir else None
+
+    def excluded(path):
+        return exclude is not None and os.path.commonpath([os.path.realpath(path), exclude]) == exclude
+
+    files = set()
+    for entry in inputs:
+        if os.path.isdir(entry):
+            for dirpath, dirnames, filenames in os.walk(entry):
+                if excluded(dirpath):
+                    dirnames[:] = []
+                    continue
+                for filename in filenames:
+                    if filename.lower().endswith(AUDIO_EXTENSIONS):
+                        files.add(os.path.join(dirpath, filename))
+        else:
+            files.update(path for path in glob.glob(entry, recursive=True)
+                         if os.path.isfile(path) and not excluded(path))
+    return sorted(files)
+
+
+def render_file(src, dst, preset, block_size=65536, subtype=None, linear_phase_taps=None, zero_phase=False):
+    """Stream one file through the EQ block by block; returns (frames, sample_rate)"""
+    # AudioWriter truncates its file on open, which would destroy the input mid-read
+    if os.path.abspath(dst) == os.path.abspath(src) or (os.path.exists(dst) and os.path.samefile(src, dst)):
+        raise ValueError(f"Output {dst} is the input file")
+
+    with AudioReader(src) as reader:
+        processor = AudioProcessor(sample_rate=reader.samplerate)
+        apply_preset(processor, preset)
+        if linear_phase_taps:
+            processor.set_phase_mode('linear', n_taps=linear_phase_taps)
+        try:
+            processor.reset_state()
+
+            # Keep the source sample format when the output container supports it
+            out_format = os.path.splitext(dst)[1][1:].upper()
+            if subtype is None and reader.subtype and sf.check_format(out_format, reader.subtype):
+                subtype = reader.subtype
+
+            with AudioWriter(dst, reader.samplerate, reader.channels, subtype) as writer:
+                if zero_phase:
+                    # Forward-backward in overlapping chunks; output trails the input by up to a chunk
+                    zero_phase_filter = processor.zero_phase_filter(reader.channels, block_size)
+                    try:
+                        for block in reader.blocks(block_size, dtype='float64'):
+                            writer.write(zero_phase_filter.process(block))
+                        writer.write(zero_phase_filter.flush())
+                    finally:
+                        zero_phase_filter.close()
+                    return reader.frames, reader.samplerate
+
+                # Linear phase delays the stream: drop that much leading output and flush the tail
+                latency = processor.get_latency()
+                skip = latency
+                for block in reader.blocks(block_size, dtype='float64'):
+                    processed = processor.process_block(block)
+                    writer.write(processed[skip:])
+                    skip -= min(skip, len(processed))
+                if latency:
+                    tail = processor.process_block(np.zeros((latency, reader.channels)))
+                    writer.write(tail[skip:])
+        finally:
+            processor.set_phase_mode('minimum')  # Stops the FIR designer thread, even when a write fails
+
+        return reader.frames, reader.samplerate
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py render",
+                                     description="Batch-render audio files through the equalizer")
+    parser.add_argument('preset', help="JSON preset with band gains, or a preset bank")
+    parser.add_argument('--preset-name', default=None, help="Preset to use from a bank (default: the first)")
+    parser.add_argument('inputs', nargs='+', help="Input files, directories or glob patterns")
+    parser.add_argument('-o', '--output-dir', required=True, help="Directory for rendered files")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                        help="Worker processes (default: number of cores)")
+    parser.add_argument('--block-size', type=int, default=65536, help="Frames per processing block")
+    parser.add_argument('--format', choices=['wav', 'flac'], default='wav', help="Output file format")
+    parser.add_argument('--linear-phase', type=int, default=None, metavar='TAPS',
+                        help="Render in linear-phase mode with an FIR of this many taps")
+    parser.add_argument('--zero-phase', action='store_true',
+                        help="Render with zero phase shift (forward-backward filtering)")
+    parser.add_argument('--subtype', default=None,
+                        help=f"Output sample format: {', '.join(SAMPLE_FORMATS)} or a soundfile subtype "
+                             f"such as PCM_24 (default: same as input)")
+    args = parser.parse_args(argv)
+    if args.zero_phase and args.linear_phase:
+        parser.error("--zero-phase and --linear-phase can't be combined")
+
+    try:
+        preset = load_preset(args.preset, args.preset_name)
+    except (OSError, ValueError) as e:
+        print(f"Error loading preset: {e}")
+        return 1
+
+    files = find_input_files(args.inputs, exclude_dir=args.output_dir)
+    if not files:
+        print("No input files found")
+        return 1
+
+    print(f"Rendering {len(files)} files with {args.jobs} workers...")
+
+    start = time.perf_counter()
+    total_seconds = 0.0
+    failed = 0
+
+    # Mirror the input layout below the common root so equal file names don't collide
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(src)) for src in files])
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = {}
+        for src in files:
+            relative = os.path.relpath(os.path.abspath(src), root)
+            dst = os.path.join(args.output_dir, os.path.splitext(relative)[0] + '.' + args.format)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            futures[executor.submit(render_file, src, dst, preset, args.block_size, args.subtype,
+                                     args.linear_phase, args.zero_phase)] = src
+
+        for future in as_completed(futures):
+            src = futures[future]
+            try:
+                frames, sample_rate = future.result()
+                total_seconds += frames / sample_rate
+                print(f"  done: {src}")
+            except Exception as e:
+                failed += 1
+                print(f"  failed: {src}: {e}")
+
+    elapsed = time.perf_counter() - start
+    rendered = len(files) - failed
+    print(f"Rendered {rendered} files ({total_seconds:.1f} s of audio) in {elapsed:.2f} s")
+    print(f"  {rendered / elapsed:.2f} files/sec, real-time factor {elapsed / max(total_seconds, 1e-9):.4f} "
+          f"({total_seconds / elapsed:.1f}x faster than real time)")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
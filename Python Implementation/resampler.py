@@ -0,0 +1,122 @@
+"""
+Streaming polyphase sample-rate conversion.
+
+The EQ runs at one fixed engine rate. Sources at other rates (44.1 kHz files
+on a 48 kHz engine, say) are converted on the fly, block by block, instead of
+resampling whole files up front, and the engine output is converted again
+when the audio device runs at yet another rate.
+
+StreamingResampler converts by a rational factor up/down with a windowed-sinc
+polyphase filter: each output sample only evaluates the one filter phase it
+needs, and input history is carried between calls so block boundaries are
+seamless. ResamplingChain puts a pair of them around an AudioProcessor.
+"""
+
+from fractions import Fraction
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import signal
+
+# quality -> (taps per phase, passband edge as a fraction of the lower Nyquist, Kaiser beta)
+QUALITY_PRESETS = {
+    'fast': (8, 0.80, 5.0),
+    'balanced': (24, 0.90, 8.0),
+    'best': (64, 0.95, 10.0),
+}
+
+
+class StreamingResampler:
+    def __init__(self, from_rate, to_rate, channels, quality='balanced'):
+        if quality not in QUALITY_PRESETS:
+            raise ValueError(f"Unknown resampling quality: {quality}")
+        ratio = Fraction(int(to_rate), int(from_rate))
+        self.up = ratio.numerator
+        self.down = ratio.denominator
+        self.from_rate = from_rate
+        self.to_rate = to_rate
+        self.channels = channels
+        self.quality = quality
+
+        taps_per_phase, passband, beta = QUALITY_PRESETS[quality]
+        # Downsampling needs a proportionally longer filter for the same transition band
+        taps_per_phase = int(np.ceil(taps_per_phase * max(1.0, self.down / self.up)))
+        self.taps_per_phase = taps_per_phase
+
+        # Lowpass at the lower of the two Nyquist rates, designed at up * from_rate
+        cutoff = passband / max(self.up, self.down)
+        fir = signal.firwin(taps_per_phase * self.up, cutoff, window=('kaiser', beta)) * self.up
+
+        # Phase p uses taps p, p + up, ...; reversed to pair with oldest-first history windows
+        self._phases = fir.reshape(taps_per_phase, self.up).T[:, ::-1].copy()
+        self._group_delay = (len(fir) - 1) / 2 / self.up  # In input samples
+        self.reset()
+
+    @property
+    def latency_seconds(self):
+        return self._group_delay / self.from_rate
+
+    def reset(self):
+        """Clear history (start of a new stream)"""
+        self._history = np.zeros((self.taps_per_phase - 1, self.channels))
+        self._consumed = 0  # Input frames seen so far
+        self._produced = 0  # Output frames produced so far
+
+    def process(self, block):
+        """Convert a (frames, channels) block; returns every output frame it completes"""
+        history = np.concatenate([self._history, block])
+        end = self._consumed + len(block)
+
+        # Output m needs input frame (m * down) // up; produce all of those now available
+        last = (end * self.up + self.down - 1) // self.down
+        positions = np.arange(self._produced, last, dtype=np.int64) * self.down
+        newest = positions // self.up - self._consumed  # Window index of each output's newest input
+        phases = positions % self.up
+
+        windows = sliding_window_view(history, self.taps_per_phase, axis=0)
+        output = np.einsum('mck,mk->mc', windows[newest], self._phases[phases])
+
+        self._history = history[len(history) - (self.taps_per_phase - 1):]
+        self._consumed = end
+        self._produced = last
+
+        # Keep the counters small; the pattern of phases repeats every up outputs
+        periods = min(self._consumed // self.down, self._produced // self.up)
+        self._consumed -= periods * self.down
+        self._produced -= periods * self.up
+        return output
+
+
+class ResamplingChain:
+    """source rate -> engine rate (processor.sample_rate) -> device rate around an AudioProcessor.
+
+    Either conversion is skipped when the rates already match. An optional
+    SpectrumAnalyzer is fed the engine-rate input and output of the EQ.
+    """
+
+    def __init__(self, processor, source_rate, device_rate, channels, quality='balanced', analyzer=None):
+        self.processor = processor
+        self.analyzer = analyzer
+        engine_rate = processor.sample_rate
+        self.input = (StreamingResampler(source_rate, engine_rate, channels, quality)
+                      if source_rate != engine_rate else None)
+        self.output = (StreamingResampler(engine_rate, device_rate, channels, quality)
+                       if device_rate != engine_rate else None)
+
+    @property
+    def latency_seconds(self):
+        """Resampling latency (the EQ's own latency is processor.get_latency())"""
+        return sum(stage.latency_seconds for stage in (self.input, self.output) if stage is not None)
+
+    def reset(self):
+        """Clear resampler history (start of a new stream)"""
+        for stage in (self.input, self.output):
+            if stage is not None:
+                stage.reset()
+
+    def process(self, block):
+        """Source-rate (frames, channels) block in, device-rate block out (length varies)"""
+        engine_in = self.input.process(block) if self.input is not None else block
+        engine_out = self.processor.process_block(engine_in)
+        if self.analyzer is not None:
+            self.analyzer.push(engine_in, engine_out)
+        return self.output.process(engine_out) if self.output is not None else engine_out
@@ -0,0 +1,182 @@
+"""
+Lock-free ring buffers and a DSP worker thread for realtime streams.
+
+The PortAudio callback only copies samples into and out of preallocated ring
+buffers; the EQ itself runs on a dedicated thread, so GC pauses or GIL
+contention from the GUI cost latency headroom instead of audible dropouts.
+"""
+
+import threading
+import time
+import numpy as np
+from resampler import ResamplingChain
+
+
+class RingBuffer:
+    """Single-producer, single-consumer ring buffer of (frames, channels) samples.
+
+    The writer only advances the write counter and the reader only advances the
+    read counter, each after its copy is complete, so no lock is needed between
+    one producer thread and one consumer thread.
+    """
+
+    def __init__(self, capacity, channels, dtype=np.float32):
+        self.capacity = capacity
+        self._data = np.zeros((capacity, channels), dtype=dtype)
+        self._written = 0  # Total frames ever written (only the writer changes this)
+        self._read = 0     # Total frames ever read (only the reader changes this)
+
+    def available(self):
+        """Frames ready to be read"""
+        return self._written - self._read
+
+    def space(self):
+        """Frames that can be written without overwriting unread data"""
+        return self.capacity - (self._written - self._read)
+
+    def write(self, frames):
+        """Copy frames in; returns how many fit (the rest are dropped)"""
+        n = min(len(frames), self.space())
+        start = self._written % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = frames[:first]
+        self._data[:n - first] = frames[first:n]
+        self._written += n
+        return n
+
+    def read(self, out):
+        """Copy up to len(out) frames into out; returns how many were available"""
+        n = min(len(out), self.available())
+        start = self._read % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self._data[start:start + first]
+        out[first:n] = self._data[:n - first]
+        self._read += n
+        return n
+
+    def clear(self):
+        """Discard all buffered frames (only safe while neither side is running)"""
+        self._read = self._written
+
+
+class DSPWorker:
+    """Runs an AudioProcessor on its own thread behind a pair of ring buffers.
+
+    Call transfer(indata, outdata) from the stream callback. latency_ms is the
+    extra latency budget: the output ring is primed with that much silence, which
+    is how late the DSP thread may run before the callback underruns.
+
+    If the device runs at device_rate rather than the processor's engine rate,
+    the DSP thread converts to the engine rate and back around the EQ.
+
+    While running, the processor is in realtime mode (see
+    AudioProcessor.prepare_realtime) with gc_mode applied to the collector.
+    """
+
+    def __init__(self, processor, channels, block_size=512, latency_ms=25.0, analyzer=None,
+                 device_rate=None, quality='balanced', gc_mode='freeze'):
+        self.processor = processor
+        self.gc_mode = gc_mode
+        self.analyzer = analyzer  # Optional SpectrumAnalyzer fed with every processed block
+        self.channels = channels
+        self.block_size = block_size
+        self.device_rate = device_rate or processor.sample_rate
+        self.latency_frames = int(np.ceil(latency_ms / 1000.0 * self.device_rate / block_size)) * block_size
+
+        self.chain = None
+        if self.device_rate != processor.sample_rate:
+            self.chain = ResamplingChain(processor, self.device_rate, self.device_rate, channels,
+                                         quality, analyzer)
+
+        capacity = self.latency_frames + 4 * block_size
+        self.input = RingBuffer(capacity, channels)
+        self.output = RingBuffer(capacity, channels)
+
+        # Work blocks for the DSP thread, allocated once
+        self._in_block = np.zeros((block_size, channels), dtype=np.float32)
+        self._out_block = np.zeros((block_size, channels), dtype=np.float32)
+
+        self.underruns = 0  # Callback found too little processed audio
+        self.overruns = 0   # Callback found the input ring full
+        self._running = False
+        self._thread = None
+
+    @property
+    def latency_ms(self):
+        return self.latency_frames / self.device_rate * 1000.0
+
+    def start(self):
+        """Prime the output with the latency budget and start the DSP thread"""
+        self.input.clear()
+        self.output.clear()
+        self.output.write(np.zeros((self.latency_frames, self.channels), dtype=np.float32))
+        self.underruns = 0
+        self.overruns = 0
+        self.processor.reset_state()
+        if self.chain is not None:
+            self.chain.reset()
+        self.processor.prepare_realtime(self.block_size, self.channels, self.gc_mode)
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="DSPWorker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the DSP thread"""
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.processor.release_realtime()
+
+    def transfer(self, indata, outdata):
+        """Stream-callback side: copy input in and processed output out, nothing else"""
+        if self.input.write(indata) < len(indata):
+            self.overruns += 1
+            if self.processor.stats is not None:
+                self.processor.stats.record_xrun()
+
+        n = self.output.read(outdata)
+        if n < len(outdata):
+            outdata[n:].fill(0)
+            self.underruns += 1
+            if self.processor.stats is not None:
+                self.processor.stats.record_xrun()
+
+    def _run(self):
+        """DSP thread: process whole blocks as soon as input and output room allow"""
+        poll_interval = self.block_size / self.device_rate / 4
+        # A resampled block can come out a frame or two longer than it went in
+        room = 2 * self.block_size if self.chain is not None else self.block_size
+
+        while self._running:
+            if self.input.available() >= self.block_size and self.output.space() >= room:
+                self.input.read(self._in_block)
+                if self.chain is not None:
+                    self._run_chain()
+                    continue
+                try:
+                    self.processor.process_block(self._in_block, out=self._out_block)
+                except Exception as e:
+                    print(f"Audio processing error: {e}")
+                    self._out_block.fill(0)  # Output silence on error
+                self.output.write(self._out_block)
+                if self.analyzer is not None:
+                    self.analyzer.push(self._in_block, self._out_block)
+            else:
+                time.sleep(poll_interval)
+
+    def _run_chain(self):
+        """One input block through device -> engine rate, the EQ and back"""
+        try:
+            self.output.write(self.chain.process(self._in_block))
+        except Exception as e:
+            print(f"Audio processing error: {e}")
+            self._out_block.fill(0)  # Output silence on error
+            self.output.write(self._out_block)
+
+    def stats(self):
+        """Counters for monitoring"""
+        return {'underruns': self.underruns, 'overruns': self.overruns,
+                'latency_ms': self.latency_ms,
+                'input_fill': self.input.available(), 'output_fill': self.output.available()}
@@ -0,0 +1,152 @@
+"""
+Live pre/post-EQ spectrum analyzer.
+
+Stream callbacks only push frames into ring buffers. A background thread
+computes Hann-windowed rFFTs over the most recent fft_size samples at a fixed
+frame rate (consecutive frames overlap whenever the hop is shorter than the
+FFT), instead of transforming every hop of the stream, and aggregates the
+bins onto a log-frequency axis. Work arrays are allocated up front; the one
+exception is the rFFT output, since NumPy's FFT has no out= and returns a new
+fft_size/2 + 1 complex array per transform. That happens on the analyzer
+thread, never in a stream callback.
+"""
+
+import threading
+import time
+import numpy as np
+from ring_buffer import RingBuffer
+
+
+class SpectrumAnalyzer:
+    def __init__(self, sample_rate, channels, fft_size=4096, n_bins=160, f_min=20.0, f_max=20000.0,
+                 frame_rate=20.0, averaging=0.5):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.fft_size = fft_size
+        self.frame_rate = frame_rate
+        self.averaging = averaging  # Weight of the previous frame in the smoothed spectrum
+
+        # Log-spaced display bins between f_min and f_max (capped below Nyquist)
+        f_max = min(f_max, sample_rate / 2 * 0.999)
+        edges = np.geomspace(f_min, f_max, n_bins + 1)
+        self.frequencies = np.sqrt(edges[:-1] * edges[1:])
+        self._aggregation = self._build_aggregation(edges)
+
+        # Shared buffers: the stream side writes, the analyzer thread reads
+        capacity = max(fft_size, int(sample_rate / frame_rate)) * 2
+        self.pre_buffer = RingBuffer(capacity, channels)
+        self.post_buffer = RingBuffer(capacity, channels)
+
+        # Preallocated work arrays
+        self._chunk = np.zeros((capacity, channels), dtype=np.float32)
+        self._history = {'pre': np.zeros((fft_size, channels), dtype=np.float32),
+                         'post': np.zeros((fft_size, channels), dtype=np.float32)}
+        self._frame = np.zeros(fft_size)
+        self._window = np.hanning(fft_size)
+        # Window power normalization: a full-scale sine peaks at 0 dBFS before bin averaging
+        self._power_scale = (2.0 / self._window.sum()) ** 2
+        self._power = np.zeros(fft_size // 2 + 1)
+        self._bins = np.zeros(n_bins)
+        self._smoothed = {'pre': np.full(n_bins, 1e-12), 'post': np.full(n_bins, 1e-12)}
+
+        # Double-buffered results; latest is (frame number, pre dB, post dB) for the Tk thread
+        self._outputs = [(np.full(n_bins, -120.0), np.full(n_bins, -120.0)) for _ in range(2)]
+        self.latest = None
+        self.frame_count = 0
+
+        self.cpu_time = 0.0
+        self._started_at = None
+        self._running = False
+        self._thread = None
+
+    def _build_aggregation(self, edges):
+        """(n_fft_bins, n_bins) matrix averaging FFT bins into each log bin.
+
+        Log bins narrower than the FFT resolution take the nearest FFT bin.
+        """
+        fft_freqs = np.fft.rfftfreq(self.fft_size, 1.0 / self.sample_rate)
+        matrix = np.zeros((len(fft_freqs), len(edges) - 1))
+        for j in range(len(edges) - 1):
+            inside = np.nonzero((fft_freqs >= edges[j]) & (fft_freqs < edges[j + 1]))[0]
+            if len(inside) == 0:
+                inside = [np.argmin(np.abs(fft_freqs - np.sqrt(edges[j] * edges[j + 1])))]
+            matrix[inside, j] = 1.0 / len(inside)
+        return matrix
+
+    def push(self, pre, post):
+        """Stream side: copy one block of input and output frames (frames, channels)"""
+        self.pre_buffer.write(pre)
+        self.post_buffer.write(post)
+
+    def start(self):
+        """Start the analyzer thread"""
+        self._running = True
+        self._started_at = time.perf_counter()
+        self.cpu_time = 0.0
+        self._thread = threading.Thread(target=self._run, name="SpectrumAnalyzer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the analyzer thread"""
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def cpu_load(self):
+        """Fraction of one core used by the analyzer thread since start"""
+        if self._started_at is None:
+            return 0.0
+        return self.cpu_time / max(time.perf_counter() - self._started_at, 1e-9)
+
+    def _run(self):
+        """Analyzer thread: one spectrum pair per display frame"""
+        interval = 1.0 / self.frame_rate
+        next_frame = time.perf_counter()
+
+        while self._running:
+            cpu_start = time.thread_time()
+            self._drain('pre', self.pre_buffer)
+            self._drain('post', self.post_buffer)
+
+            pre_db, post_db = self._outputs[self.frame_count % 2]
+            self._analyze('pre', pre_db)
+            self._analyze('post', post_db)
+            self.frame_count += 1
+            self.latest = (self.frame_count, pre_db, post_db)
+            self.cpu_time += time.thread_time() - cpu_start
+
+            next_frame += interval
+            delay = next_frame - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_frame = time.perf_counter()  # Fell behind; don't try to catch up
+
+    def _drain(self, name, buffer):
+        """Move newly pushed frames into the rolling history of the last fft_size frames"""
+        history = self._history[name]
+        n = buffer.read(self._chunk)
+        if n >= self.fft_size:
+            history[:] = self._chunk[n - self.fft_size:n]
+        elif n:
+            history[:-n] = history[n:]
+            history[-n:] = self._chunk[:n]
+
+    def _analyze(self, name, out_db):
+        """Windowed rFFT of the history (downmixed to mono), aggregated to log bins in dBFS"""
+        np.mean(self._history[name], axis=1, out=self._frame)
+        self._frame *= self._window
+        spectrum = np.fft.rfft(self._frame)  # New array each frame (see the module docstring)
+        np.abs(spectrum, out=self._power)
+        np.square(self._power, out=self._power)
+        np.matmul(self._power, self._aggregation, out=self._bins)
+        self._bins *= self._power_scale
+
+        smoothed = self._smoothed[name]
+        smoothed *= self.averaging
+        self._bins *= 1.0 - self.averaging
+        smoothed += self._bins
+        np.maximum(smoothed, 1e-12, out=out_db)
+        np.log10(out_db, out=out_db)
+        out_db *= 10.0
@@ -0,0 +1,43 @@
+"""
+Startup helpers: timed lazy imports for the --profile-startup flag.
+
+Heavy modules (matplotlib, librosa) are imported on demand through
+timed_import so the window can paint before they load.
+"""
+
+import importlib
+import threading
+import time
+
+START_TIME = time.perf_counter()
+
+# Set by main.py when --profile-startup is given
+PROFILE = False
+
+# (module name, seconds, thread name) for every timed import
+IMPORT_TIMINGS = []
+
+
+def elapsed_ms():
+    """Milliseconds since the application started"""
+    return (time.perf_counter() - START_TIME) * 1000
+
+
+def timed_import(name):
+    """Import a module by name, recording how long the import took"""
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    duration = time.perf_counter() - start
+
+    thread_name = threading.current_thread().name
+    IMPORT_TIMINGS.append((name, duration, thread_name))
+    if PROFILE:
+        print(f"[startup] {elapsed_ms():8.1f} ms  import {name:<40} {duration * 1000:8.1f} ms  ({thread_name})")
+
+    return module
+
+
+def log(message):
+    """Print a startup milestone when profiling"""
+    if PROFILE:
+        print(f"[startup] {elapsed_ms():8.1f} ms  {message}")
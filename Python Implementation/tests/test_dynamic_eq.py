@@ -0,0 +1,54 @@
+"""
+Dynamic band checks: above threshold a band moves by the ratio-scaled
+overshoot, limited to its depth; below threshold it stays flat.
+"""
+
+import numpy as np
+import pytest
+from audio_processor import AudioProcessor
+from dynamic_eq import DynamicBands
+
+SAMPLE_RATE = 48000
+BLOCK_SIZE = 1024
+FREQUENCY = 2500.0  # Between FFT bins, so the detector's leakage handling is exercised
+THRESHOLD_DB = -30.0
+RATIO = 4.0
+DEPTH_DB = -12.0
+
+
+def sine(amplitude_db, seconds=1.0, channels=1):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    wave = 10 ** (amplitude_db / 20) * np.sin(2 * np.pi * FREQUENCY * t)
+    return np.repeat(wave[:, None], channels, axis=1)
+
+
+def expected_gain_db(amplitude_db):
+    level_db = amplitude_db - 10 * np.log10(2)  # Mean square of a sine is half its peak squared
+    return -min(max(level_db - THRESHOLD_DB, 0.0) * (1 - 1 / RATIO), -DEPTH_DB)
+
+
+@pytest.mark.parametrize("amplitude_db", [-10.0, -20.0, -25.0, -35.0, -60.0])
+def test_detector_gain_follows_threshold_and_ratio(amplitude_db):
+    bands = DynamicBands([0], [FREQUENCY], [DEPTH_DB], [2.0], [THRESHOLD_DB], [RATIO], [5.0], [100.0], SAMPLE_RATE)
+    signal = sine(amplitude_db)
+    for start in range(0, len(signal), BLOCK_SIZE):
+        gains = bands.update(signal[start:start + BLOCK_SIZE])
+
+    expected = expected_gain_db(amplitude_db)
+    np.testing.assert_allclose(gains, [expected], rtol=0, atol=0.05)
+    if expected == 0.0:
+        assert not gains.any()  # Below threshold the band is exactly flat
+
+
+@pytest.mark.parametrize("amplitude_db", [-20.0, -40.0])
+def test_processor_applies_gain_reduction_only_above_threshold(amplitude_db):
+    processor = AudioProcessor(sample_rate=SAMPLE_RATE)
+    processor.bands = []
+    processor.add_band('Dynamic', FREQUENCY, DEPTH_DB, 2.0, 'dynamic', threshold_db=THRESHOLD_DB, ratio=RATIO)
+    signal = sine(amplitude_db, seconds=2.0, channels=2)
+    output = np.concatenate([processor.process_block(signal[start:start + BLOCK_SIZE])
+                             for start in range(0, len(signal), BLOCK_SIZE)])
+
+    settled = slice(SAMPLE_RATE, None)
+    change_db = 10 * np.log10(np.mean(output[settled] ** 2) / np.mean(signal[settled] ** 2))
+    assert change_db == pytest.approx(expected_gain_db(amplitude_db), abs=0.25)
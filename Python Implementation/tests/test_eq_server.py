@@ -0,0 +1,110 @@
+"""
+EQ server checks: the NumPy block model must match sosfilt with carried state,
+and bad requests or empty blocks get a reply instead of breaking the session.
+"""
+
+import asyncio
+import numpy as np
+import pytest
+from scipy.signal import sosfilt
+import fast_kernels
+from audio_processor import AudioProcessor
+from eq_server import BatchEngine, EQClient, EQServer, Session, block_model
+
+SAMPLE_RATE = 48000
+GAINS = [4.0, -3.0, 2.0, 0.0, -5.0, 3.0]
+
+ENGINES = [pytest.param(False, id="numpy"),
+           pytest.param(True, id="compiled",
+                        marks=pytest.mark.skipif(not fast_kernels.NUMBA_AVAILABLE, reason="numba is not installed"))]
+
+
+def apply_block_model(model, zi, block):
+    """One block through block_model's (spectrum, [zero_input, transition], input_gain) for one column"""
+    spectrum, state_response, input_gain = model
+    n_frames = len(block)
+    out = np.fft.irfft(np.fft.rfft(block, 2 * n_frames) * spectrum, 2 * n_frames)[:n_frames]
+    response = zi.reshape(-1) @ state_response
+    return out + response[:n_frames], response[n_frames:] + block @ input_gain
+
+
+@pytest.mark.parametrize("n_frames", [1, 7, 256, 1000])
+def test_block_model_matches_sosfilt(n_frames):
+    processor = AudioProcessor(sample_rate=SAMPLE_RATE)
+    processor.set_band_gains(GAINS)
+    sos, active, active_sos = processor._cascade
+    model = block_model(sos, active, n_frames)
+
+    signal = np.random.default_rng(2).standard_normal(6 * n_frames)
+    zi = np.zeros(2 * len(sos))
+    zi_reference = np.zeros((len(active_sos), 2))
+    for start in range(0, len(signal), n_frames):
+        block = signal[start:start + n_frames]
+        out, zi = apply_block_model(model, zi, block)
+        expected, zi_reference = sosfilt(active_sos, block, zi=zi_reference)
+
+        np.testing.assert_allclose(out, expected, rtol=0, atol=1e-9)
+        states = zi.reshape(len(sos), 2)
+        np.testing.assert_allclose(states[active], zi_reference, rtol=0, atol=1e-9)
+        assert not states[~active].any()  # Inactive sections keep a zero state
+
+
+def test_numpy_batch_matches_sosfilt():
+    engine = BatchEngine(use_compiled=False)
+    sessions = [Session(1, SAMPLE_RATE, 2), Session(2, SAMPLE_RATE, 2), Session(3, SAMPLE_RATE, 1)]
+    sessions[0].configure(GAINS, 1.5)
+    sessions[1].configure([-2.0, 0.0, 5.0, 1.0, 0.0, -4.0])
+    rng = np.random.default_rng(3)
+    references = [np.zeros((len(session.processor._cascade[2]), 2, session.channels)) for session in sessions]
+
+    for i in range(6):
+        if i == 3:
+            sessions[1].configure([0.0, 0.0, 5.0, 1.0, 6.0, -4.0])  # New cascade mid-stream
+            references[1] = np.zeros((len(sessions[1].processor._cascade[2]), 2, 2))
+            sessions[1].zi[...] = 0.0
+        blocks = [(0.5 * rng.standard_normal((512, session.channels))).astype(np.float32) for session in sessions]
+        outputs = engine.process(list(zip(sessions, blocks)))
+
+        for k, (session, block, output) in enumerate(zip(sessions, blocks, outputs)):
+            filtered = block.astype(np.float64)  # A flat cascade has no active sections and passes through
+            if len(references[k]):
+                filtered, references[k] = sosfilt(session.processor._cascade[2], filtered, axis=0, zi=references[k])
+            expected = np.clip(filtered * session.processor.master_gain, -1.0, 1.0)
+            np.testing.assert_allclose(output, expected, rtol=0, atol=1e-9)
+
+
+def run_with_client(check, use_compiled=False):
+    async def scenario():
+        server = EQServer(use_compiled=use_compiled)
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            await check(port)
+        finally:
+            listener.close()
+            await listener.wait_closed()
+            await server.stop()
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("use_compiled", ENGINES)
+def test_empty_block_and_bad_requests_get_replies(use_compiled):
+    async def check(port):
+        client = await EQClient.connect(port=port, channels=2)
+        empty = await client.process(np.zeros((0, 2), dtype=np.float32))
+        assert empty.shape == (0, 2)
+        with pytest.raises(RuntimeError, match="band gains"):
+            await client.set_bands([1.0, 2.0])
+        block = np.full((64, 2), 0.25, dtype=np.float32)
+        assert (await client.process(block)).shape == block.shape  # The session survived both
+        await client.close()
+    run_with_client(check, use_compiled)
+
+
+@pytest.mark.parametrize("sample_rate, channels, message", [(48000, 0, "channels"), (48000, 1000, "channels"),
+                                                            (0, 2, "sample_rate"), (16000, 2, "too low")])
+def test_open_validates_stream_format(sample_rate, channels, message):
+    async def check(port):
+        with pytest.raises(RuntimeError, match=message):
+            await EQClient.connect(port=port, sample_rate=sample_rate, channels=channels)
+    run_with_client(check)
@@ -0,0 +1,39 @@
+"""
+Filter type checks: highpass and lowpass bands are second-order Butterworth.
+"""
+
+import numpy as np
+import pytest
+from scipy import signal
+from audio_processor import AudioProcessor
+from filter_design import HIGHPASS, LOWPASS, CoefficientCache, design_sos
+
+
+@pytest.mark.parametrize("sample_rate", [44100, 48000, 96000])
+@pytest.mark.parametrize("frequency", [20.0, 100.0, 1000.0, 8000.0])
+@pytest.mark.parametrize("q", [0.3, 1.0, 5.0])
+@pytest.mark.parametrize("code, btype", [(HIGHPASS, 'highpass'), (LOWPASS, 'lowpass')])
+def test_highpass_lowpass_match_butter(code, btype, q, frequency, sample_rate):
+    # Q and gain are ignored: the band is butter(2) whatever they are
+    sos = design_sos([frequency], [6.0], [q], sample_rate, [code])
+    expected = signal.butter(2, frequency, btype, fs=sample_rate, output='sos')
+    np.testing.assert_allclose(sos, expected, rtol=0, atol=1e-12)
+
+
+def test_processor_highpass_is_flat_above_cutoff():
+    processor = AudioProcessor(sample_rate=48000)
+    processor.bands = []
+    processor.add_band('HP', 100.0, 0.0, 1.0, 'highpass')
+
+    expected = signal.butter(2, 100.0, 'highpass', fs=48000, output='sos')
+    np.testing.assert_allclose(processor._cascade[0], expected, rtol=0, atol=1e-12)
+    _, response = signal.sosfreqz(processor._cascade[0], worN=np.geomspace(20, 20000, 500), fs=48000)
+    assert 20 * np.log10(np.abs(response)).max() < 1e-9  # No resonant bump near the cutoff
+
+
+def test_cache_keys_ignore_unused_parameters():
+    cache = CoefficientCache()
+    first = cache.get(100.0, 0.0, 0.7, 48000, HIGHPASS)
+    second = cache.get(100.0, 6.0, 2.0, 48000, HIGHPASS)
+    np.testing.assert_array_equal(first, second)
+    assert cache.stats()['entries'] == 1
@@ -0,0 +1,66 @@
+"""
+Preset switching: a block processed at any point during apply_preset runs
+entirely on the old preset or entirely on the new one.
+"""
+
+import copy
+import numpy as np
+import pytest
+from audio_processor import AudioProcessor
+from presets import Preset
+
+SAMPLE_RATE = 48000
+
+# Everything apply_preset writes that the audio thread reads
+PUBLISHED = ('_crossfade_request', 'bands', 'master_gain', '_cascade', '_band_params', '_dynamics')
+
+
+def make_preset(name, gains, master_gain):
+    bands = [dict(band, gain_db=gain) for band, gain in zip(AudioProcessor(sample_rate=SAMPLE_RATE).bands, gains)]
+    return Preset(name, bands, master_gain).compile(SAMPLE_RATE)
+
+
+class InterleavedProcessor(AudioProcessor):
+    """Processes a block, from rest, on a snapshot taken before each published write"""
+
+    def __init__(self, block, **kwargs):
+        super().__init__(**kwargs)
+        self.probe_block = block
+        self.probing = False
+        self.probes = []
+
+    def __setattr__(self, name, value):
+        if name in PUBLISHED and getattr(self, 'probing', False):
+            object.__setattr__(self, 'probing', False)
+            snapshot = copy.deepcopy(self)
+            snapshot.reset_state()
+            self.probes.append((name, snapshot.process_block(self.probe_block)))
+            object.__setattr__(self, 'probing', True)
+        object.__setattr__(self, name, value)
+
+
+@pytest.mark.parametrize("smoothing_ms", [0, 20])
+@pytest.mark.parametrize("crossfade_ms", [0, 1])
+def test_switch_never_mixes_gain_and_cascade(crossfade_ms, smoothing_ms):
+    old = make_preset('old', [6.0, 0.0, 0.0, 0.0, 0.0, -6.0], 0.5)
+    new = make_preset('new', [-6.0, 3.0, 0.0, 6.0, 0.0, 0.0], 1.5)
+    block = 0.2 * np.random.default_rng(4).standard_normal((256, 2))
+    expected = {}
+    for preset in (old, new):
+        reference = AudioProcessor(sample_rate=SAMPLE_RATE)
+        reference.apply_preset(preset)
+        expected[preset.name] = reference.process_block(block)
+
+    processor = InterleavedProcessor(block, sample_rate=SAMPLE_RATE)
+    processor.set_smoothing(smoothing_ms)
+    processor.apply_preset(old)
+    processor.probing = True
+    processor.apply_preset(new, crossfade_ms=crossfade_ms)
+    processor.probing = False
+
+    assert [name for name, _ in processor.probes] == list(PUBLISHED)
+    settled = slice(64, None)  # Past a 1 ms fade
+    for name, output in processor.probes:
+        matches = [preset for preset, reference in expected.items()
+                   if np.allclose(output[settled], reference[settled], rtol=0, atol=1e-9)]
+        assert matches, f"block processed before writing {name} mixes the two presets"
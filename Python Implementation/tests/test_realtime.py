@@ -0,0 +1,186 @@
+"""
+Realtime path checks: the prepared streaming path must not allocate per block,
+and the compiled kernel must match scipy's sosfilt block for block.
+
+Run with: python -m pytest tests
+"""
+
+import tracemalloc
+import numpy as np
+import pytest
+from scipy.signal import sosfilt
+import audio_processor
+import fast_kernels
+from audio_processor import AudioProcessor
+
+SAMPLE_RATE = 48000
+BLOCK_SIZE = 2048
+CHANNELS = 2
+GAINS = [4.0, -3.0, 2.0, 0.0, -5.0, 3.0]  # One band at 0 dB, so an inactive section is in the cascade
+
+# Transient Python scalars and array views the hot path creates and frees are a
+# few hundred bytes. Any work array is at least one channel of a block: with
+# 2048-frame float32 blocks that is 8 KiB, a clip mask 4 KiB.
+PEAK_LIMIT = 4096
+
+KERNELS = [pytest.param(False, id="scipy"),
+           pytest.param(True, id="compiled",
+                        marks=pytest.mark.skipif(not fast_kernels.NUMBA_AVAILABLE, reason="numba is not installed"))]
+
+
+def make_blocks(n_blocks, dtype=np.float32, level=0.5, seed=0):
+    """Noise loud enough that the clipper engages now and then"""
+    rng = np.random.default_rng(seed)
+    return (level * rng.standard_normal((n_blocks, BLOCK_SIZE, CHANNELS))).astype(dtype)
+
+
+def make_processor(compiled, smoothing_ms=0, instrumentation=False):
+    processor = AudioProcessor(sample_rate=SAMPLE_RATE)
+    processor.set_band_gains(GAINS)
+    assert processor.set_compiled_kernel(compiled) == compiled
+    processor.set_smoothing(smoothing_ms)
+    if instrumentation:
+        processor.enable_instrumentation()
+    processor.prepare_realtime(BLOCK_SIZE, CHANNELS, gc_mode=None)
+    return processor
+
+
+@pytest.mark.parametrize("instrumentation", [False, True], ids=["plain", "instrumented"])
+@pytest.mark.parametrize("smoothing_ms", [0, 20])
+@pytest.mark.parametrize("compiled", KERNELS)
+def test_prepared_blocks_do_not_allocate(compiled, smoothing_ms, instrumentation):
+    processor = make_processor(compiled, smoothing_ms, instrumentation)
+    blocks = make_blocks(200)
+    out = np.empty((BLOCK_SIZE, CHANNELS), dtype=np.float32)
+    for block in blocks[:20]:
+        processor.process_block(block, out=out)  # Warm up: first-call caches and settled ramps
+
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        for block in blocks:
+            processor.process_block(block, out=out)
+        after_first, peak = tracemalloc.get_traced_memory()
+        for block in blocks:
+            processor.process_block(block, out=out)
+        after_second = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+        processor.release_realtime()
+
+    assert peak - base < PEAK_LIMIT, f"peak {peak - base} B while processing prepared blocks"
+    # A leak of even one small object per block would grow by more than a byte per block; the
+    # readings themselves keep a couple of ints alive
+    growth = after_second - after_first
+    assert growth < len(blocks), f"memory grew by {growth} B over {len(blocks)} blocks"
+
+
+@pytest.mark.parametrize("compiled", KERNELS)
+def test_prepared_path_matches_normal_path(compiled):
+    blocks = make_blocks(20)
+    prepared = make_processor(compiled)
+    normal = AudioProcessor(sample_rate=SAMPLE_RATE)
+    normal.set_band_gains(GAINS)
+    normal.set_compiled_kernel(compiled)
+
+    out = np.empty((BLOCK_SIZE, CHANNELS), dtype=np.float32)
+    for block in blocks:
+        prepared.process_block(block, out=out)
+        np.testing.assert_allclose(out, normal.process_block(block), atol=1e-6)
+    prepared.release_realtime()
+
+
+
+@pytest.mark.skipif(audio_processor._sosfilt is None, reason="this SciPy has no private in-place sosfilt")
+@pytest.mark.parametrize("smoothing_ms", [0, 20])
+def test_prepared_path_without_private_sosfilt(monkeypatch, smoothing_ms):
+    # Without SciPy's private core the prepared path has to hand blocks to the allocating path, unchanged
+    blocks = make_blocks(20)
+    private = make_processor(False, smoothing_ms)
+    out = np.empty((BLOCK_SIZE, CHANNELS), dtype=np.float32)
+    expected = []
+    for block in blocks:
+        expected.append(private.process_block(block, out=out).copy())
+    private.release_realtime()
+
+    monkeypatch.setattr(audio_processor, '_sosfilt', None)
+    fallback = make_processor(False, smoothing_ms)
+    for block, reference in zip(blocks, expected):
+        assert fallback._process_realtime(block, out) is None
+        np.testing.assert_allclose(fallback.process_block(block, out=out), reference, rtol=0, atol=1e-6)
+    fallback.release_realtime()
+
+def sosfilt_block(sos, active, zi, block, gain):
+    """Reference for one block: sosfilt over the active sections with carried state, then gain and clip"""
+    zi[~active] = 0.0
+    filtered, zi[active] = sosfilt(sos[active], block, axis=0, zi=zi[active])
+    filtered *= gain
+    clipped = np.count_nonzero(np.abs(filtered) > 1.0)
+    return np.clip(filtered, -1.0, 1.0), clipped
+
+
+@pytest.mark.skipif(not fast_kernels.NUMBA_AVAILABLE, reason="numba is not installed")
+@pytest.mark.parametrize("dtype, atol", [(np.float64, 1e-12), (np.float32, 1e-6)])
+def test_compiled_kernel_matches_sosfilt(dtype, atol):
+    assert fast_kernels.warm_up()
+    processor = AudioProcessor(sample_rate=SAMPLE_RATE)
+    processor.set_band_gains(GAINS)
+    sos = processor._cascade[0]
+    rng = np.random.default_rng(1)
+    signal = rng.standard_normal((8192, CHANNELS)).astype(dtype)
+    gain = 2.5  # Clips a good share of the samples
+
+    # Uneven block sizes, and the active set changes mid-stream so a section's state is cleared
+    active_sets = [processor._cascade[1], np.array([True, False, True, True, False, True])]
+    zi_kernel = np.zeros((len(sos), 2, CHANNELS))
+    zi_reference = np.zeros((len(sos), 2, CHANNELS))
+    bounds = [0, 64, 200, 1024, 1536, 4096, 5000, 8192]
+    for i, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        active = active_sets[i >= 4]
+        block = signal[start:end]
+        out = np.empty_like(block)
+        clipped = fast_kernels.biquad_cascade(sos, active, zi_kernel, block, out, gain)
+        expected, expected_clipped = sosfilt_block(sos, active, zi_reference, block.astype(np.float64), gain)
+
+        assert clipped == expected_clipped > 0
+        np.testing.assert_allclose(out, expected, rtol=0, atol=atol)
+        np.testing.assert_allclose(zi_kernel, zi_reference, rtol=0, atol=1e-10)
+        assert not zi_kernel[~active].any()
+
+
+@pytest.mark.skipif(not fast_kernels.NUMBA_AVAILABLE, reason="numba is not installed")
+def test_compiled_process_block_matches_scipy_path():
+    blocks = make_blocks(20, dtype=np.float64, level=0.8)
+    scipy_path = AudioProcessor(sample_rate=SAMPLE_RATE)
+    compiled_path = AudioProcessor(sample_rate=SAMPLE_RATE)
+    for processor, compiled in ((scipy_path, False), (compiled_path, True)):
+        processor.set_band_gains(GAINS)
+        processor.set_master_gain(1.8)
+        processor.set_compiled_kernel(compiled)
+        processor.enable_instrumentation()
+
+    for i, block in enumerate(blocks):
+        if i == 10:
+            for processor in (scipy_path, compiled_path):
+                processor.update_band_gain(2, 0.0)
+        np.testing.assert_allclose(compiled_path.process_block(block), scipy_path.process_block(block),
+                                   rtol=0, atol=1e-12)
+    assert compiled_path.stats.snapshot()['clipped_samples'] == scipy_path.stats.snapshot()['clipped_samples'] > 0
+
+
+@pytest.mark.skipif(not fast_kernels.NUMBA_AVAILABLE, reason="numba is not installed")
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+@pytest.mark.parametrize("with_out", [False, True], ids=["allocated_out", "given_out"])
+def test_warm_up_covers_every_stream_signature(dtype, with_out):
+    # A signature warm_up missed would be compiled by numba inside the audio callback
+    assert fast_kernels.warm_up()
+    compiled = set(fast_kernels.biquad_cascade.signatures)
+    processor = AudioProcessor(sample_rate=SAMPLE_RATE)
+    processor.set_band_gains(GAINS)
+    processor.set_master_gain(1)  # An int from the caller must not add an integer-gain signature
+    processor.set_compiled_kernel(True)
+
+    for block in make_blocks(3, dtype=dtype):
+        processor.process_block(block, out=np.empty_like(block) if with_out else None)
+    assert set(fast_kernels.biquad_cascade.signatures) == compiled